@@ -0,0 +1,140 @@
+import argparse
+
+import connection as db
+from connection import get_conn, query_cursor, close_connections
+from reporting import bump_tables
+
+# Maintenance of the aggregate tables of ddl.sql that triggers keep up to date:
+# a consistency check against a full recompute, and a bulk rebuild for after loads that bypass the triggers
+
+# Every rating aggregate table with its key columns and the query that recomputes it from rating,
+# the aggregations the rating views ran before the tables existed
+rating_aggregates = {
+    "cook_rating_aggregate": (
+        ["cook_id"],
+        "SELECT cook_id, SUM(rating_value), COUNT(*) FROM rating GROUP BY cook_id",
+    ),
+    "episode_cook_rating_aggregate": (
+        ["episode_id", "cook_id"],
+        "SELECT episode_id, cook_id, SUM(rating_value), COUNT(*) FROM rating GROUP BY episode_id, cook_id",
+    ),
+    "national_cuisine_rating_aggregate": (
+        ["national_cuisine_id"],
+        "SELECT cca.national_cuisine_id, SUM(r.rating_value), COUNT(*) "
+        "FROM rating r "
+        "INNER JOIN cook_cuisine_assignment cca ON cca.cook_id = r.cook_id AND cca.episode_id = r.episode_id "
+        "GROUP BY cca.national_cuisine_id",
+    ),
+    "judge_cook_rating_aggregate": (
+        ["judge_id", "cook_id"],
+        "SELECT judge_id, cook_id, SUM(rating_value), COUNT(*) FROM rating GROUP BY judge_id, cook_id",
+    ),
+}
+
+# Every other aggregate table with its key columns, its value columns and the query that recomputes them
+derived_aggregates = {
+    "tag_pair_count": (
+        ["tag_1", "tag_2"],
+        ["appearance_count"],
+        "SELECT rt1.tag, rt2.tag, COUNT(*) "
+        "FROM recipe_tag rt1 "
+        "INNER JOIN recipe_tag rt2 ON rt1.recipe_id = rt2.recipe_id AND rt1.tag < rt2.tag "
+        "GROUP BY rt1.tag, rt2.tag",
+    ),
+    # the sums of total_nutritional_info, whose calories are SUM(estimated_grams * kcal_per_100) / 100 / servings
+    "recipe_calories": (
+        ["recipe_id"],
+        ["grams_kcal_sum", "ingredient_count", "servings"],
+        "SELECT ri.recipe_id, SUM(ri.estimated_grams * i.kcal_per_100), COUNT(*), r.servings "
+        "FROM recipe_ingredient ri "
+        "INNER JOIN ingredient i ON ri.ingredient_id = i.ingredient_id "
+        "INNER JOIN recipe r ON ri.recipe_id = r.recipe_id "
+        "GROUP BY ri.recipe_id, r.servings",
+    ),
+}
+
+# Function to list every aggregate table as (table, key columns, value columns, recompute query)
+def aggregate_tables():
+    for table, (key_columns, recompute) in rating_aggregates.items():
+        yield table, key_columns, ["rating_sum", "rating_count"], recompute
+    for table, (key_columns, value_columns, recompute) in derived_aggregates.items():
+        yield table, key_columns, value_columns, recompute
+
+# Function to read (key, values) pairs from a query that selects the key columns followed by the integer values
+def read_aggregate(cursor, query, key_length):
+    cursor.execute(query)
+    return {tuple(row[:key_length]): tuple(int(value) for value in row[key_length:]) for row in cursor.fetchall()}
+
+# Function to compare every aggregate table with a full recompute from its source table
+# it returns {table: [(key, stored values or None, recomputed values or None), ...]} with the differing rows
+def check_aggregates():
+    mismatches = {}
+    with query_cursor() as cursor:
+        for table, key_columns, value_columns, recompute in aggregate_tables():
+            stored = read_aggregate(cursor, f"SELECT {', '.join(key_columns + value_columns)} FROM {table}",
+                                    len(key_columns))
+            expected = read_aggregate(cursor, recompute, len(key_columns))
+            mismatches[table] = [
+                (key, stored.get(key), expected.get(key))
+                for key in sorted(stored.keys() | expected.keys())
+                if stored.get(key) != expected.get(key)
+            ]
+    return mismatches
+
+# Function to recompute every rating aggregate table from rating with one INSERT ... SELECT per table
+def rebuild_rating_aggregates():
+    connection = get_conn()
+    with query_cursor(connection) as cursor:
+        for table, (key_columns, recompute) in rating_aggregates.items():
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(f"INSERT INTO {table} ({', '.join(key_columns)}, rating_sum, rating_count) {recompute}")
+        # the winners were declared from the old aggregates, declare_winners computes them all again
+        cursor.execute("DELETE FROM episode_winner")
+        connection.commit()
+    bump_tables(list(rating_aggregates) + ["episode_winner"])
+
+# Function to recompute one of derived_aggregates with one INSERT ... SELECT
+def rebuild_derived_aggregate(table, connection=None):
+    connection = connection or get_conn()
+    key_columns, value_columns, recompute = derived_aggregates[table]
+    with query_cursor(connection) as cursor:
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(f"INSERT INTO {table} ({', '.join(key_columns + value_columns)}) {recompute}")
+        connection.commit()
+    bump_tables([table])
+
+# Function to recompute tag_pair_count from recipe_tag,
+# after loads that set @bulk_tag_pairs so that the triggers on recipe_tag skipped it
+def rebuild_tag_pair_counts(connection=None):
+    rebuild_derived_aggregate("tag_pair_count", connection)
+
+# Function to print the result of check_aggregates, it returns True when every table is consistent
+def print_aggregate_check(mismatches):
+    consistent = True
+    for table, rows in mismatches.items():
+        print(f"{table:<36}{'ok' if not rows else f'{len(rows)} rows differ'}")
+        for key, stored, expected in rows[:10]:
+            print(f"    {key}: stored {stored}, recomputed {expected}")
+        consistent = consistent and not rows
+    return consistent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or rebuild the aggregate tables of the cooking_show database")
+    parser.add_argument("action", choices=["check", "rebuild"])
+    db.add_connection_arguments(parser)
+    args = parser.parse_args()
+    db.configure_from_args(args)
+
+    if args.action == "rebuild":
+        rebuild_rating_aggregates()
+        for table in derived_aggregates:
+            rebuild_derived_aggregate(table)
+    consistent = print_aggregate_check(check_aggregates())
+
+    close_connections()
+    raise SystemExit(0 if consistent else 1)
+
+
+if __name__ == "__main__":
+    main()
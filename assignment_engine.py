@@ -0,0 +1,142 @@
+import random
+
+from db_data import (table_writer, iter_table, get_national_cuisine_ids, get_national_cuisine_cooks,
+                     get_recipe_national_cuisines, get_season_episodes, get_cook_ids)
+from connection import get_conn, query_cursor
+from reporting import bump_tables
+
+# In-memory version of the episode_assignments procedure.
+# The cook/cuisine and recipe/cuisine mappings are loaded once, every episode is sampled from them with a seeded
+# random generator instead of ORDER BY RAND() over the tables, and the rows are written through the bulk writers.
+# The rules are the ones of the procedure: 10 cuisines per episode with one cook each, one recipe per cuisine,
+# 3 judges that do not cook in the episode, and no cook, cuisine or recipe in more than 3 consecutive episodes.
+
+CUISINES_PER_EPISODE = 10
+JUDGES_PER_EPISODE = 3
+MAX_CONSECUTIVE_EPISODES = 3
+
+# Draws per wanted value before sample_eligible falls back to filtering the whole population
+REJECTION_ATTEMPTS = 8
+
+# Function to draw count distinct values of population that pass eligible, by drawing random values and rejecting
+# the ineligible ones, so a few values are drawn instead of filtering the whole population for every episode
+def sample_eligible(rng, population, count, eligible):
+    # e.g. a cuisine that has cooks but no recipes
+    if not population:
+        return []
+    chosen = []
+    chosen_set = set()
+    attempts = 0
+    while len(chosen) < count and attempts < REJECTION_ATTEMPTS * count:
+        attempts += 1
+        value = population[rng.randrange(len(population))]
+        if value not in chosen_set and eligible(value):
+            chosen.append(value)
+            chosen_set.add(value)
+    if len(chosen) < count:
+        # most of the population is ineligible or already chosen
+        remaining = [value for value in population if value not in chosen_set and eligible(value)]
+        chosen.extend(rng.sample(remaining, min(count - len(chosen), len(remaining))))
+    return chosen
+
+
+class AssignmentEngine:
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+        self.cuisine_ids = list(get_national_cuisine_ids())
+        self.cook_ids = list(get_cook_ids())
+        self.cuisine_cooks = get_national_cuisine_cooks()
+        self.cuisine_recipes = get_recipe_national_cuisines()
+        self.known_recipes = set(iter_table("cook_recipe", ["cook_id", "recipe_id"], ["cook_id", "recipe_id"]))
+        # consecutive episodes of the participants of the previous episode, everyone else is at 0
+        self.cook_counts = {}
+        self.cuisine_counts = {}
+        self.recipe_counts = {}
+
+    def start_season(self):
+        self.cook_counts = {}
+        self.cuisine_counts = {}
+        self.recipe_counts = {}
+
+    # returns the (cook_id, national_cuisine_id) pairs, the recipe ids and the judge ids of an episode
+    def assign_episode(self):
+        rng = self.rng
+        cuisines = sample_eligible(rng, self.cuisine_ids, CUISINES_PER_EPISODE,
+                                   lambda cuisine_id: self.cuisine_counts.get(cuisine_id, 0) < MAX_CONSECUTIVE_EPISODES)
+
+        # one cook per cuisine: the candidate pairs are visited in random order and a pair is kept
+        # when neither its cook nor its cuisine has been used, like the cursor of episode_assignments_cursor
+        candidates = [
+            (cook_id, cuisine_id)
+            for cuisine_id in cuisines
+            for cook_id in self.cuisine_cooks.get(cuisine_id, [])
+            if self.cook_counts.get(cook_id, 0) < MAX_CONSECUTIVE_EPISODES
+        ]
+        rng.shuffle(candidates)
+        pairs = []
+        used_cooks = set()
+        used_cuisines = set()
+        for cook_id, cuisine_id in candidates:
+            if cook_id not in used_cooks and cuisine_id not in used_cuisines:
+                pairs.append((cook_id, cuisine_id))
+                used_cooks.add(cook_id)
+                used_cuisines.add(cuisine_id)
+
+        recipes = []
+        for cook_id, cuisine_id in pairs:
+            recipe = sample_eligible(rng, self.cuisine_recipes.get(cuisine_id, []), 1,
+                                     lambda recipe_id: self.recipe_counts.get(recipe_id, 0) < MAX_CONSECUTIVE_EPISODES)
+            recipes.append(recipe[0] if recipe else None)
+
+        judges = sample_eligible(rng, self.cook_ids, JUDGES_PER_EPISODE,
+                                 lambda cook_id: cook_id not in used_cooks
+                                 and self.cook_counts.get(cook_id, 0) < MAX_CONSECUTIVE_EPISODES)
+
+        self.cook_counts = {cook_id: self.cook_counts.get(cook_id, 0) + 1 for cook_id in used_cooks}
+        self.cuisine_counts = {cuisine_id: self.cuisine_counts.get(cuisine_id, 0) + 1 for cuisine_id in used_cuisines}
+        self.recipe_counts = {recipe_id: self.recipe_counts.get(recipe_id, 0) + 1 for recipe_id in recipes if recipe_id is not None}
+        return pairs, recipes, judges
+
+    # assigns every episode of the given seasons ({season_number: [episode_id, ...]}) and writes the rows in bulk
+    def run(self, season_episodes):
+        with table_writer("cook_cuisine_assignment", ["cook_id", "national_cuisine_id", "episode_id"]) as cook_writer, \
+                table_writer("recipe_assignment", ["recipe_id", "episode_id"]) as recipe_writer, \
+                table_writer("judge_assignment", ["cook_id", "episode_id"]) as judge_writer, \
+                table_writer("cook_recipe", ["cook_id", "recipe_id"]) as known_writer:
+            for season_number in sorted(season_episodes):
+                self.start_season()
+                for episode_id in season_episodes[season_number]:
+                    pairs, recipes, judges = self.assign_episode()
+                    for (cook_id, cuisine_id), recipe_id in zip(pairs, recipes):
+                        cook_writer.add((cook_id, cuisine_id, episode_id))
+                        if recipe_id is None:
+                            continue
+                        recipe_writer.add((recipe_id, episode_id))
+                        # the cook must now know the recipe he is assigned in the episode
+                        if (cook_id, recipe_id) not in self.known_recipes:
+                            self.known_recipes.add((cook_id, recipe_id))
+                            known_writer.add((cook_id, recipe_id))
+                    judge_writer.add_many((cook_id, episode_id) for cook_id in judges)
+        self.write_episode_counts()
+
+    # leaves the episode_count columns as the procedure leaves them after the last episode
+    def write_episode_counts(self):
+        connection = get_conn()
+        with query_cursor(connection) as cursor:
+            for table, key, counts in [("national_cuisine", "national_cuisine_id", self.cuisine_counts),
+                                       ("cook", "cook_id", self.cook_counts),
+                                       ("recipe", "recipe_id", self.recipe_counts)]:
+                cursor.execute(f"UPDATE {table} SET episode_count = 0 WHERE episode_count > 0")
+                if counts:
+                    cursor.executemany(f"UPDATE {table} SET episode_count = %s WHERE {key} = %s",
+                                       [(count, row_id) for row_id, count in sorted(counts.items())])
+            connection.commit()
+        bump_tables(["national_cuisine", "cook", "recipe"])
+
+
+# Function to make the assignments of the first num_seasons seasons with the given random generator
+def run_assignment_engine(num_seasons, rng=None):
+    season_episodes = get_season_episodes()
+    engine = AssignmentEngine(rng)
+    engine.run({season: episodes for season, episodes in season_episodes.items() if season <= num_seasons})
+    return engine
@@ -0,0 +1,362 @@
+import time
+import math
+import json
+import re
+import argparse
+
+import db_data
+import snapshot
+import connection as db
+from connection import get_conn, query_cursor, close_connections
+from schema import foreign_key_graph, view_names
+from scheduler import run_stages
+
+# Benchmarks of the population scripts and the procedures of ddl.sql against a live database
+
+# Tables written by the assignment procedures, emptied before every timed run
+assignment_tables = ["judge_assignment", "recipe_assignment", "cook_cuisine_assignment"]
+
+# Function to populate every table a stage reads, i.e. run the stages listed before it
+def populate_before(stage_name, scale_factor):
+    db_data.reset_tables('truncate')
+    stages = db_data.populate_stages(db_data.scaled_sizes(scale_factor))
+    stages = stages[:[stage.name for stage in stages].index(stage_name)]
+    run_stages(stages, foreign_key_graph(), before_stage=lambda stage: db_data.seed_stage(stage.name))
+
+# Function to bring the assignment tables, cook_recipe and the episode counts back to their state before the assignments
+def reset_assignments():
+    connection = get_conn()
+    with query_cursor(connection) as cursor:
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        for table in assignment_tables + ["cook_recipe"]:
+            cursor.execute(f"TRUNCATE TABLE {table}")
+        cursor.execute("SET SESSION foreign_key_checks = 1")
+        cursor.execute("INSERT INTO cook_recipe SELECT * FROM benchmark_cook_recipe")
+        for table in ["national_cuisine", "cook", "recipe"]:
+            cursor.execute(f"UPDATE {table} SET episode_count = 0 WHERE episode_count > 0")
+        connection.commit()
+
+# Function to count the rows of a table
+def count_rows(table):
+    with query_cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        return cursor.fetchone()[0]
+
+# Function to time the assignments of all seasons with every assignment mode of db_data, on the same populated data
+def compare_assignments(scale_factor, modes):
+    populate_before("assignments", scale_factor)
+    sizes = db_data.scaled_sizes(scale_factor)
+    with query_cursor() as cursor:
+        cursor.execute("CREATE TEMPORARY TABLE benchmark_cook_recipe AS SELECT * FROM cook_recipe")
+
+    results = []
+    for mode in modes:
+        reset_assignments()
+        db_data.seed_stage("assignments")
+        start = time.perf_counter()
+        db_data.assignments(sizes["seasons"], mode)
+        seconds = time.perf_counter() - start
+        rows = {table: count_rows(table) for table in assignment_tables}
+        results.append((mode, seconds, rows))
+
+    with query_cursor() as cursor:
+        cursor.execute("DROP TEMPORARY TABLE benchmark_cook_recipe")
+    return sizes, results
+
+# Function to print the timings of compare_assignments for every scale factor
+def print_assignment_comparison(scale_factors, modes):
+    print(f"{'scale':>6}{'cooks':>8}{'episodes':>10}  {'mode':<16}{'seconds':>10}{'speedup':>9}"
+          f"{'cooks':>8}{'recipes':>9}{'judges':>8}")
+    for scale_factor in scale_factors:
+        sizes, results = compare_assignments(scale_factor, modes)
+        baseline = results[0][1]
+        for mode, seconds, rows in results:
+            speedup = baseline / seconds if seconds > 0 else float('inf')
+            print(f"{scale_factor:>6}{sizes['cooks']:>8}{sizes['seasons'] * db_data.EPISODES_PER_SEASON:>10}  "
+                  f"{mode:<16}{seconds:>10.3f}{speedup:>8.1f}x"
+                  f"{rows['cook_cuisine_assignment']:>8}{rows['recipe_assignment']:>9}{rows['judge_assignment']:>8}")
+
+
+# Function to time the recipe stage with every category mode of db_data, on the same populated ingredients
+# it returns the entity counts and (mode, seconds, rows) for every mode
+def compare_recipe_categories(scale_factor, modes):
+    populate_before("recipe", scale_factor)
+    sizes = db_data.scaled_sizes(scale_factor)
+    results = []
+    for mode in modes:
+        # the tables that reference recipe are still empty
+        with query_cursor() as cursor:
+            cursor.execute("SET SESSION foreign_key_checks = 0")
+            cursor.execute("TRUNCATE TABLE recipe")
+            cursor.execute("SET SESSION foreign_key_checks = 1")
+        db_data.CATEGORY_MODE = mode
+        db_data.seed_stage("recipe")
+        start = time.perf_counter()
+        db_data.generate_dummy_recipes_from_json('recipes.json', sizes["recipe_replicas"])
+        seconds = time.perf_counter() - start
+        results.append((mode, seconds, count_rows("recipe")))
+    return sizes, results
+
+# Function to print the recipe insert throughput of compare_recipe_categories for every scale factor
+def print_recipe_category_comparison(scale_factors, modes):
+    print(f"{'scale':>6}  {'mode':<10}{'recipes':>10}{'seconds':>10}{'rows/sec':>12}{'speedup':>9}")
+    for scale_factor in scale_factors:
+        sizes, results = compare_recipe_categories(scale_factor, modes)
+        baseline = results[0][1]
+        for mode, seconds, rows in results:
+            rate = rows / seconds if seconds > 0 else float('inf')
+            speedup = baseline / seconds if seconds > 0 else float('inf')
+            print(f"{scale_factor:>6}  {mode:<10}{rows:>10}{seconds:>10.3f}{rate:>12.0f}{speedup:>8.1f}x")
+
+
+# Procedures of ddl.sql that only read, with a function that returns the arguments of a call on the current data
+benchmark_procedures = {
+    "cuisine_year_cook_participations": lambda: (1, first_value("SELECT cuisine_name FROM national_cuisine ORDER BY national_cuisine_id LIMIT 1")),
+    "cook_recipe_bundle": lambda: (1,),
+}
+
+# Function to get the first column of the first row of a query
+def first_value(query):
+    with query_cursor() as cursor:
+        cursor.execute(query)
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+# Function to run a view or procedure once and return the rows it returned
+def run_query(kind, name, args=()):
+    with query_cursor() as cursor:
+        if kind == "view":
+            cursor.execute(f"SELECT * FROM {name}")
+            return len(cursor.fetchall())
+        cursor.callproc(name, args)
+        return sum(len(result.fetchall()) for result in cursor.stored_results())
+
+# Function to get the nearest rank percentile of a sorted list
+def percentile(values, p):
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+explain_row_pattern = re.compile(r'actual time=[\d.]+\.\.[\d.]+ rows=([\d.e+]+) loops=(\d+)')
+table_access_pattern = re.compile(r'->\s*(Table scan|Index scan|Index range scan|Index lookup|Single-row index lookup|'
+                                  r'Covering index scan|Covering index lookup|Covering index range scan|Full-text index search)')
+
+# Function to run EXPLAIN ANALYZE on a view, it returns the plan and the rows read by its table and index accesses
+def explain_analyze(name):
+    with query_cursor() as cursor:
+        cursor.execute(f"EXPLAIN ANALYZE SELECT * FROM {name}")
+        plan = '\n'.join(row[0] for row in cursor.fetchall())
+    rows_examined = 0
+    for line in plan.splitlines():
+        match = explain_row_pattern.search(line)
+        if match is not None and table_access_pattern.search(line):
+            rows_examined += round(float(match.group(1)) * int(match.group(2)))
+    return plan, rows_examined
+
+# Function to get the changes of the Handler_* session counters during one run of a query
+def handler_counters(kind, name, args=()):
+    with query_cursor() as cursor:
+        cursor.execute("FLUSH STATUS")
+    run_query(kind, name, args)
+    with query_cursor() as cursor:
+        cursor.execute("SHOW SESSION STATUS LIKE 'Handler%'")
+        return {variable: int(value) for variable, value in cursor.fetchall() if int(value) != 0}
+
+# Function to time a view or procedure: warmup runs first, then the latency of every measured run
+def benchmark_query(kind, name, args, runs, warmup):
+    for _ in range(warmup):
+        run_query(kind, name, args)
+    latencies = []
+    rows = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = run_query(kind, name, args)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    result = {
+        "kind": kind,
+        "name": name,
+        "rows": rows,
+        "runs": runs,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        # the Handler_* counters and EXPLAIN ANALYZE only exist on MySQL
+        "handler": handler_counters(kind, name, args) if db.BACKEND == 'mysql' else {},
+    }
+    if kind == "view" and db.BACKEND == 'mysql':
+        result["plan"], result["rows_examined"] = explain_analyze(name)
+    else:
+        result["rows_examined"] = None
+    return result
+
+# Function to run declare_winners once on an empty episode_winner, so it ranks every episode like after a population,
+# it returns the milliseconds of the call and its commit (emptying the table is not timed) and the rows it returned
+def run_declare_winners():
+    connection = get_conn()
+    with query_cursor(connection) as cursor:
+        cursor.execute("DELETE FROM episode_winner")
+        connection.commit()
+        start = time.perf_counter()
+        cursor.callproc("declare_winners", (db_data.SEED,))
+        rows = sum(len(result.fetchall()) for result in cursor.stored_results())
+        connection.commit()
+    return (time.perf_counter() - start) * 1000, rows
+
+# Function to time declare_winners, every call declares all the winners again instead of finding nothing dirty.
+# The winners of the seed are committed after every run, so the database ends in the state of a population.
+def benchmark_declare_winners(runs, warmup):
+    for _ in range(warmup):
+        run_declare_winners()
+    latencies = []
+    rows = 0
+    for _ in range(runs):
+        milliseconds, rows = run_declare_winners()
+        latencies.append(milliseconds)
+    latencies.sort()
+    return {"kind": "procedure", "name": "declare_winners", "rows": rows, "runs": runs,
+            "p50_ms": percentile(latencies, 50), "p95_ms": percentile(latencies, 95), "p99_ms": percentile(latencies, 99),
+            "handler": {}, "rows_examined": None}
+
+# Function to benchmark every view, the read only procedures and declare_winners on datasets of the given scale factors
+def benchmark_queries(scale_factors, runs, warmup, workers=1, names=None):
+    results = []
+    for scale_factor in scale_factors:
+        snapshot.populate(scale_factor, workers)
+        queries = [("view", name) for name in view_names()] + [("procedure", name) for name in benchmark_procedures]
+        for kind, name in queries:
+            if names and name not in names:
+                continue
+            args = benchmark_procedures[name]() if kind == "procedure" else ()
+            result = benchmark_query(kind, name, args, runs, warmup)
+            result["scale_factor"] = scale_factor
+            results.append(result)
+        if not names or "declare_winners" in names:
+            result = benchmark_declare_winners(runs, warmup)
+            result["scale_factor"] = scale_factor
+            results.append(result)
+    return results
+
+# Suffixes of the views that return the same rows as the view named without the suffix
+variant_suffixes = ["_alt", "_precomputed"]
+
+# Function to print the results of benchmark_queries, with the latency of every variant next to its main query
+def print_query_results(results):
+    print(f"{'scale':>6}  {'query':<40}{'rows':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'examined':>12}{'handler reads':>15}")
+    for result in results:
+        handler_reads = sum(value for variable, value in result["handler"].items() if variable.startswith("Handler_read"))
+        examined = result["rows_examined"] if result["rows_examined"] is not None else '-'
+        print(f"{result['scale_factor']:>6}  {result['name']:<40}{result['rows']:>8}{result['p50_ms']:>10.2f}"
+              f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{examined:>12}{handler_reads:>15}")
+
+    by_key = {(result["scale_factor"], result["name"]): result for result in results}
+    for (scale_factor, name), variant in by_key.items():
+        for suffix in variant_suffixes:
+            main = by_key.get((scale_factor, name[:-len(suffix)])) if name.endswith(suffix) else None
+            if main is not None:
+                winner = name if variant["p50_ms"] < main["p50_ms"] else main["name"]
+                print(f"scale {scale_factor}: {main['name']} p50 {main['p50_ms']:.2f} ms vs {name} p50 {variant['p50_ms']:.2f} ms"
+                      f" -> {winner} is faster")
+
+
+# The views of the recipe book of cook 1, each one a round trip of its own
+cook_user_views = ["cook_user_info", "cook_user_recipes", "cook_user_steps", "cook_user_ingredients", "cook_user_gear"]
+
+# Function to time the recipe book of cook 1 read with the five cook_user_* views and with one call of cook_recipe_bundle
+# it returns (approach, round trips, rows, p50 ms, p95 ms) for both
+def compare_cook_bundle(scale_factor, runs, warmup):
+    snapshot.populate(scale_factor)
+    approaches = [
+        ("cook_user views", len(cook_user_views), lambda: sum(run_query("view", view) for view in cook_user_views)),
+        ("cook_recipe_bundle", 1, lambda: run_query("procedure", "cook_recipe_bundle", (1,))),
+    ]
+    results = []
+    for approach, round_trips, run in approaches:
+        for _ in range(warmup):
+            run()
+        latencies = []
+        rows = 0
+        for _ in range(runs):
+            start = time.perf_counter()
+            rows = run()
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        results.append((approach, round_trips, rows, percentile(latencies, 50), percentile(latencies, 95)))
+    return results
+
+# Function to print the latencies of compare_cook_bundle for every scale factor,
+# the bundle also returns the nutritional info, calories and images the views do not have
+def print_cook_bundle_comparison(scale_factors, runs, warmup):
+    print(f"{'scale':>6}  {'approach':<20}{'round trips':>12}{'rows':>8}{'p50 ms':>10}{'p95 ms':>10}{'speedup':>9}")
+    for scale_factor in scale_factors:
+        results = compare_cook_bundle(scale_factor, runs, warmup)
+        baseline = results[0][3]
+        for approach, round_trips, rows, p50, p95 in results:
+            speedup = baseline / p50 if p50 > 0 else float('inf')
+            print(f"{scale_factor:>6}  {approach:<20}{round_trips:>12}{rows:>8}{p50:>10.2f}{p95:>10.2f}{speedup:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cooking_show population and procedures")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    assignments_parser = subparsers.add_parser("assignments",
+                                               help="compare the assignment procedures and the Python assignment engine")
+    assignments_parser.add_argument("--scale-factors", type=int, nargs="+", default=[1, 2, 4, 8])
+    assignments_parser.add_argument("--modes", nargs="+", choices=list(db_data.assignment_procedures),
+                                    default=["episode-cursor", "episode", "season", "python"])
+    assignments_parser.add_argument("--seed", default="benchmark")
+
+    recipes_parser = subparsers.add_parser("recipes",
+                                           help="compare the recipe insert throughput with and without the category trigger lookup")
+    recipes_parser.add_argument("--scale-factors", type=int, nargs="+", default=[1, 10, 100])
+    recipes_parser.add_argument("--modes", nargs="+", choices=["trigger", "python"], default=["trigger", "python"])
+    recipes_parser.add_argument("--seed", default="benchmark")
+
+    bundle_parser = subparsers.add_parser("bundle",
+                                          help="compare the five cook_user_* views with one cook_recipe_bundle call")
+    bundle_parser.add_argument("--scale-factors", type=int, nargs="+", default=[1, 10])
+    bundle_parser.add_argument("--runs", type=int, default=50, help="measured runs of every approach")
+    bundle_parser.add_argument("--warmup", type=int, default=5, help="runs of every approach before measuring")
+    bundle_parser.add_argument("--seed", default="benchmark")
+    bundle_parser.add_argument("--snapshot-dir", help="restore the datasets from snapshots in this directory, saved on first use")
+
+    queries_parser = subparsers.add_parser("queries", help="time every view and read only procedure of ddl.sql, and declare_winners")
+    queries_parser.add_argument("--scale-factors", type=int, nargs="+", default=[1, 4])
+    queries_parser.add_argument("--runs", type=int, default=20, help="measured runs of every query")
+    queries_parser.add_argument("--warmup", type=int, default=3, help="runs of every query before measuring")
+    queries_parser.add_argument("--workers", type=int, default=1, help="workers used to populate the database")
+    queries_parser.add_argument("--only", nargs="+", help="names of the views and procedures to run, all by default")
+    queries_parser.add_argument("--output", default="benchmark_queries.json", help="JSON file of the results")
+    queries_parser.add_argument("--seed", default="benchmark")
+    queries_parser.add_argument("--snapshot-dir", help="restore the datasets from snapshots in this directory, saved on first use")
+
+    db.add_connection_arguments(parser)
+    args = parser.parse_args()
+    db.configure_from_args(args)
+    if getattr(args, "workers", 1) + 1 > db.POOL_SIZE:
+        db.POOL_SIZE = args.workers + 1
+
+    if args.benchmark == "assignments":
+        db_data.SEED = args.seed
+        print_assignment_comparison(args.scale_factors, args.modes)
+    elif args.benchmark == "recipes":
+        db_data.SEED = args.seed
+        print_recipe_category_comparison(args.scale_factors, args.modes)
+    elif args.benchmark == "bundle":
+        db_data.SEED = args.seed
+        snapshot.SNAPSHOT_DIR = args.snapshot_dir
+        db_data.RESET_MODE = 'truncate'
+        print_cook_bundle_comparison(args.scale_factors, args.runs, args.warmup)
+    elif args.benchmark == "queries":
+        db_data.SEED = args.seed
+        snapshot.SNAPSHOT_DIR = args.snapshot_dir
+        db_data.RESET_MODE = 'truncate'
+        results = benchmark_queries(args.scale_factors, args.runs, args.warmup, args.workers, args.only)
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+        print_query_results(results)
+
+    close_connections()
+
+
+if __name__ == "__main__":
+    main()
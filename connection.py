@@ -0,0 +1,197 @@
+import os
+import threading
+import configparser
+from contextlib import contextmanager
+
+try:
+    from mysql.connector import pooling
+except ImportError:
+    # only the mysql backend needs mysql-connector-python
+    pooling = None
+
+# 'mysql' connects to a MySQL server, 'sqlite' runs the schema in an embedded SQLite database (sqlite_backend.py)
+DEFAULT_BACKEND = 'mysql'
+BACKENDS = ['mysql', 'sqlite']
+
+# Database file of the sqlite backend, ':memory:' keeps the whole database in memory for the life of the process
+DEFAULT_SQLITE_PATH = ':memory:'
+
+# Connection settings of the MySQL database. Each level overrides the one before it:
+# these defaults, the [mysql] section of the config file, the environment variables, the command line flags
+DEFAULT_CONFIG = {
+    "host": "localhost",
+    "port": 3306,
+    "user": "root",
+    "password": "root",
+    "database": "cooking_show",
+}
+
+# Environment variables read for every setting
+CONFIG_ENV = {
+    "host": "MYSQL_HOST",
+    "port": "MYSQL_PORT",
+    "user": "MYSQL_USER",
+    "password": "MYSQL_PASSWORD",
+    "database": "MYSQL_DATABASE",
+    "pool_size": "MYSQL_POOL_SIZE",
+    "backend": "COOKING_SHOW_BACKEND",
+    "sqlite_path": "COOKING_SHOW_SQLITE_PATH",
+}
+
+# Config file read when no other file is given, it is skipped if it does not exist
+CONFIG_FILE = 'db.ini'
+
+# Number of connections kept by the pool, every thread that runs queries holds one of them
+DEFAULT_POOL_SIZE = 5
+
+DB_CONFIG = dict(DEFAULT_CONFIG)
+POOL_SIZE = DEFAULT_POOL_SIZE
+BACKEND = DEFAULT_BACKEND
+SQLITE_PATH = DEFAULT_SQLITE_PATH
+
+# Extra arguments of every connection of the pool, e.g. allow_local_infile
+CONNECT_OPTIONS = {}
+
+# Function to build the connection settings from the config file, the environment and the given overrides,
+# settings that are None in the overrides are left to the lower levels
+def load_config(config_file=None, overrides=None):
+    global POOL_SIZE, BACKEND, SQLITE_PATH
+    settings = dict(DEFAULT_CONFIG, pool_size=DEFAULT_POOL_SIZE, backend=DEFAULT_BACKEND, sqlite_path=DEFAULT_SQLITE_PATH)
+
+    parser = configparser.ConfigParser()
+    if config_file is not None:
+        if not parser.read(config_file):
+            raise FileNotFoundError(f"Config file {config_file} not found")
+    else:
+        parser.read(os.environ.get("COOKING_SHOW_DB_CONFIG", CONFIG_FILE))
+    if parser.has_section("mysql"):
+        settings.update(parser["mysql"])
+
+    for key, variable in CONFIG_ENV.items():
+        if variable in os.environ:
+            settings[key] = os.environ[variable]
+
+    for key, value in (overrides or {}).items():
+        if value is not None:
+            settings[key] = value
+
+    POOL_SIZE = int(settings.pop("pool_size"))
+    BACKEND = settings.pop("backend")
+    SQLITE_PATH = settings.pop("sqlite_path")
+    if BACKEND not in BACKENDS:
+        raise ValueError(f"Unknown backend {BACKEND}, expected one of {', '.join(BACKENDS)}")
+    settings["port"] = int(settings["port"])
+    DB_CONFIG.clear()
+    DB_CONFIG.update(settings)
+    close_pool()
+    return DB_CONFIG
+
+# Function to add the connection flags to the parser of a script
+def add_connection_arguments(parser):
+    group = parser.add_argument_group("connection", "override the config file and the MYSQL_* environment variables")
+    group.add_argument("--db-config", help=f"INI file with a [mysql] section, {CONFIG_FILE} by default")
+    group.add_argument("--host")
+    group.add_argument("--port", type=int)
+    group.add_argument("--user")
+    group.add_argument("--password")
+    group.add_argument("--database")
+    group.add_argument("--pool-size", type=int, help=f"connections kept by the pool, {DEFAULT_POOL_SIZE} by default")
+    group.add_argument("--backend", choices=BACKENDS,
+                       help=f"run on a MySQL server or on an embedded SQLite database, {DEFAULT_BACKEND} by default")
+    group.add_argument("--sqlite-path", help=f"database file of the sqlite backend, {DEFAULT_SQLITE_PATH} by default")
+
+# Function to load the connection settings from the parsed flags of add_connection_arguments
+def configure_from_args(args):
+    return load_config(args.db_config, {
+        "host": args.host,
+        "port": args.port,
+        "user": args.user,
+        "password": args.password,
+        "database": args.database,
+        "pool_size": args.pool_size,
+        "backend": args.backend,
+        "sqlite_path": args.sqlite_path,
+    })
+
+pool = None
+pool_guard = threading.Lock()
+
+# Function to get the connection pool, it is created on first use with the current settings
+def get_pool():
+    global pool
+    with pool_guard:
+        if pool is None and BACKEND == 'sqlite':
+            # imported here because the sqlite backend builds on reporting and aggregates, which import this module
+            from sqlite_backend import SQLitePool
+            pool = SQLitePool(SQLITE_PATH)
+        elif pool is None:
+            if pooling is None:
+                raise RuntimeError("mysql-connector-python is not installed, install it or use the sqlite backend")
+            pool = pooling.MySQLConnectionPool(pool_name="cooking_show", pool_size=POOL_SIZE,
+                                               **DB_CONFIG, **CONNECT_OPTIONS)
+        return pool
+
+# Every thread keeps the pooled connection it took until it is released
+thread_state = threading.local()
+open_connections = []
+
+# Function applied to every connection taken from the pool, instrumentation.enable sets it to time the statements
+connection_wrapper = None
+
+# Function to get the connection of the current thread, taken from the pool on first use
+def get_conn():
+    connection = getattr(thread_state, "connection", None)
+    if connection is None:
+        connection = get_pool().get_connection()
+        if connection_wrapper is not None:
+            connection = connection_wrapper(connection)
+        thread_state.connection = connection
+        with pool_guard:
+            open_connections.append(connection)
+    return connection
+
+# Function to give the connection of the current thread back to the pool
+def release_conn():
+    connection = getattr(thread_state, "connection", None)
+    if connection is not None:
+        thread_state.connection = None
+        with pool_guard:
+            open_connections.remove(connection)
+        connection.close()
+
+# Function to give the connections of all threads back to the pool
+def close_connections():
+    with pool_guard:
+        connections = list(open_connections)
+        open_connections.clear()
+    for connection in connections:
+        connection.close()
+    thread_state.connection = None
+
+# Function to drop the pool, the next get_conn creates a new one
+def close_pool():
+    global pool
+    close_connections()
+    with pool_guard:
+        pool = None
+
+# A connection is shared by the thread generating rows and the thread of its BulkWriter,
+# so every statement takes the lock of its connection first
+connection_locks = {}
+connection_locks_guard = threading.Lock()
+
+# Function to get the lock that serializes the use of a connection
+def connection_lock(connection):
+    with connection_locks_guard:
+        return connection_locks.setdefault(id(connection), threading.RLock())
+
+# Context manager that holds the lock of a connection and closes the cursor it opens on exit
+@contextmanager
+def query_cursor(connection=None):
+    connection = connection or get_conn()
+    with connection_lock(connection):
+        cursor = connection.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
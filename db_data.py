@@ -1,70 +1,435 @@
-import mysql.connector
 import random
 import string
 import json
+import time
+import argparse
+import queue
+import threading
+import os
+import tempfile
+import hashlib
 from datetime import datetime, timedelta
-from itertools import product
+from itertools import groupby, islice
+from operator import itemgetter
+from functools import partial
+from contextlib import contextmanager
+
+from schema import foreign_key_graph, dependency_order, unique_key_tables, iter_statements, SchemaDependencies
+from scheduler import Stage, run_stages, print_stage_report
+from aggregates import rebuild_tag_pair_counts
+from reporting import bump_tables, bump_writes, bump_all_tables
+import instrumentation
+from unique_values import UniqueIntegers, UniqueStrings, FeistelPermutation, SyntheticTitles
+import connection as db
+from connection import get_conn, close_connections, connection_lock, query_cursor
+
+try:
+    import numpy
+except ImportError:
+    # only the numpy generator mode needs NumPy
+    numpy = None
 
 # Function to execute SQL queries
 def execute_query(connection, query, data=None):
-    cursor = connection.cursor()
-    if data:
-        cursor.execute(query, data)
-    else:
-        cursor.execute(query)
-    connection.commit()
-
-# Connect to your MySQL database
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    port="3306",  # Adjust the port if necessary
-    password="root",
-    database="cooking_show" 
-)
-
-if conn.is_connected():
-    print("Connected to MySQL database")
+    with query_cursor(connection) as cursor:
+        if data:
+            cursor.execute(query, data)
+        else:
+            cursor.execute(query)
+        connection.commit()
+    bump_writes(query)
+
+# Number of rows sent to the server in a single multi-row INSERT
+BATCH_SIZE = 1000
+
+# 'table' commits once after a whole table has been written, 'batch' commits after every batch
+COMMIT_MODE = 'table'
+
+# Rows written and seconds spent for every table, used for the rows/sec report at the end
+insert_stats = {}
+
+# Number of full batches that may wait for a BulkWriter, the generator blocks when the queue is full
+QUEUE_DEPTH = 4
+
+# Buffers the rows of one table and writes them with executemany in batches of BATCH_SIZE rows,
+# mysql.connector rewrites executemany of an INSERT ... VALUES into a single multi-row INSERT.
+# Full batches go through a bounded queue to a writer thread, so rows are generated while the previous
+# batch is on its way to the server and at most QUEUE_DEPTH + 1 batches are held in memory
+class BulkWriter:
+    def __init__(self, connection, table, columns, batch_size=None, commit_mode=None):
+        self.connection = connection
+        self.table = table
+        self.columns = columns
+        self.query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+        self.batch_size = batch_size or BATCH_SIZE
+        self.commit_mode = commit_mode or COMMIT_MODE
+        self.buffer = []
+        self.rows = 0
+        self.seconds = 0.0
+        self.error = None
+        self.batches = queue.Queue(maxsize=QUEUE_DEPTH)
+        self.thread = threading.Thread(target=self.consume, name=f"writer-{table}", daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add(self, row):
+        self.buffer.append(row)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, rows):
+        for row in rows:
+            self.add(row)
+
+    # adds the rows made of whole columns of the same length (lists or NumPy arrays), a batch at a time
+    def add_columns(self, *columns):
+        rows = list(zip(*[column.tolist() if hasattr(column, "tolist") else column for column in columns]))
+        position = 0
+        while position < len(rows):
+            take = self.batch_size - len(self.buffer)
+            self.buffer.extend(rows[position:position + take])
+            position += take
+            if len(self.buffer) >= self.batch_size:
+                self.flush()
+
+    # hands the buffered rows to the writer thread
+    def flush(self):
+        if self.error is not None:
+            raise self.error
+        if self.buffer:
+            self.batches.put(self.buffer)
+            self.buffer = []
+
+    # runs in the writer thread, after a failure the remaining batches are drained so the generator never blocks
+    def consume(self):
+        while True:
+            batch = self.batches.get()
+            if batch is None:
+                return
+            if self.error is None:
+                try:
+                    self.write(batch)
+                except Exception as error:
+                    self.error = error
+
+    def write(self, batch):
+        start = time.perf_counter()
+        with query_cursor(self.connection) as cursor:
+            cursor.executemany(self.query, batch)
+            if self.commit_mode == 'batch':
+                self.connection.commit()
+                bump_tables([self.table])
+        self.seconds += time.perf_counter() - start
+        self.rows += len(batch)
+
+    def stop(self):
+        self.batches.put(None)
+        self.thread.join()
+
+    def close(self):
+        if self.error is None:
+            self.flush()
+        self.stop()
+        if self.error is not None:
+            raise self.error
+        start = time.perf_counter()
+        with connection_lock(self.connection):
+            self.connection.commit()
+        self.seconds += time.perf_counter() - start
+        bump_tables([self.table])
+        record_insert_stats(self.table, self.rows, self.seconds)
+
+    def abort(self):
+        self.buffer = []
+        self.stop()
+        with connection_lock(self.connection):
+            self.connection.rollback()
+
+# 'insert' writes the rows with multi-row INSERTs, 'load-data' stages them in tab separated files
+# and loads every file with LOAD DATA LOCAL INFILE
+LOAD_MODE = 'insert'
+
+# Rows per staging file in the 'load-data' mode
+LOAD_BATCH_SIZE = 50000
+
+# Directory of the staging files, a temporary directory that is removed after every load when None
+STAGING_DIR = None
+
+# Position of every table in the foreign key order of ddl.sql, used as the prefix of its staging files
+# so that a directory of kept files sorts in the order it has to be loaded
+staging_order = {}
+
+# Tables with a UNIQUE key besides their primary key, unique_checks stays on while they are loaded
+unique_tables = set()
+
+# Function to write a value the way LOAD DATA reads it with the default FIELDS ESCAPED BY '\\'
+def staging_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, datetime):
+        value = value.strftime('%Y-%m-%d %H:%M:%S')
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+# BulkWriter that writes every batch to a staging file and loads it with LOAD DATA LOCAL INFILE.
+# Triggers still fire for every row, but foreign key checks are off during the load: the stages run in
+# foreign key order and only use ids read back from the parent tables, so they cannot reference a missing row.
+# unique_checks is only turned off for tables without a secondary UNIQUE key, where it cannot hide a duplicate.
+class LoadDataWriter(BulkWriter):
+    def __init__(self, connection, table, columns, batch_size=None, commit_mode=None):
+        super().__init__(connection, table, columns, batch_size or LOAD_BATCH_SIZE, commit_mode)
+        self.files = 0
+        self.relaxed_checks = "SET SESSION foreign_key_checks = 0" + (
+            ", unique_checks = 0" if table not in unique_tables else "")
+
+    def write(self, batch):
+        start = time.perf_counter()
+        staging_dir = STAGING_DIR or tempfile.gettempdir()
+        path = os.path.join(staging_dir, f"{staging_order.get(self.table, 99):02d}_{self.table}_{self.files:05d}.tsv")
+        path = path.replace(os.sep, '/')
+        self.files += 1
+        with open(path, 'w', encoding='utf-8', newline='\n') as file:
+            for row in batch:
+                file.write('\t'.join(staging_value(value) for value in row) + '\n')
+
+        query = (f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE {self.table} CHARACTER SET utf8mb4 "
+                 f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({', '.join(self.columns)})")
+        try:
+            with query_cursor(self.connection) as cursor:
+                cursor.execute(self.relaxed_checks)
+                try:
+                    cursor.execute(query)
+                    loaded = cursor.rowcount
+                finally:
+                    cursor.execute("SET SESSION foreign_key_checks = 1, unique_checks = 1")
+                if self.commit_mode == 'batch':
+                    self.connection.commit()
+                    bump_tables([self.table])
+        finally:
+            if STAGING_DIR is None:
+                os.remove(path)
+        # LOAD DATA LOCAL skips rows with a duplicate key instead of failing like INSERT does
+        if loaded != len(batch):
+            raise RuntimeError(f"LOAD DATA loaded {loaded} of {len(batch)} rows into {self.table}")
+        self.seconds += time.perf_counter() - start
+        self.rows += len(batch)
+
+# Function to open the writer of a table for the current thread's connection and the selected load mode
+def table_writer(table, columns):
+    if LOAD_MODE == 'load-data':
+        return LoadDataWriter(get_conn(), table, columns)
+    return BulkWriter(get_conn(), table, columns)
+
+# Function to prepare the 'load-data' mode: the staging file order and the tables that keep unique_checks
+def prepare_load_data():
+    staging_order.update((table, index) for index, table in enumerate(dependency_order(foreign_key_graph())))
+    unique_tables.update(unique_key_tables())
+    if STAGING_DIR is not None:
+        os.makedirs(STAGING_DIR, exist_ok=True)
+
+insert_stats_lock = threading.Lock()
+
+# Function to add the rows and time of a finished writer to the per table statistics
+def record_insert_stats(table, rows, seconds):
+    with insert_stats_lock:
+        total_rows, total_seconds = insert_stats.get(table, (0, 0.0))
+        insert_stats[table] = (total_rows + rows, total_seconds + seconds)
+
+# Function to write all the rows of an iterable into a table through the writer of the load mode
+def insert_rows(table, columns, rows):
+    with table_writer(table, columns) as writer:
+        writer.add_many(rows)
+
+# Context manager that sets a flag of the triggers of ddl.sql (a user variable set to 1) on the current thread's
+# connection, e.g. bulk_step_ordering makes the step_ordering trigger keep the orderings of the inserted steps
+@contextmanager
+def bulk_flag(name):
+    with query_cursor() as cursor:
+        cursor.execute(f"SET @{name} = 1")
+    try:
+        yield
+    finally:
+        with query_cursor() as cursor:
+            cursor.execute(f"SET @{name} = NULL")
+
+# Function to print the rows/sec achieved for every table
+def print_insert_stats():
+    print(f"{'table':<25}{'rows':>10}{'seconds':>10}{'rows/sec':>12}")
+    for table, (rows, seconds) in insert_stats.items():
+        rate = rows / seconds if seconds > 0 else float('inf')
+        print(f"{table:<25}{rows:>10}{seconds:>10.3f}{rate:>12.0f}")
+
+# Every thread keeps its own random generator, so the population stages can run in parallel
+thread_state = threading.local()
+
+# Seed of the run, with None every run generates a different dataset
+SEED = None
+
+# Date the birthdates and ages of the cooks are counted back from, fixed so that a seed gives the same cooks on any day
+REFERENCE_DATE = datetime(2024, 1, 1)
+
+# 'python' draws every value with the random generator of the stage, 'numpy' draws the numeric columns and the
+# samples without replacement of the largest tables as whole arrays with the NumPy generator of the stage
+GENERATOR_MODE = 'python'
+
+# Function to give the current thread the random generator of a stage, seeded from the run seed and the stage name,
+# so a stage draws the same values whether it runs alone or next to other stages
+def seed_stage(stage_name):
+    thread_state.random = random.Random(f"{SEED}:{stage_name}" if SEED is not None else None)
+    if GENERATOR_MODE == 'numpy':
+        seed = int.from_bytes(hashlib.sha256(f"{SEED}:{stage_name}".encode()).digest()[:8], 'big') if SEED is not None else None
+        thread_state.numpy_random = numpy.random.default_rng(seed)
+
+# Function to get the random generator of the current stage, the random module itself outside of a stage
+def stage_random():
+    return getattr(thread_state, "random", random)
+
+# Function to get the NumPy generator of the current stage, an unseeded one outside of a stage
+def stage_numpy_random():
+    nrng = getattr(thread_state, "numpy_random", None)
+    return nrng if nrng is not None else numpy.random.default_rng()
 
 # Function to reset auto-increment ID to start from 1
 def reset_auto_increment(table_name):
     query = f"ALTER TABLE {table_name} AUTO_INCREMENT = 1"
-    execute_query(conn, query)
+    execute_query(get_conn(), query)
 
 # Function to delete existing contents of a table
 def delete_existing_data(table_name):
     query = f"DELETE FROM {table_name}"
-    execute_query(conn, query)
+    execute_query(get_conn(), query)
+
+# 'delete' empties every table of ddl.sql with DELETE and resets its AUTO_INCREMENT one statement at a time,
+# 'truncate' truncates every table of ddl.sql with the foreign key checks off,
+# 'rebuild' drops the schema and runs ddl.sql again
+RESET_MODE = 'delete'
+
+# Function to truncate every table of ddl.sql, children before their parents,
+# TRUNCATE drops and recreates the table so it also resets AUTO_INCREMENT
+def truncate_tables():
+    with query_cursor() as cursor:
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        try:
+            for table in reversed(dependency_order(foreign_key_graph())):
+                cursor.execute(f"TRUNCATE TABLE {table}")
+        finally:
+            cursor.execute("SET SESSION foreign_key_checks = 1")
+
+# Function to list the tables the triggers of ddl.sql write when another table is written
+def trigger_tables():
+    dependencies = SchemaDependencies()
+    tables = set()
+    for table in dependencies.tables:
+        tables |= dependencies.table_writes(table) - {table}
+    return tables
+
+# Function to delete the rows of every table of ddl.sql and reset its AUTO_INCREMENT, children before their parents.
+# The tables the triggers write come after all the others, so the rows the delete triggers of their source tables
+# write (e.g. the negative counts of tag_pair_count) are deleted too; the foreign keys of those tables cascade.
+# The bulk flags skip the tag pair and calorie triggers meanwhile, like during a bulk load.
+# episode_winner, which declare_winners writes, goes with them, and so does episode_winner_dirty: it has no foreign key,
+# so the episodes it marked would otherwise survive the reset and be matched against the renumbered episodes.
+def delete_tables():
+    order = list(reversed(dependency_order(foreign_key_graph())))
+    derived = trigger_tables() | {"episode_winner", "episode_winner_dirty"}
+    with bulk_flag("bulk_tag_pairs"), bulk_flag("bulk_recipe_calories"):
+        for table in [table for table in order if table not in derived] + [table for table in order if table in derived]:
+            delete_existing_data(table)
+            reset_auto_increment(table)
+
+# Function to drop the schema and create it again from ddl.sql, with its triggers, views, procedures and users
+def rebuild_schema():
+    connection = get_conn()
+    with query_cursor(connection) as cursor:
+        for statement in iter_statements():
+            cursor.execute(statement)
+        connection.commit()
+
+# Function to empty the database before it is populated, it returns the seconds the reset took
+def reset_tables(mode=None):
+    mode = mode or RESET_MODE
+    start = time.perf_counter()
+    if mode == 'truncate':
+        truncate_tables()
+    elif mode == 'rebuild':
+        rebuild_schema()
+    else:
+        delete_tables()
+    bump_all_tables()
+    return time.perf_counter() - start
+
+# Entity counts of the original dataset, every one of them is multiplied by the scale factor
+BASE_COOKS = 50
+BASE_CUISINES = 20
+BASE_SEASONS = 5
+EPISODES_PER_SEASON = 10
+
+# Function to compute the entity counts for a TPC-style scale factor
+# ingredients and recipes are replicated, so every replica keeps the relationships of the original dataset
+def scaled_sizes(scale_factor):
+    return {
+        "cooks": BASE_COOKS * scale_factor,
+        "cuisines": BASE_CUISINES * scale_factor,
+        "ingredient_replicas": scale_factor,
+        "recipe_replicas": scale_factor,
+        "seasons": BASE_SEASONS * scale_factor,
+    }
+
+# Function to give the copies of a short title made for scale factors above 1 a unique name with a replica number
+def replica_title(title, replica):
+    if replica == 0:
+        return title
+    return f"{title} #{replica + 1}"
 
 # Function to generate random usernames and passwords
 def generate_random_string(length):
+    rng = stage_random()
     letters = string.ascii_letters + string.digits
-    return ''.join(random.choice(letters) for i in range(length))
-
-def generate_random_url():
-    return ''.join(random.choices(string.ascii_lowercase + string.digits, k=20))
+    return ''.join(rng.choice(letters) for i in range(length))
 
 # Function to generate dummy data for cook table
 def generate_dummy_cooks(num_cooks):
+    rng = stage_random()
     # List of standard first and last names
     first_names = ['John', 'Emma', 'Michael', 'Sophia', 'William', 'Olivia', 'James', 'Amelia', 'Benjamin', 'Isabella', 'Daniel', 'Mia', 'Matthew', 'Charlotte', 'Jackson', 'Evelyn', 'Samuel', 'Harper', 'David', 'Abigail']
     last_names = ['Smith', 'Johnson', 'Williams', 'Jones', 'Brown', 'Davis', 'Miller', 'Wilson', 'Moore', 'Taylor', 'Anderson', 'Thomas', 'Jackson', 'White', 'Harris', 'Martin', 'Thompson', 'Garcia', 'Martinez', 'Robinson']
 
-    # Generate permutations of first and last names to create unique combinations
-    name_combinations = list(product(first_names, last_names))
-
-    query = "INSERT INTO cook (first_name, last_name, phone_number, birthdate, age, yrs_of_exp, episode_count, cook_rank) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
-    for i in range(num_cooks):
-        first_name, last_name = random.choice(name_combinations)
-        phone_number = f"{random.randint(1000000000, 9999999999)}"
-        birthdate = datetime.now() - timedelta(days=random.randint(20*365, 60*365))
-        age = datetime.now().year - birthdate.year
-        max_years_of_exp = age - 18
-        yrs_of_exp = random.randint(1, max_years_of_exp)
-        episode_count = 0  # Set episode count to 0
-        cook_rank = random.choice(['A cook', 'B cook', 'C cook', 'Chef Assistant', 'Chef'])
-        data = (first_name, last_name, phone_number, birthdate, age, yrs_of_exp, episode_count, cook_rank)
-        execute_query(conn, query, data)
+    # Every combination of a first and a last name is addressed by an index into their product,
+    # so no list of combinations is built. The indexes go through a keyed permutation, so every combination
+    # is used once before any of them repeats
+    num_combinations = len(first_names) * len(last_names)
+    name_indexes = FeistelPermutation(num_combinations, rng.getrandbits(64))
+    # the phone numbers are a keyed permutation of all the 10 digit numbers, so no two cooks get the same one
+    phone_numbers = UniqueIntegers(1000000000, 9999999999, rng.getrandbits(64))
+
+    columns = ["first_name", "last_name", "phone_number", "birthdate", "age", "yrs_of_exp", "episode_count", "cook_rank"]
+    with table_writer("cook", columns) as writer:
+        if GENERATOR_MODE == 'numpy':
+            write_cook_columns(writer, num_cooks, first_names, last_names, name_indexes, phone_numbers)
+            return
+        for i in range(num_cooks):
+            name_index = name_indexes(i % num_combinations)
+            first_name = first_names[name_index // len(last_names)]
+            last_name = last_names[name_index % len(last_names)]
+            phone_number = f"{phone_numbers[i]}"
+            birthdate = REFERENCE_DATE - timedelta(days=rng.randint(20*365, 60*365))
+            age = REFERENCE_DATE.year - birthdate.year
+            max_years_of_exp = age - 18
+            yrs_of_exp = rng.randint(1, max_years_of_exp)
+            episode_count = 0  # Set episode count to 0
+            cook_rank = rng.choice(['A cook', 'B cook', 'C cook', 'Chef Assistant', 'Chef'])
+            data = (first_name, last_name, phone_number, birthdate, age, yrs_of_exp, episode_count, cook_rank)
+            writer.add(data)
 
 # Define gear data
 gear_data = [
@@ -156,9 +521,7 @@ gear_data = [
 
 # Function to insert gear data into the database
 def insert_gear_data(gear_data):
-    query = "INSERT INTO gear (title, instructions) VALUES (%s, %s)"
-    for gear in gear_data:
-        execute_query(conn, query, gear)
+    insert_rows("gear", ["title", "instructions"], gear_data)
 
 # Food group data with English titles and small descriptions
 food_group_data = [
@@ -178,9 +541,7 @@ food_group_data = [
 
 # Function to generate dummy data for food_group table
 def generate_dummy_food_groups(food_group_data):
-    query = "INSERT INTO food_group (title, small_description) VALUES (%s, %s)"
-    for food_group in food_group_data:
-        execute_query(conn, query, food_group)
+    insert_rows("food_group", ["title", "small_description"], food_group_data)
 
 # List of sample cuisine names for the national_cuisine table
 cuisine_names = [
@@ -192,222 +553,497 @@ cuisine_names = [
 ]
 
 # Function to generate dummy data for national_cuisine table
+# above BASE_CUISINES the names repeat in blocks of BASE_CUISINES with a replica number,
+# so the cuisine ids of every replica line up with the recipes of the same replica
 def generate_dummy_cuisines(num_cuisines):
-    # Ensure there are enough cuisine names to cover the requested number of dummy entries
-    if num_cuisines > len(cuisine_names):
-        raise ValueError("Not enough unique cuisine names available. Reduce the number of dummy entries or add more cuisine names.")
-
     # Generate and insert cuisines
-    query = "INSERT INTO national_cuisine (cuisine_name, episode_count) VALUES (%s, %s)"
-    for i in range(num_cuisines):
-        cuisine_name = cuisine_names[i]
-        episode_count = 0
-        data = (cuisine_name, episode_count)
-        execute_query(conn, query, data)
+    with table_writer("national_cuisine", ["cuisine_name", "episode_count"]) as writer:
+        for i in range(num_cuisines):
+            cuisine_name = replica_title(cuisine_names[i % BASE_CUISINES], i // BASE_CUISINES)
+            episode_count = 0
+            data = (cuisine_name, episode_count)
+            writer.add(data)
+
+
+# Sample ingredients data with titles, kcal_per_100, and corresponding food group names
+ingredients_data = [
+    ("Apple", 52, 10), ("Banana", 89, 10), ("Carrot", 41, 10), ("Spinach", 23, 10),
+    ("Rice", 130, 9), ("Bread", 265, 9), ("Milk", 42, 6), ("Cheese", 402, 6),
+    ("Chicken", 165, 7), ("Meat", 180, 7), ("Kebab", 215, 7), ("Veal", 170, 7), ("Pork", 220, 7), ("Chicken Wings", 165, 7), ("Salmon", 208, 8), ("Fish", 208, 8), ("Clam", 208, 8), ("Lettuce", 15, 10),
+    ("Tomato", 18, 10), ("Onion", 40, 10), ("Potato", 77, 10), ("Broccoli", 34, 10),
+    ("Egg", 155, 6), ("Beef", 250, 7), ("Shrimp", 99, 8), ("Pasta", 131, 9),
+    ("Olive Oil", 884, 5), ("Lemon", 29, 1), ("Garlic", 149, 1), ("Honey", 304, 4),
+    ("Cucumber", 15, 10), ("Avocado", 160, 10), ("Yogurt", 61, 6), ("Oats", 389, 9),
+    ("Cabbage", 25, 10), ("Green Beans", 31, 10), ("Bell Pepper", 31, 10),
+    ("Lime", 30, 1), ("Pineapple", 50, 10), ("Strawberry", 32, 10), ("Blueberry", 57, 10),
+    ("Kiwi", 61, 10), ("Peach", 39, 10), ("Grapes", 69, 10), ("Watermelon", 30, 10),
+    ("Cherry", 50, 10), ("Mango", 60, 10), ("Pear", 57, 10), ("Pumpkin", 26, 10),
+    ("Zucchini", 17, 10), ("Corn", 86, 10), ("Artichoke", 47, 10), ("Asparagus", 20, 10),
+    ("Celery", 16, 10), ("Beetroot", 43, 10), ("Cauliflower", 25, 10), ("Radish", 16, 10),
+    ("Eggplant", 25, 10), ("Green Onion", 32, 10), ("Sweet Potato", 86, 10), ("Squash", 45, 10),
+    ("Turnip", 28, 10), ("Parsnip", 75, 10), ("Rutabaga", 35, 10), ("Leek", 61, 10),
+    ("Swiss Chard", 19, 10), ("Kale", 35, 10), ("Arugula", 25, 10), ("Collard Greens", 33, 10),
+    ("Mustard Greens", 27, 10), ("Endive", 17, 10), ("Chard", 19, 10), ("Iceberg Lettuce", 14, 10),
+    ("Romaine Lettuce", 17, 10), ("Feta Cheese", 264, 6), ("Parmesan Cheese", 420, 6),
+    ("Brie Cheese", 334, 6), ("Gouda Cheese", 356, 6), ("Cheddar Cheese", 402, 6),
+    ("Mozzarella Cheese", 280, 6), ("Almonds", 579, 10), ("Walnuts", 654, 10), ("Cashews", 553, 10), ("Peanuts", 567, 10),
+    ("Pistachios", 562, 10), ("Brazil Nuts", 656, 10),
+    ("Pecans", 691, 10), ("Macadamia Nuts", 718, 10), ("Sunflower Seeds", 584, 10),
+    ("Pumpkin Seeds", 559, 10), ("Chia Seeds", 486, 10), ("Flaxseeds", 534, 10),
+    ("Quinoa", 120, 9), ("Barley", 354, 9), ("Buckwheat", 343, 9), ("Millet", 378, 9),
+    ("Sorghum", 329, 9), ("Amaranth", 371, 9), ("Triticale", 339, 9), ("Spelt", 338, 9),
+    ("Teff", 367, 9), ("Farro", 329, 9), ("Rye", 338, 9), ("Couscous", 112, 9),
+    ("Semolina", 360, 9), ("Wild Rice", 357, 9), ("Coconut Rice", 357, 9), ("Popcorn", 375, 9), ("White Beans", 337, 10),
+    ("Black Beans", 341, 10), ("Kidney Beans", 337, 10), ("Lentils", 116, 10),
+    ("Chickpeas", 164, 10), ("Soybeans", 173, 10), ("Edamame", 122, 10), ("Tofu", 145, 10),
+    ("Tempeh", 193, 10), ("Seitan", 370, 10), ("Textured Vegetable Protein", 341, 10),
+    ("Soy Milk", 33, 6), ("Almond Milk", 15, 6), ("Coconut Milk", 230, 6),
+    ("Oat Milk", 45, 6), ("Rice Milk", 47, 6), ("Cashew Milk", 22, 6),
+    ("Hemp Milk", 46, 6), ("Hazelnut Milk", 28, 6), ("Pea Milk", 40, 6),
+    ("Sunflower Milk", 50, 6), ("Banana Milk", 89, 6), ("Avocado Oil", 884, 5),
+    ("Coconut Oil", 862, 5), ("Peanut Oil", 884, 5), ("Sesame Oil", 884, 5),
+    ("Canola Oil", 884, 5), ("Sunflower Oil", 884, 5), ("Grapeseed Oil", 884, 5),
+    ("Flaxseed Oil", 884, 5), ("Hempseed Oil", 884, 5), ("Rice Bran Oil", 884, 5),
+    ("Walnut Oil", 884, 5), ("Macadamia Oil", 884, 5), ("Safflower Oil", 884, 5), ("Coconut", 354, 10),
+    ("Sesame Seeds", 573, 10), ("Hemp Seeds", 553, 10), ("Poppy Seeds", 525, 10),
+    ("Wheatberries", 339, 9), ("Brown Rice", 111, 9), ("Black Rice", 347, 9), ("Basmati Rice", 121, 9),
+    ("Jasmine Rice", 130, 9), ("Arborio Rice", 97, 9), ("Carnaroli Rice", 121, 9), ("Sushi Rice", 135, 9),
+    ("Long-Grain Rice", 130, 9), ("Short-Grain Rice", 130, 9), ("White Rice", 130, 9), ("Pearled Barley", 354, 9),
+    ("Whole Wheat Pasta", 124, 9), ("Wheat Noodles", 124, 9), ("Brown Rice Pasta", 124, 9), ("Quinoa Pasta", 131, 9), ("Chickpea Pasta", 164, 9),
+    ("Lentil Pasta", 107, 9), ("Soybean Pasta", 173, 9), ("Edamame Pasta", 122, 9), ("Buckwheat Pasta", 143, 9),
+    ("Spaghetti Squash", 31, 10), ("Zucchini Noodles", 17, 10), ("Carrot Noodles", 41, 10), ("Butter", 45, 10),
+    ("Sweet Potato Noodles", 86, 10), ("Red Lentil Pasta", 107, 9), ("Black Bean Pasta", 341, 9),
+    ("Shirataki Noodles", 2, 10), ("Kelp Noodles", 6, 10), ("Miracle Noodles", 3, 10), ("Tofu Shirataki Noodles", 40, 10),
+    ("Soba Noodles", 99, 9), ("Udon Noodles", 140, 9), ("Rice Noodles", 192, 9), ("Pad Thai Noodles", 192, 9),
+    ("Glass Noodles", 181, 9), ("Egg Noodles", 138, 9), ("Ramen Noodles", 188, 9), ("Somen Noodles", 132, 9),
+    ("Wonton Noodles", 200, 9), ("Lo Mein Noodles", 211, 9), ("Fettuccine", 357, 9), ("Tagliatelle", 364, 9), ("Pappardelle", 384, 9), ("Rigatoni", 357, 9), ("Farfalle", 360, 9), ("Cavatappi", 357, 9),
+    ("Gemelli", 357, 9), ("Conchiglie", 357, 9), ("Tortellini", 384, 9), ("Rotini", 357, 9),
+    ("Orzo", 357, 9), ("Ditalini", 357, 9), ("Acini de Pepe", 357, 9), ("Cannelloni", 357, 9),
+    ("Manicotti", 357, 9), ("Lasagna", 357, 9), ("Ravioli", 384, 9), ("Stuffed Shells", 357, 9),
+    ("Macaroni", 357, 9), ("Penne", 357, 9), ("Spaghetti", 357, 9), ("Curry", 40, 10), ("Sauerkraut", 19, 3), ("Ladyfingers", 302, 11), ("Peppers", 40, 10),
+    ("Puff Pastry", 558, 9), ("Chocolate", 546, 11), ("Duck", 337, 7),
+    ("Dough", 200, 9), ("Green curry paste", 125, 1), ("Sponge", 297, 11),
+    ("Flour", 364, 9), ("Corn Tortillas", 218, 9), ("Catfish", 105, 8),
+    ("Pastry", 406, 9), ("Beets", 43, 10), ("Cream Cheese", 342, 6),
+    ("Rice Flour", 366, 9), ("Custard", 122, 11), ("Paneer", 265, 6),
+    ("Lamb", 294, 7), ("Leafy Greens", 23, 10), ("Milk Solids", 502, 6),
+    ("Octopus", 207, 8), ("Squid", 150, 8), ("Tea Powder", 73 , 10), ("Sausage", 450, 7),
+    ("Maple Syrup", 140, 10), ("Bacon", 320, 7), ("Sugar", 387, 10)
+]
 
 
 # Function to generate dummy data for ingredients
-def generate_dummy_ingredients(num_ingredients):
-    # Sample ingredients data with titles, kcal_per_100, and corresponding food group names
-    ingredients_data = [
-        ("Apple", 52, 10), ("Banana", 89, 10), ("Carrot", 41, 10), ("Spinach", 23, 10),
-        ("Rice", 130, 9), ("Bread", 265, 9), ("Milk", 42, 6), ("Cheese", 402, 6),
-        ("Chicken", 165, 7), ("Meat", 180, 7), ("Kebab", 215, 7), ("Veal", 170, 7), ("Pork", 220, 7), ("Chicken Wings", 165, 7), ("Salmon", 208, 8), ("Fish", 208, 8), ("Clam", 208, 8), ("Lettuce", 15, 10),
-        ("Tomato", 18, 10), ("Onion", 40, 10), ("Potato", 77, 10), ("Broccoli", 34, 10),
-        ("Egg", 155, 6), ("Beef", 250, 7), ("Shrimp", 99, 8), ("Pasta", 131, 9),
-        ("Olive Oil", 884, 5), ("Lemon", 29, 1), ("Garlic", 149, 1), ("Honey", 304, 4),
-        ("Cucumber", 15, 10), ("Avocado", 160, 10), ("Yogurt", 61, 6), ("Oats", 389, 9),
-        ("Cabbage", 25, 10), ("Green Beans", 31, 10), ("Bell Pepper", 31, 10),
-        ("Lime", 30, 1), ("Pineapple", 50, 10), ("Strawberry", 32, 10), ("Blueberry", 57, 10),
-        ("Kiwi", 61, 10), ("Peach", 39, 10), ("Grapes", 69, 10), ("Watermelon", 30, 10),
-        ("Cherry", 50, 10), ("Mango", 60, 10), ("Pear", 57, 10), ("Pumpkin", 26, 10),
-        ("Zucchini", 17, 10), ("Corn", 86, 10), ("Artichoke", 47, 10), ("Asparagus", 20, 10),
-        ("Celery", 16, 10), ("Beetroot", 43, 10), ("Cauliflower", 25, 10), ("Radish", 16, 10),
-        ("Eggplant", 25, 10), ("Green Onion", 32, 10), ("Sweet Potato", 86, 10), ("Squash", 45, 10),
-        ("Turnip", 28, 10), ("Parsnip", 75, 10), ("Rutabaga", 35, 10), ("Leek", 61, 10),
-        ("Swiss Chard", 19, 10), ("Kale", 35, 10), ("Arugula", 25, 10), ("Collard Greens", 33, 10),
-        ("Mustard Greens", 27, 10), ("Endive", 17, 10), ("Chard", 19, 10), ("Iceberg Lettuce", 14, 10),
-        ("Romaine Lettuce", 17, 10), ("Feta Cheese", 264, 6), ("Parmesan Cheese", 420, 6),
-        ("Brie Cheese", 334, 6), ("Gouda Cheese", 356, 6), ("Cheddar Cheese", 402, 6),
-        ("Mozzarella Cheese", 280, 6), ("Almonds", 579, 10), ("Walnuts", 654, 10), ("Cashews", 553, 10), ("Peanuts", 567, 10),
-        ("Pistachios", 562, 10), ("Brazil Nuts", 656, 10),
-        ("Pecans", 691, 10), ("Macadamia Nuts", 718, 10), ("Sunflower Seeds", 584, 10),
-        ("Pumpkin Seeds", 559, 10), ("Chia Seeds", 486, 10), ("Flaxseeds", 534, 10),
-        ("Quinoa", 120, 9), ("Barley", 354, 9), ("Buckwheat", 343, 9), ("Millet", 378, 9),
-        ("Sorghum", 329, 9), ("Amaranth", 371, 9), ("Triticale", 339, 9), ("Spelt", 338, 9),
-        ("Teff", 367, 9), ("Farro", 329, 9), ("Rye", 338, 9), ("Couscous", 112, 9),
-        ("Semolina", 360, 9), ("Wild Rice", 357, 9), ("Coconut Rice", 357, 9), ("Popcorn", 375, 9), ("White Beans", 337, 10),
-        ("Black Beans", 341, 10), ("Kidney Beans", 337, 10), ("Lentils", 116, 10),
-        ("Chickpeas", 164, 10), ("Soybeans", 173, 10), ("Edamame", 122, 10), ("Tofu", 145, 10),
-        ("Tempeh", 193, 10), ("Seitan", 370, 10), ("Textured Vegetable Protein", 341, 10),
-        ("Soy Milk", 33, 6), ("Almond Milk", 15, 6), ("Coconut Milk", 230, 6),
-        ("Oat Milk", 45, 6), ("Rice Milk", 47, 6), ("Cashew Milk", 22, 6),
-        ("Hemp Milk", 46, 6), ("Hazelnut Milk", 28, 6), ("Pea Milk", 40, 6),
-        ("Sunflower Milk", 50, 6), ("Banana Milk", 89, 6), ("Avocado Oil", 884, 5),
-        ("Coconut Oil", 862, 5), ("Peanut Oil", 884, 5), ("Sesame Oil", 884, 5),
-        ("Canola Oil", 884, 5), ("Sunflower Oil", 884, 5), ("Grapeseed Oil", 884, 5),
-        ("Flaxseed Oil", 884, 5), ("Hempseed Oil", 884, 5), ("Rice Bran Oil", 884, 5),
-        ("Walnut Oil", 884, 5), ("Macadamia Oil", 884, 5), ("Safflower Oil", 884, 5), ("Coconut", 354, 10),
-        ("Sesame Seeds", 573, 10), ("Hemp Seeds", 553, 10), ("Poppy Seeds", 525, 10),
-        ("Wheatberries", 339, 9), ("Brown Rice", 111, 9), ("Black Rice", 347, 9), ("Basmati Rice", 121, 9),
-        ("Jasmine Rice", 130, 9), ("Arborio Rice", 97, 9), ("Carnaroli Rice", 121, 9), ("Sushi Rice", 135, 9),
-        ("Long-Grain Rice", 130, 9), ("Short-Grain Rice", 130, 9), ("White Rice", 130, 9), ("Pearled Barley", 354, 9),
-        ("Whole Wheat Pasta", 124, 9), ("Wheat Noodles", 124, 9), ("Brown Rice Pasta", 124, 9), ("Quinoa Pasta", 131, 9), ("Chickpea Pasta", 164, 9),
-        ("Lentil Pasta", 107, 9), ("Soybean Pasta", 173, 9), ("Edamame Pasta", 122, 9), ("Buckwheat Pasta", 143, 9),
-        ("Spaghetti Squash", 31, 10), ("Zucchini Noodles", 17, 10), ("Carrot Noodles", 41, 10), ("Butter", 45, 10),
-        ("Sweet Potato Noodles", 86, 10), ("Red Lentil Pasta", 107, 9), ("Black Bean Pasta", 341, 9),
-        ("Shirataki Noodles", 2, 10), ("Kelp Noodles", 6, 10), ("Miracle Noodles", 3, 10), ("Tofu Shirataki Noodles", 40, 10),
-        ("Soba Noodles", 99, 9), ("Udon Noodles", 140, 9), ("Rice Noodles", 192, 9), ("Pad Thai Noodles", 192, 9),
-        ("Glass Noodles", 181, 9), ("Egg Noodles", 138, 9), ("Ramen Noodles", 188, 9), ("Somen Noodles", 132, 9),
-        ("Wonton Noodles", 200, 9), ("Lo Mein Noodles", 211, 9), ("Fettuccine", 357, 9), ("Tagliatelle", 364, 9), ("Pappardelle", 384, 9), ("Rigatoni", 357, 9), ("Farfalle", 360, 9), ("Cavatappi", 357, 9),
-        ("Gemelli", 357, 9), ("Conchiglie", 357, 9), ("Tortellini", 384, 9), ("Rotini", 357, 9),
-        ("Orzo", 357, 9), ("Ditalini", 357, 9), ("Acini de Pepe", 357, 9), ("Cannelloni", 357, 9),
-        ("Manicotti", 357, 9), ("Lasagna", 357, 9), ("Ravioli", 384, 9), ("Stuffed Shells", 357, 9),
-        ("Macaroni", 357, 9), ("Penne", 357, 9), ("Spaghetti", 357, 9), ("Curry", 40, 10), ("Sauerkraut", 19, 3), ("Ladyfingers", 302, 11), ("Peppers", 40, 10),
-        ("Puff Pastry", 558, 9), ("Chocolate", 546, 11), ("Duck", 337, 7),
-        ("Dough", 200, 9), ("Green curry paste", 125, 1), ("Sponge", 297, 11),
-        ("Flour", 364, 9), ("Corn Tortillas", 218, 9), ("Catfish", 105, 8),
-        ("Pastry", 406, 9), ("Beets", 43, 10), ("Cream Cheese", 342, 6),
-        ("Rice Flour", 366, 9), ("Custard", 122, 11), ("Paneer", 265, 6),
-        ("Lamb", 294, 7), ("Leafy Greens", 23, 10), ("Milk Solids", 502, 6),
-        ("Octopus", 207, 8), ("Squid", 150, 8), ("Tea Powder", 73 , 10), ("Sausage", 450, 7),
-        ("Maple Syrup", 140, 10), ("Bacon", 320, 7), ("Sugar", 387, 10)
-    ]
-
-
-    query = "INSERT INTO ingredient (title, kcal_per_100, food_group_id) VALUES (%s, %s, %s)"
-    for ingredient_data in ingredients_data:
-        execute_query(conn, query, ingredient_data)
-
-
-def generate_dummy_recipes_from_json(json_file):
+# every replica after the first one repeats the sample ingredients with a synthetic title
+def generate_dummy_ingredients(num_replicas):
+    titles = SyntheticTitles(num_replicas, stage_random().getrandbits(64))
+    with table_writer("ingredient", ["title", "kcal_per_100", "food_group_id"]) as writer:
+        for replica in range(num_replicas):
+            for title, kcal_per_100, food_group_id in ingredients_data:
+                data = (titles.title(title, replica), kcal_per_100, food_group_id)
+                writer.add(data)
+
+
+# Characters read from a JSON file at a time by iter_json_array
+JSON_CHUNK_SIZE = 64 * 1024
+
+# Function to read the objects of a JSON array one by one, without loading the whole file,
+# so recipe catalogues of any size are parsed with memory bounded by the size of a single recipe
+def iter_json_array(json_file):
+    decoder = json.JSONDecoder()
     with open(json_file, 'r') as file:
-        recipes = json.load(file)
-
-    query = """INSERT INTO recipe 
-               (is_dessert, difficulty, title, small_description, tips, preparation_mins, cooking_mins, total_time, category, 
-                serving_size_in_grams, servings, episode_count, national_cuisine_id, basic_ingredient_id)
-               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""  # Adjusted number of placeholders
-
-    for recipe in recipes:
-        is_dessert = recipe.get('is_dessert', False)  # Default to False if not specified
-        difficulty = random.randint(1, 5)
-        title = recipe['name']
-        small_description = recipe.get('description', '')[:300]  # Truncate to fit column limit
-        tips = recipe.get('tips', '')[:400]  # Truncate to fit column limit
-        preparation_mins = random.randint(30, 400)
-        diff = random.randint(5, 15)
-        cooking_mins = preparation_mins - diff
-        total_time = None
-        category = None  # Ensure category is set correctly or excluded if not used
-        serving_size_in_grams = random.randint(50, 350)
-        servings = random.randint(1, 4)
-        episode_count = 0  # Default to 0
-        national_cuisine_id = int(recipe['national_cuisine'])
-        basic_ingredient_id = int(recipe['main_ingredient'])
-
-        data = (is_dessert, difficulty, title, small_description, tips, preparation_mins, cooking_mins, total_time,
-                category, serving_size_in_grams, servings, episode_count, national_cuisine_id, basic_ingredient_id)
-
-        execute_query(conn, query, data)
-
+        buffer = ''
+        at_end = False
+        started = False
+        while True:
+            buffer = buffer.lstrip()
+            try:
+                if not started:
+                    if buffer[:1] == '[':
+                        buffer = buffer[1:]
+                        started = True
+                        continue
+                    if buffer:
+                        raise ValueError(f"{json_file} does not contain a JSON array")
+                elif buffer[:1] == ']':
+                    return
+                elif buffer[:1] == ',':
+                    buffer = buffer[1:]
+                    continue
+                elif buffer:
+                    item, end = decoder.raw_decode(buffer)
+                    buffer = buffer[end:]
+                    yield item
+                    continue
+            except json.JSONDecodeError:
+                # the object continues in the next chunk
+                if at_end:
+                    raise
+            if at_end:
+                raise ValueError(f"{json_file} ends before its JSON array is closed")
+            chunk = file.read(JSON_CHUNK_SIZE)
+            at_end = chunk == ''
+            buffer += chunk
+
+
+# every replica after the first one points to the cuisines and ingredients of the same replica
+# 'python' resolves the category of every recipe from the food group of its basic ingredient before it is written,
+# 'trigger' leaves it NULL so that the update_recipe_category trigger looks it up for every row
+CATEGORY_MODE = 'python'
+
+def generate_dummy_recipes_from_json(json_file, num_replicas=1):
+    rng = stage_random()
+    titles = SyntheticTitles(num_replicas, rng.getrandbits(64))
+    ingredient_categories = get_ingredient_categories() if CATEGORY_MODE == 'python' else {}
+    columns = ["is_dessert", "difficulty", "title", "small_description", "tips", "preparation_mins", "cooking_mins", "total_time", "category",
+               "serving_size_in_grams", "servings", "episode_count", "national_cuisine_id", "basic_ingredient_id"]
+
+    with table_writer("recipe", columns) as writer:
+        if GENERATOR_MODE == 'numpy':
+            write_recipe_columns(writer, json_file, num_replicas, ingredient_categories, titles)
+            return
+        for replica in range(num_replicas):
+            for recipe in iter_json_array(json_file):
+                is_dessert = recipe.get('is_dessert', False)  # Default to False if not specified
+                difficulty = rng.randint(1, 5)
+                title = titles.title(recipe['name'], replica)
+                small_description = recipe.get('description', '')[:300]  # Truncate to fit column limit
+                tips = recipe.get('tips', '')[:400]  # Truncate to fit column limit
+                preparation_mins = rng.randint(30, 400)
+                diff = rng.randint(5, 15)
+                cooking_mins = preparation_mins - diff
+                total_time = None
+                serving_size_in_grams = rng.randint(50, 350)
+                servings = rng.randint(1, 4)
+                episode_count = 0  # Default to 0
+                national_cuisine_id = int(recipe['national_cuisine']) + replica * BASE_CUISINES
+                basic_ingredient_id = int(recipe['main_ingredient']) + replica * len(ingredients_data)
+                category = ingredient_categories.get(basic_ingredient_id)  # None leaves it to the trigger
+
+                data = (is_dessert, difficulty, title, small_description, tips, preparation_mins, cooking_mins, total_time,
+                        category, serving_size_in_grams, servings, episode_count, national_cuisine_id, basic_ingredient_id)
+
+                writer.add(data)
+
+
+
+
+
+### Vectorized generation, used by the generators above in the 'numpy' generator mode
+
+
+# Rows drawn together by the NumPy generators
+VECTOR_ROWS = 50000
+
+# Random keys drawn together by sample_rows, a chunk of rows sampling from a population of n values has
+# at most VECTOR_CELLS / n rows
+VECTOR_CELLS = 4000000
+
+# Largest population sample_rows draws from with random keys, larger ones are drawn from with replacement
+SAMPLE_KEYS_LIMIT = 1000
+
+# Function to read a sequence of ids (a range, a list or a ColumnStream) into a NumPy array
+def id_array(ids):
+    return numpy.fromiter(ids, dtype=numpy.int64)
+
+# Function to split a sequence of ids into arrays of at most size ids, without reading it all at once
+def id_chunks(ids, size):
+    ids = iter(ids)
+    while True:
+        chunk = numpy.fromiter(islice(ids, size), dtype=numpy.int64)
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+# Function to get the rows of a chunk that samples from a population, so that its random keys fit in VECTOR_CELLS
+def sample_chunk_rows(population):
+    if len(population) > SAMPLE_KEYS_LIMIT:
+        return VECTOR_ROWS
+    return max(1, min(VECTOR_ROWS, VECTOR_CELLS // max(len(population), 1)))
+
+# Function to draw counts[i] distinct values of the population for every row i, like a random.sample call per row
+# it returns the row of every drawn value and the drawn values, row after row
+def sample_rows(nrng, population, counts):
+    most = int(counts.max())
+    if most > len(population):
+        raise ValueError("Sample larger than population")
+    taken = numpy.arange(most) < counts[:, None]
+    if len(population) <= SAMPLE_KEYS_LIMIT:
+        # every row gives every value a random key and keeps the values with its counts[i] smallest keys
+        keys = nrng.random((len(counts), len(population)))
+        chosen = numpy.argpartition(keys, most - 1, axis=1)[:, :most]
+    else:
+        # the values are drawn with replacement and the rows that drew a value twice are drawn again,
+        # the unused positions of a row get distinct negative values so they never count as a repeat
+        chosen = nrng.integers(len(population), size=(len(counts), most))
+        padding = -1 - numpy.arange(most)
+        while True:
+            ordered = numpy.sort(numpy.where(taken, chosen, padding), axis=1)
+            repeated = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+            if not repeated.any():
+                break
+            chosen[repeated] = nrng.integers(len(population), size=(int(repeated.sum()), most))
+    return numpy.nonzero(taken)[0], population[chosen[taken]]
+
+def write_cook_columns(writer, num_cooks, first_names, last_names, name_indexes, phone_numbers):
+    nrng = stage_numpy_random()
+    first_names = numpy.array(first_names)
+    last_names = numpy.array(last_names)
+    cook_ranks = numpy.array(['A cook', 'B cook', 'C cook', 'Chef Assistant', 'Chef'])
+    for start in range(0, num_cooks, VECTOR_ROWS):
+        size = min(VECTOR_ROWS, num_cooks - start)
+        name_index = name_indexes.permute_array(numpy.arange(start, start + size) % (len(first_names) * len(last_names)))
+        name_index = name_index.astype(numpy.int64)
+        birthdates = numpy.datetime64(REFERENCE_DATE, 'us') - nrng.integers(20*365, 60*365, size=size, endpoint=True).astype('timedelta64[D]')
+        ages = REFERENCE_DATE.year - (birthdates.astype('datetime64[Y]').astype(numpy.int64) + 1970)
+        yrs_of_exp = nrng.integers(1, ages - 18, endpoint=True)
+        writer.add_columns(first_names[name_index // len(last_names)], last_names[name_index % len(last_names)],
+                           phone_numbers.array(start, size).astype(str), birthdates, ages, yrs_of_exp, [0] * size,
+                           cook_ranks[nrng.integers(len(cook_ranks), size=size)])
+
+def write_recipe_columns(writer, json_file, num_replicas, ingredient_categories, titles):
+    nrng = stage_numpy_random()
+    for replica in range(num_replicas):
+        recipes = iter_json_array(json_file)
+        while True:
+            chunk = list(islice(recipes, VECTOR_ROWS))
+            if not chunk:
+                break
+            size = len(chunk)
+            preparation_mins = nrng.integers(30, 400, size=size, endpoint=True)
+            cooking_mins = preparation_mins - nrng.integers(5, 15, size=size, endpoint=True)
+            basic_ingredient_ids = [int(recipe['main_ingredient']) + replica * len(ingredients_data) for recipe in chunk]
+            writer.add_columns(
+                [recipe.get('is_dessert', False) for recipe in chunk],
+                nrng.integers(1, 5, size=size, endpoint=True),
+                [titles.title(recipe['name'], replica) for recipe in chunk],
+                [recipe.get('description', '')[:300] for recipe in chunk],
+                [recipe.get('tips', '')[:400] for recipe in chunk],
+                preparation_mins, cooking_mins, [None] * size,
+                [ingredient_categories.get(ingredient_id) for ingredient_id in basic_ingredient_ids],
+                nrng.integers(50, 350, size=size, endpoint=True),
+                nrng.integers(1, 4, size=size, endpoint=True),
+                [0] * size,
+                [int(recipe['national_cuisine']) + replica * BASE_CUISINES for recipe in chunk],
+                basic_ingredient_ids,
+            )
+
+def write_recipe_gear_columns(writer, recipe_ids, gear_ids):
+    nrng = stage_numpy_random()
+    gear_ids = id_array(gear_ids)
+    for chunk in id_chunks(recipe_ids, sample_chunk_rows(gear_ids)):
+        rows, selected_gears = sample_rows(nrng, gear_ids, nrng.integers(5, 15, size=len(chunk), endpoint=True))
+        writer.add_columns(chunk[rows], selected_gears, nrng.integers(1, 3, size=len(rows), endpoint=True))
+
+def write_recipe_ingredient_columns(writer, calories_writer, recipe_servings, ingredient_ids, quantity_descriptions,
+                                    ingredient_kcal):
+    nrng = stage_numpy_random()
+    ingredient_ids = id_array(ingredient_ids)
+    quantity_descriptions = numpy.array(quantity_descriptions)
+    kcal = numpy.zeros(max(ingredient_kcal, default=0) + 1, dtype=numpy.int64)
+    kcal[list(ingredient_kcal)] = list(ingredient_kcal.values())
+    recipe_servings = iter(recipe_servings)
+    while True:
+        pairs = numpy.array(list(islice(recipe_servings, sample_chunk_rows(ingredient_ids))), dtype=numpy.int64)
+        if len(pairs) == 0:
+            return
+        chunk, servings = pairs[:, 0], pairs[:, 1]
+        num_ingredients = nrng.integers(4, 15, size=len(chunk), endpoint=True)
+        rows, selected_ingredients = sample_rows(nrng, ingredient_ids, num_ingredients)
+        estimated_grams = nrng.integers(30, 400, size=len(rows), endpoint=True)
+        writer.add_columns(chunk[rows], selected_ingredients,
+                           quantity_descriptions[nrng.integers(len(quantity_descriptions), size=len(rows))], estimated_grams)
+        # the ingredients of every recipe are contiguous, so their sums start at the running count of ingredients
+        starts = numpy.concatenate(([0], numpy.cumsum(num_ingredients)[:-1]))
+        grams_kcal_sums = numpy.add.reduceat(estimated_grams * kcal[selected_ingredients], starts)
+        calories_writer.add_columns(chunk, grams_kcal_sums, num_ingredients, servings)
+
+def write_cook_national_cuisine_columns(writer, cook_ids, cuisine_ids):
+    nrng = stage_numpy_random()
+    cuisine_ids = id_array(cuisine_ids)
+    for chunk in id_chunks(cook_ids, sample_chunk_rows(cuisine_ids)):
+        rows, selected_cuisines = sample_rows(nrng, cuisine_ids, nrng.integers(4, 8, size=len(chunk), endpoint=True))
+        writer.add_columns(chunk[rows], selected_cuisines)
+
+def write_nutritional_info_columns(writer, recipe_ids):
+    nrng = stage_numpy_random()
+    for chunk in id_chunks(recipe_ids, VECTOR_ROWS):
+        writer.add_columns(chunk, nrng.integers(5, 70, size=len(chunk), endpoint=True),
+                           nrng.integers(30, 200, size=len(chunk), endpoint=True),
+                           nrng.integers(10, 90, size=len(chunk), endpoint=True))
+
+# the (cook, judge, episode) triples of up to VECTOR_ROWS ratings are collected before their values are drawn
+def write_rating_columns(writer, episode_groups):
+    nrng = stage_numpy_random()
+    cooks, judges, episodes = [], [], []
+    for episode_id, episode_cooks, episode_judges in episode_groups:
+        for cook in episode_cooks:
+            cooks.extend([cook] * len(episode_judges))
+            judges.extend(episode_judges)
+        episodes.extend([episode_id] * (len(episode_cooks) * len(episode_judges)))
+        if len(episodes) >= VECTOR_ROWS:
+            writer.add_columns(nrng.integers(1, 5, size=len(episodes), endpoint=True), cooks, judges, episodes)
+            cooks, judges, episodes = [], [], []
+    if episodes:
+        writer.add_columns(nrng.integers(1, 5, size=len(episodes), endpoint=True), cooks, judges, episodes)
 
 
+### Start of retrieving methods
 
 
-### Start of retrieving methods
+# Number of rows read by every chunk of iter_table
+FETCH_SIZE = 10000
+
+# Function to stream the rows of a table ordered by key_columns, one chunk of FETCH_SIZE rows at a time
+# every chunk starts after the last key of the previous one (keyset pagination) and is read with its own
+# short-lived cursor, so the connection is free for the writers between chunks
+def iter_table(table, columns, key_columns, connection=None):
+    connection = connection or get_conn()
+    key_positions = [columns.index(column) for column in key_columns]
+    select = f"SELECT {', '.join(columns)} FROM {table}"
+    after_key = f" WHERE ({', '.join(key_columns)}) > ({', '.join(['%s'] * len(key_columns))})"
+    order = f" ORDER BY {', '.join(key_columns)} LIMIT {FETCH_SIZE}"
+    last_key = None
+    while True:
+        with query_cursor(connection) as cursor:
+            if last_key is None:
+                cursor.execute(select + order)
+            else:
+                cursor.execute(select + after_key + order, last_key)
+            rows = cursor.fetchall()
+        yield from rows
+        if len(rows) < FETCH_SIZE:
+            return
+        last_key = tuple(rows[-1][position] for position in key_positions)
+
+
+# Re-iterable stream over the values of one column, every loop over it reads the table again with iter_table
+class ColumnStream:
+    def __init__(self, table, column):
+        self.table = table
+        self.column = column
+
+    def __iter__(self):
+        for (value,) in iter_table(self.table, [self.column], [self.column]):
+            yield value
+
+
+# Function to get the ids of a table as a sequence that random.sample can draw from
+# the ids are contiguous after a reset, so a range is returned and no id has to be kept in memory
+def get_id_sequence(table, column):
+    with query_cursor() as cursor:
+        cursor.execute(f"SELECT MIN({column}), MAX({column}), COUNT(*) FROM {table}")
+        min_id, max_id, count = cursor.fetchone()
+    if count == 0:
+        return range(0)
+    if max_id - min_id + 1 == count:
+        return range(min_id, max_id + 1)
+    return list(ColumnStream(table, column))
+
+
+# Function to group rows that are ordered by their first column into (first column, [rest of the row]) pairs
+def iter_groups(rows):
+    for key, group in groupby(rows, key=itemgetter(0)):
+        yield key, [row[1:] for row in group]
+
+
+# Function to join two streams of groups that are ordered by the same key, yielding only the keys found in both
+def merge_groups(left, right):
+    right = iter(right)
+    right_key, right_items = next(right, (None, None))
+    for left_key, left_items in left:
+        while right_key is not None and right_key < left_key:
+            right_key, right_items = next(right, (None, None))
+        if right_key is None:
+            return
+        if right_key == left_key:
+            yield left_key, left_items, right_items
 
 
 def get_recipe_ids():
-    cursor = conn.cursor()
-    cursor.execute("SELECT recipe_id FROM recipe")
-    result = cursor.fetchall()
-    return [row[0] for row in result]
+    return ColumnStream("recipe", "recipe_id")
+
+# Function to stream the (recipe_id, servings) pairs of every recipe in recipe_id order
+def get_recipe_servings():
+    return iter_table("recipe", ["recipe_id", "servings"], ["recipe_id"])
 
 
 def get_gear_ids():
-    cursor = conn.cursor()
-    cursor.execute("SELECT gear_id FROM gear")
-    result = cursor.fetchall()
-    return [row[0] for row in result]
+    return get_id_sequence("gear", "gear_id")
 
 def get_recipe_theme_ids():
-    cursor = conn.cursor()
-    cursor.execute("SELECT recipe_theme_id FROM recipe_theme")
-    result = cursor.fetchall()
-    return [row[0] for row in result]
+    return get_id_sequence("recipe_theme", "recipe_theme_id")
 
 def get_cook_ids():
-    cursor = conn.cursor()
-    cursor.execute("SELECT cook_id FROM cook")
-    result = cursor.fetchall()
-    return [row[0] for row in result]
+    return ColumnStream("cook", "cook_id")
 
 def get_ingredient_ids():
-    cursor = conn.cursor()
-    cursor.execute("SELECT ingredient_id FROM ingredient")
-    result = cursor.fetchall()
-    return [row[0] for row in result]
+    return get_id_sequence("ingredient", "ingredient_id")
 
 def get_national_cuisine_ids():
-    cursor = conn.cursor()
-    cursor.execute("SELECT national_cuisine_id FROM national_cuisine")
-    result = cursor.fetchall()
-    return [row[0] for row in result]
+    return get_id_sequence("national_cuisine", "national_cuisine_id")
+
+# Function to map every ingredient to the category of its food group, read once from ingredient and food_group_category
+def get_ingredient_categories():
+    food_group_categories = dict(iter_table("food_group_category", ["food_group_id", "category"], ["food_group_id"]))
+    return {
+        ingredient_id: food_group_categories[food_group_id]
+        for ingredient_id, food_group_id in iter_table("ingredient", ["ingredient_id", "food_group_id"], ["ingredient_id"])
+        if food_group_id in food_group_categories
+    }
 
 
 def get_cook_national_cuisines():
-    cursor = conn.cursor()
-    cursor.execute("SELECT cook_id, national_cuisine_id FROM cook_national_cuisine")
-    result = cursor.fetchall()
     cook_cuisines = {}
-    for cook_id, cuisine_id in result:
+    for cook_id, cuisine_id in iter_table("cook_national_cuisine", ["cook_id", "national_cuisine_id"], ["cook_id", "national_cuisine_id"]):
         if cook_id not in cook_cuisines:
             cook_cuisines[cook_id] = []
         cook_cuisines[cook_id].append(cuisine_id)
     return cook_cuisines
 
 
+# Function to get the cooks of every national cuisine, the reverse of get_cook_national_cuisines
+def get_national_cuisine_cooks():
+    cuisine_cooks = {}
+    for cook_id, cuisine_id in iter_table("cook_national_cuisine", ["cook_id", "national_cuisine_id"], ["cook_id", "national_cuisine_id"]):
+        if cuisine_id not in cuisine_cooks:
+            cuisine_cooks[cuisine_id] = []
+        cuisine_cooks[cuisine_id].append(cook_id)
+    return cuisine_cooks
+
+
+# Function to get the recipes of every national cuisine
 def get_recipe_national_cuisines():
-    cursor = conn.cursor()
-    cursor.execute("SELECT recipe_id, national_cuisine_id FROM recipe")
-    result = cursor.fetchall()
     recipe_cuisines = {}
-    for recipe_id, cuisine_id in result:
+    for recipe_id, cuisine_id in iter_table("recipe", ["recipe_id", "national_cuisine_id"], ["recipe_id"]):
         if cuisine_id not in recipe_cuisines:
             recipe_cuisines[cuisine_id] = []
         recipe_cuisines[cuisine_id].append(recipe_id)
     return recipe_cuisines
 
+# Function to get the episode ids of every season, in episode order
+def get_season_episodes():
+    season_episodes = {}
+    for season_number, episode_number, episode_id in iter_table("episode", ["season_number", "episode_number", "episode_id"], ["season_number", "episode_number", "episode_id"]):
+        if season_number not in season_episodes:
+            season_episodes[season_number] = []
+        season_episodes[season_number].append(episode_id)
+    return season_episodes
+
+
+# Stream of (episode_id, [cook_id, ...]) of the competing cooks in episode order
 def get_episode_cooks():
-    cursor = conn.cursor()
-    cursor.execute("SELECT cook_id, episode_id FROM cook_cuisine_assignment")
-    result = cursor.fetchall()
-    episode_cooks = {}
-    for cook_id, episode_id in result:
-        if episode_id not in episode_cooks:
-            episode_cooks[episode_id] = []
-        episode_cooks[episode_id].append(cook_id)
-    return episode_cooks
+    rows = iter_table("cook_cuisine_assignment", ["episode_id", "cook_id", "national_cuisine_id"], ["episode_id", "cook_id", "national_cuisine_id"])
+    return ((episode_id, [cook_id for cook_id, _ in cooks]) for episode_id, cooks in iter_groups(rows))
 
 
 def get_episodes():
-    cursor = conn.cursor()
-    cursor.execute("SELECT episode_id FROM episode")
-    result = cursor.fetchall()
-    return [row[0] for row in result]
+    return ColumnStream("episode", "episode_id")
 
 
+# Stream of (episode_id, [cook_id, ...]) of the judges in episode order
 def get_episode_judges():
-    cursor = conn.cursor()
-    cursor.execute("SELECT cook_id, episode_id FROM judge_assignment")
-    result = cursor.fetchall()
-    episode_judges = {}
-    for cook_id, episode_id in result:
-        if episode_id not in episode_judges:
-            episode_judges[episode_id] = []
-        episode_judges[episode_id].append(cook_id)
-    return episode_judges
+    rows = iter_table("judge_assignment", ["episode_id", "cook_id"], ["episode_id", "cook_id"])
+    return ((episode_id, [cook_id for (cook_id,) in judges]) for episode_id, judges in iter_groups(rows))
 
 
 
@@ -418,40 +1054,48 @@ def get_episode_judges():
 
 meal_types = ["Breakfast", "Lunch", "Dinner", "Snack", "Dessert", "Brunch", "Supper"]
 def generate_recipe_meal_type_data(recipe_ids, meal_types):
-    query = "INSERT INTO recipe_meal_type (recipe_id, meal_type) VALUES (%s, %s)"
-    for recipe_id in recipe_ids:
-        # Randomly choose exactly 2 meal types for each recipe
-        chosen_meal_types = random.sample(meal_types, 2)
-        for meal_type in chosen_meal_types:
-            data = (recipe_id, meal_type)
-            execute_query(conn, query, data)
+    rng = stage_random()
+    with table_writer("recipe_meal_type", ["recipe_id", "meal_type"]) as writer:
+        for recipe_id in recipe_ids:
+            # Randomly choose exactly 2 meal types for each recipe
+            chosen_meal_types = rng.sample(meal_types, 2)
+            for meal_type in chosen_meal_types:
+                data = (recipe_id, meal_type)
+                writer.add(data)
 
 def generate_recipe_gear_data(recipe_ids):
+    rng = stage_random()
     gear_ids = get_gear_ids()  # Retrieve gear IDs
-    query = "INSERT INTO recipe_gear (recipe_id, gear_id, quantity) VALUES (%s, %s, %s)"
 
-    for recipe_id in recipe_ids:
-        num_gears = random.randint(5, 15)
-        selected_gears = random.sample(gear_ids, num_gears)
-        for gear_id in selected_gears:
-            quantity = random.randint(1,3)
-            data = (recipe_id, gear_id, quantity)
-            execute_query(conn, query, data)
+    with table_writer("recipe_gear", ["recipe_id", "gear_id", "quantity"]) as writer:
+        if GENERATOR_MODE == 'numpy':
+            write_recipe_gear_columns(writer, recipe_ids, gear_ids)
+            return
+        for recipe_id in recipe_ids:
+            num_gears = rng.randint(5, 15)
+            selected_gears = rng.sample(gear_ids, num_gears)
+            for gear_id in selected_gears:
+                quantity = rng.randint(1,3)
+                data = (recipe_id, gear_id, quantity)
+                writer.add(data)
 
 
 tags = ["Healthy", "High protein", "Cold meal", "Comfort food", "For students", "Quick", "No sugar", "Low carbs", "Finger food", "Air fryer"]
 
+# the triggers on recipe_tag skip tag_pair_count during the load, it is rebuilt once at the end
 def generate_recipe_tag_data(recipe_ids, tags):
-    query = "INSERT INTO recipe_tag (recipe_id, tag) VALUES (%s, %s)"
-    for recipe_id in recipe_ids:
-        num_tags = random.randint(1, 3)  # Choose a random number of tags (between 1 and 3)
-        chosen_tags = set()  # Set to store chosen tags for uniqueness
-        while len(chosen_tags) < num_tags:
-            tag = random.choice(tags)  # Randomly select a tag
-            if tag not in chosen_tags:
-                chosen_tags.add(tag)
-                data = (recipe_id, tag)
-                execute_query(conn, query, data)
+    rng = stage_random()
+    with bulk_flag("bulk_tag_pairs"), table_writer("recipe_tag", ["recipe_id", "tag"]) as writer:
+        for recipe_id in recipe_ids:
+            num_tags = rng.randint(1, 3)  # Choose a random number of tags (between 1 and 3)
+            chosen_tags = set()  # Set to store chosen tags for uniqueness
+            while len(chosen_tags) < num_tags:
+                tag = rng.choice(tags)  # Randomly select a tag
+                if tag not in chosen_tags:
+                    chosen_tags.add(tag)
+                    data = (recipe_id, tag)
+                    writer.add(data)
+    rebuild_tag_pair_counts()
 
 def generate_recipe_theme_data():
     themes = [
@@ -470,67 +1114,84 @@ def generate_recipe_theme_data():
         ("Breakfast for Dinner", "Break tradition and enjoy your favorite breakfast dishes for an evening meal.")
     ]
 
-    query = "INSERT INTO recipe_theme (title, small_description) VALUES (%s, %s)"
-    for theme in themes:
-        execute_query(conn, query, theme)
+    insert_rows("recipe_theme", ["title", "small_description"], themes)
 
 
 def generate_recipe_recipe_theme_data():
+    rng = stage_random()
     recipe_ids = get_recipe_ids()  # Retrieve recipe IDs
     theme_ids = get_recipe_theme_ids()  # Retrieve recipe theme IDs
-    query = "INSERT INTO recipe_recipe_theme (recipe_theme_id, recipe_id) VALUES (%s, %s)"
 
-    for recipe_id in recipe_ids:
-        num_themes = random.randint(1, 2)  # Randomly choose 1 or 2 themes for each recipe
-        selected_themes = random.sample(theme_ids, num_themes)  # Ensure unique themes for the recipe
+    with table_writer("recipe_recipe_theme", ["recipe_theme_id", "recipe_id"]) as writer:
+        for recipe_id in recipe_ids:
+            num_themes = rng.randint(1, 2)  # Randomly choose 1 or 2 themes for each recipe
+            selected_themes = rng.sample(theme_ids, num_themes)  # Ensure unique themes for the recipe
 
-        for theme_id in selected_themes:
-            data = (theme_id, recipe_id)
-            execute_query(conn, query, data)
+            for theme_id in selected_themes:
+                data = (theme_id, recipe_id)
+                writer.add(data)
 
 
-def generate_recipe_ingredient_data(recipe_ids):
+# the recipes are streamed as (recipe_id, servings) pairs, the servings are written to recipe_calories with the sums
+def generate_recipe_ingredient_data(recipe_servings):
+    rng = stage_random()
     ingredient_ids = get_ingredient_ids()  # Retrieve ingredient IDs
     quantity_descriptions = [
         "A little bit", "A small amount", "A pinch", "A big amount", "A generous amount", "A large quantity",
         "A small spoon", "A few drops", "A drizzle", "A handful", "A moderate amount", "Enough to comfortably hold in your hand",
         "A splash", "A small amount", "Just enough to coat/moisten", "Enough to cover the top", "A generous layer", "An even coating"
     ]
-    query = "INSERT INTO recipe_ingredient (recipe_id, ingredient_id, quantity, estimated_grams) VALUES (%s, %s, %s, %s)"
-
-    for recipe_id in recipe_ids:
-        num_ingredients = random.randint(4, 15)
-        selected_ingredients = random.sample(ingredient_ids, num_ingredients)
-        for ingredient_id in selected_ingredients:
-            quantity = random.choice(quantity_descriptions)
-            estimated_grams = random.randint(30, 400)
-            data = (recipe_id, ingredient_id, quantity, estimated_grams)
-            execute_query(conn, query, data)
+    columns = ["recipe_id", "ingredient_id", "quantity", "estimated_grams"]
+    # the calories of every recipe are summed here and written to recipe_calories, the triggers on recipe_ingredient skip them
+    ingredient_kcal = dict(iter_table("ingredient", ["ingredient_id", "kcal_per_100"], ["ingredient_id"]))
+
+    with bulk_flag("bulk_recipe_calories"), table_writer("recipe_ingredient", columns) as writer, \
+            table_writer("recipe_calories", ["recipe_id", "grams_kcal_sum", "ingredient_count", "servings"]) as calories_writer:
+        if GENERATOR_MODE == 'numpy':
+            write_recipe_ingredient_columns(writer, calories_writer, recipe_servings, ingredient_ids, quantity_descriptions,
+                                            ingredient_kcal)
+            return
+        for recipe_id, servings in recipe_servings:
+            num_ingredients = rng.randint(4, 15)
+            selected_ingredients = rng.sample(ingredient_ids, num_ingredients)
+            grams_kcal_sum = 0
+            for ingredient_id in selected_ingredients:
+                quantity = rng.choice(quantity_descriptions)
+                estimated_grams = rng.randint(30, 400)
+                data = (recipe_id, ingredient_id, quantity, estimated_grams)
+                writer.add(data)
+                grams_kcal_sum += estimated_grams * ingredient_kcal[ingredient_id]
+            calories_writer.add((recipe_id, grams_kcal_sum, num_ingredients, servings))
 
 
 def generate_cook_national_cuisine_data():
+    rng = stage_random()
     cook_ids = get_cook_ids()
     cuisine_ids = get_national_cuisine_ids()  # Retrieve national cuisine IDs
-    query = "INSERT INTO cook_national_cuisine (cook_id, national_cuisine_id) VALUES (%s, %s)"
 
-    for cook_id in cook_ids:
-        num_cuisines = random.randint(4, 8)
-        selected_cuisines = random.sample(cuisine_ids, num_cuisines)
-        for cuisine_id in selected_cuisines:
-            data = (cook_id, cuisine_id)
-            execute_query(conn, query, data)
+    with table_writer("cook_national_cuisine", ["cook_id", "national_cuisine_id"]) as writer:
+        if GENERATOR_MODE == 'numpy':
+            write_cook_national_cuisine_columns(writer, cook_ids, cuisine_ids)
+            return
+        for cook_id in cook_ids:
+            num_cuisines = rng.randint(4, 8)
+            selected_cuisines = rng.sample(cuisine_ids, num_cuisines)
+            for cuisine_id in selected_cuisines:
+                data = (cook_id, cuisine_id)
+                writer.add(data)
 
 
+# the cooks and the recipes are both streamed in national cuisine order and joined cuisine by cuisine,
+# so only the cooks and recipes of one cuisine are held in memory
 def generate_cook_recipe_data():
-    cook_cuisines = get_cook_national_cuisines()
-    recipe_cuisines = get_recipe_national_cuisines()
-    query = "INSERT INTO cook_recipe (cook_id, recipe_id) VALUES (%s, %s)"
-
-    for cook_id, cuisines in cook_cuisines.items():
-        for cuisine_id in cuisines:
-            if cuisine_id in recipe_cuisines:
-                possible_recipes = recipe_cuisines[cuisine_id]
-
+    rng = stage_random()
+    cuisine_cooks = iter_groups(iter_table("cook_national_cuisine", ["national_cuisine_id", "cook_id"], ["national_cuisine_id", "cook_id"]))
+    cuisine_recipes = iter_groups(iter_table("recipe", ["national_cuisine_id", "recipe_id"], ["national_cuisine_id", "recipe_id"]))
+
+    with table_writer("cook_recipe", ["cook_id", "recipe_id"]) as writer:
+        for cuisine_id, cooks, recipes in merge_groups(cuisine_cooks, cuisine_recipes):
+            possible_recipes = [recipe_id for (recipe_id,) in recipes]
+            for (cook_id,) in cooks:
                 # Exclude two random recipes for each cuisine
                 # excluded_recipes = random.sample(possible_recipes, min(2, len(possible_recipes)))
 
@@ -538,171 +1199,179 @@ def generate_cook_recipe_data():
                 # remaining_recipes = [recipe_id for recipe_id in possible_recipes]
 
                 # Randomly select a subset of remaining recipes for the cook
-                if possible_recipes:
-                    num_recipes = random.randint(1, min(3, len(possible_recipes)))
-                    selected_recipes = random.sample(possible_recipes, num_recipes)
+                num_recipes = rng.randint(1, min(3, len(possible_recipes)))
+                selected_recipes = rng.sample(possible_recipes, num_recipes)
 
-                    for recipe_id in selected_recipes:
-                        data = (cook_id, recipe_id)
-                        execute_query(conn, query, data)
+                for recipe_id in selected_recipes:
+                    data = (cook_id, recipe_id)
+                    writer.add(data)
 
 
-def generate_episode_data():
-    query = "INSERT INTO episode (episode_number, season_number) VALUES (%s, %s)"
-    for season in range(1, 6):  # Seasons 1 to 5
-        for episode in range(1, 11):  # Episodes 1 to 10
-            data = (episode, season)
-            execute_query(conn, query, data)
+def generate_episode_data(num_seasons):
+    with table_writer("episode", ["episode_number", "season_number"]) as writer:
+        for season in range(1, num_seasons + 1):
+            for episode in range(1, EPISODES_PER_SEASON + 1):
+                data = (episode, season)
+                writer.add(data)
 
 
 def generate_nutritional_info_data(recipe_ids):
-
-    query = "INSERT INTO nutritional_info (recipe_id, fats, carbohydrates, protein) VALUES (%s, %s, %s, %s)"
-
-    for recipe_id in recipe_ids:
-        fats = random.randint(5, 70)
-        carbohydrates = random.randint(30, 200)
-        protein = random.randint(10, 90)
-        data = (recipe_id, fats, carbohydrates, protein)
-        execute_query(conn, query, data)
-
-def assignments():
-    for season_number in range(1, 6):
-        for episode_number in range(1, 11):
-            query = "CALL episode_assignments(%s, %s)"
+    rng = stage_random()
+
+    with table_writer("nutritional_info", ["recipe_id", "fats", "carbohydrates", "protein"]) as writer:
+        if GENERATOR_MODE == 'numpy':
+            write_nutritional_info_columns(writer, recipe_ids)
+            return
+        for recipe_id in recipe_ids:
+            fats = rng.randint(5, 70)
+            carbohydrates = rng.randint(30, 200)
+            protein = rng.randint(10, 90)
+            data = (recipe_id, fats, carbohydrates, protein)
+            writer.add(data)
+
+# How the assignments are made: 'episode' calls episode_assignments for every episode,
+# 'episode-cursor' the original row by row episode_assignments_cursor,
+# 'season' calls season_assignments once for all the seasons,
+# 'python' samples them in memory with assignment_engine and the random generator of the stage
+ASSIGNMENT_MODE = 'episode'
+
+assignment_procedures = {
+    "episode": "episode_assignments",
+    "episode-cursor": "episode_assignments_cursor",
+    "season": "season_assignments",
+    "python": None,
+}
+
+def assignments(num_seasons, mode=None):
+    mode = mode or ASSIGNMENT_MODE
+    procedure = assignment_procedures[mode]
+    if mode == "python":
+        # imported here because assignment_engine builds on the helpers of this module
+        from assignment_engine import run_assignment_engine
+        run_assignment_engine(num_seasons, stage_random())
+        return
+    if procedure == "season_assignments":
+        execute_query(get_conn(), "CALL season_assignments(%s, %s)", (1, num_seasons))
+        return
+    for season_number in range(1, num_seasons + 1):
+        for episode_number in range(1, EPISODES_PER_SEASON + 1):
+            query = f"CALL {procedure}(%s, %s)"
             data = (episode_number, season_number)
-            execute_query(conn, query, data)
+            execute_query(get_conn(), query, data)
 
 def generate_rating_data():
-    query = "INSERT INTO rating (rating_value, cook_id, judge_id, episode_id) VALUES (%s, %s, %s, %s)"
+    rng = stage_random()
     ep_cook_ids = get_episode_cooks()
     judge_ids = get_episode_judges()
-    episode_ids = get_episodes()
-    for episode_id in episode_ids:
-        cooks = ep_cook_ids[episode_id]
-        judges = judge_ids[episode_id]
-        for cook in cooks:
-            for judge in judges:
-                rating_value = random.randint(1, 5)
-                data = (rating_value, cook, judge, episode_id)
-                execute_query(conn, query, data)
-
-def insert_random_urls():
-    for _ in range (596):
-        url = generate_random_url()
-        query = "INSERT INTO image (image_url) VALUES (%s)"
-        data = [url]
-        execute_query(conn, query, data)
-
-
-def generate_recipe_image_data():
-
-    fetch_query = "SELECT recipe_id, title FROM recipe"
-    cursor = conn.cursor()
-    cursor.execute(fetch_query)
-    recipes = cursor.fetchall()  # Fetch all recipes
-    cursor.close()
-    query = "INSERT INTO recipe_image (recipe_id, image_id, image_description) VALUES (%s, %s, %s)"
-    for recipe_id, title in recipes:
-        image_id = recipe_id
-        image_description = title
-        data = (recipe_id, image_id, image_description)
-        execute_query(conn, query, data)
-
-def generate_gear_image_data():
-
-    fetch_query = "SELECT gear_id, title FROM gear"
-    cursor = conn.cursor()
-    cursor.execute(fetch_query)
-    gears = cursor.fetchall()  # Fetch all recipes
-    cursor.close()
-    query = "INSERT INTO gear_image (gear_id, image_id, image_description) VALUES (%s, %s, %s)"
-    for gear_id, title in gears:
-        image_id = gear_id+147
-        image_description = title
-        data = (gear_id, image_id, image_description)
-        execute_query(conn, query, data)
-
-def generate_food_group_image_data():
-
-    fetch_query = "SELECT food_group_id, title FROM food_group"
-    cursor = conn.cursor()
-    cursor.execute(fetch_query)
-    fdgrps = cursor.fetchall()  # Fetch all recipes
-    cursor.close()
-    query = "INSERT INTO food_group_image (food_group_id, image_id, image_description) VALUES (%s, %s, %s)"
-    for food_group_id, title in fdgrps:
-        image_id = food_group_id+231
-        image_description = title
-        data = (food_group_id, image_id, image_description)
-        execute_query(conn, query, data)
-
-
-def generate_ingredient_image_data():
-
-    fetch_query = "SELECT ingredient_id, title FROM ingredient"
-    cursor = conn.cursor()
-    cursor.execute(fetch_query)
-    ingredients = cursor.fetchall()  # Fetch all recipes
-    cursor.close()
-    query = "INSERT INTO ingredient_image (ingredient_id, image_id, image_description) VALUES (%s, %s, %s)"
-    for ingredient_id, title in ingredients:
-        image_id = ingredient_id+243
-        image_description = title
-        data = (ingredient_id, image_id, image_description)
-        execute_query(conn, query, data)
-
-
-def generate_recipe_theme_image_data():
-
-    fetch_query = "SELECT recipe_theme_id, title FROM recipe_theme"
-    cursor = conn.cursor()
-    cursor.execute(fetch_query)
-    themes = cursor.fetchall()  # Fetch all recipes
-    cursor.close()
-    query = "INSERT INTO recipe_theme_image (recipe_theme_id, image_id, image_description) VALUES (%s, %s, %s)"
-    for recipe_theme_id, title in themes:
-        image_id = recipe_theme_id+482
-        image_description = "A '" + title + "' themed recipe"
-        data = (recipe_theme_id, image_id, image_description)
-        execute_query(conn, query, data)
-
-
-def generate_cook_image_data():
-
-    fetch_query = "SELECT cook_id, first_name, last_name FROM cook"
-    cursor = conn.cursor()
-    cursor.execute(fetch_query)
-    cooks = cursor.fetchall()  # Fetch all recipes
-    cursor.close()
-    query = "INSERT INTO cook_image (cook_id, image_id, image_description) VALUES (%s, %s, %s)"
-    for cook_id, first_name, last_name in cooks:
-        image_id = cook_id+495
-        image_description = first_name + " " + last_name
-        data = (cook_id, image_id, image_description)
-        execute_query(conn, query, data)
-
-def generate_episode_image_data():
-    fetch_query = "SELECT episode_id FROM episode"
-    cursor = conn.cursor()
-    cursor.execute(fetch_query)
-    episodes = cursor.fetchall()
-    cursor.close()
-    query = "INSERT INTO episode_image (episode_id, image_id, image_description) VALUES (%s, %s, %s)"
-
-    for (episode_id,) in episodes:  # Unpack the episode_id directly as an integer
-        image_id = episode_id + 546
-        season_count = (episode_id // 10) + 1
-        episode_count = episode_id % 10
-        if episode_count == 0:
-            season_count -= 1
-            episode_count = 10
-        image_description = f"Season {season_count}, Episode {episode_count}"  # Use f-string for formatting
-        data = (episode_id, image_id, image_description)
-        execute_query(conn, query, data)
+    with table_writer("rating", ["rating_value", "cook_id", "judge_id", "episode_id"]) as writer:
+        if GENERATOR_MODE == 'numpy':
+            write_rating_columns(writer, merge_groups(ep_cook_ids, judge_ids))
+            return
+        for episode_id, cooks, judges in merge_groups(ep_cook_ids, judge_ids):
+            for cook in cooks:
+                for judge in judges:
+                    rating_value = rng.randint(1, 5)
+                    data = (rating_value, cook, judge, episode_id)
+                    writer.add(data)
+
+# Tables that own an image, in the order their images are laid out in the image table
+image_owner_tables = ["recipe", "gear", "food_group", "ingredient", "recipe_theme", "cook", "episode"]
+
+# Function to compute the image_id offset of every image owner table from the current row counts
+# the images of a table start right after the images of the previous table
+def get_image_offsets():
+    offsets = {}
+    offset = 0
+    with query_cursor() as cursor:
+        for table in image_owner_tables:
+            offsets[table] = offset
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            offset += cursor.fetchone()[0]
+    offsets["total"] = offset
+    return offsets
+
+# the urls are a keyed permutation of all the 20 character strings, so no two images get the same one
+def insert_random_urls(num_urls):
+    urls = UniqueStrings(20, stage_random().getrandbits(64))
+    insert_rows("image", ["image_url"], ((urls[i],) for i in range(num_urls)))
+
+
+def generate_recipe_image_data(image_offsets):
+
+    recipes = iter_table("recipe", ["recipe_id", "title"], ["recipe_id"])
+    with table_writer("recipe_image", ["recipe_id", "image_id", "image_description"]) as writer:
+        for recipe_id, title in recipes:
+            image_id = recipe_id + image_offsets['recipe']
+            image_description = title
+            data = (recipe_id, image_id, image_description)
+            writer.add(data)
+
+def generate_gear_image_data(image_offsets):
+
+    gears = iter_table("gear", ["gear_id", "title"], ["gear_id"])
+    with table_writer("gear_image", ["gear_id", "image_id", "image_description"]) as writer:
+        for gear_id, title in gears:
+            image_id = gear_id + image_offsets['gear']
+            image_description = title
+            data = (gear_id, image_id, image_description)
+            writer.add(data)
+
+def generate_food_group_image_data(image_offsets):
+
+    fdgrps = iter_table("food_group", ["food_group_id", "title"], ["food_group_id"])
+    with table_writer("food_group_image", ["food_group_id", "image_id", "image_description"]) as writer:
+        for food_group_id, title in fdgrps:
+            image_id = food_group_id + image_offsets['food_group']
+            image_description = title
+            data = (food_group_id, image_id, image_description)
+            writer.add(data)
+
+
+def generate_ingredient_image_data(image_offsets):
+
+    ingredients = iter_table("ingredient", ["ingredient_id", "title"], ["ingredient_id"])
+    with table_writer("ingredient_image", ["ingredient_id", "image_id", "image_description"]) as writer:
+        for ingredient_id, title in ingredients:
+            image_id = ingredient_id + image_offsets['ingredient']
+            image_description = title
+            data = (ingredient_id, image_id, image_description)
+            writer.add(data)
+
+
+def generate_recipe_theme_image_data(image_offsets):
+
+    themes = iter_table("recipe_theme", ["recipe_theme_id", "title"], ["recipe_theme_id"])
+    with table_writer("recipe_theme_image", ["recipe_theme_id", "image_id", "image_description"]) as writer:
+        for recipe_theme_id, title in themes:
+            image_id = recipe_theme_id + image_offsets['recipe_theme']
+            image_description = "A '" + title + "' themed recipe"
+            data = (recipe_theme_id, image_id, image_description)
+            writer.add(data)
+
+
+def generate_cook_image_data(image_offsets):
+
+    cooks = iter_table("cook", ["cook_id", "first_name", "last_name"], ["cook_id"])
+    with table_writer("cook_image", ["cook_id", "image_id", "image_description"]) as writer:
+        for cook_id, first_name, last_name in cooks:
+            image_id = cook_id + image_offsets['cook']
+            image_description = first_name + " " + last_name
+            data = (cook_id, image_id, image_description)
+            writer.add(data)
+
+def generate_episode_image_data(image_offsets):
+    episodes = iter_table("episode", ["episode_id", "episode_number", "season_number"], ["episode_id"])
+
+    with table_writer("episode_image", ["episode_id", "image_id", "image_description"]) as writer:
+        for episode_id, episode_number, season_number in episodes:
+            image_id = episode_id + image_offsets['episode']
+            image_description = f"Season {season_number}, Episode {episode_number}"  # Use f-string for formatting
+            data = (episode_id, image_id, image_description)
+            writer.add(data)
 
 
 def generate_step_data(recipe_ids):
+    rng = stage_random()
     steps = [
         "Sauté 1 diced Onion until translucent.",
         "Sauté 2 diced Carrots until soft.",
@@ -959,78 +1628,196 @@ def generate_step_data(recipe_ids):
     ]
 
     #recipe_ids.sort() mono an theloume na emfanizontai me ascending order oi sintages sto table
-    for recipe_id in recipe_ids:
-        # Determine number of steps for this recipe
-        num_steps = random.randint(4, 9)
-
-        # Select steps for this recipe
-        chosen_steps = random.choices(steps, k=num_steps)
-
-        #ordering = 0
-
-        # Insert steps for this recipe
-        query = "INSERT INTO step (small_description, recipe_id) VALUES (%s, %s)"
-        for step_description in chosen_steps:
-
-            data = (step_description, recipe_id)
-            execute_query(conn, query, data)
-
+    # the steps are numbered here, after the steps the recipes already have, and the step_ordering trigger keeps them
+    last_orderings = get_last_step_orderings()
+    with bulk_flag("bulk_step_ordering"), table_writer("step", ["small_description", "ordering", "recipe_id"]) as writer:
+        for recipe_id in recipe_ids:
+            # Determine number of steps for this recipe
+            num_steps = rng.randint(4, 9)
+
+            # Select steps for this recipe
+            chosen_steps = rng.choices(steps, k=num_steps)
+
+            ordering = last_orderings.get(recipe_id, 0)
+
+            # Insert steps for this recipe
+            for step_description in chosen_steps:
+                ordering += 1
+                data = (step_description, ordering, recipe_id)
+                writer.add(data)
+
+# Function to get the ordering of the last step of every recipe that has steps
+def get_last_step_orderings():
+    with query_cursor() as cursor:
+        cursor.execute("SELECT recipe_id, MAX(ordering) FROM step GROUP BY recipe_id")
+        return dict(cursor.fetchall())
+
+# Function to add steps to a recipe with the insert_recipe_steps procedure, numbered after its last step
+def insert_recipe_steps(recipe_id, step_descriptions):
+    connection = get_conn()
+    with query_cursor(connection) as cursor:
+        cursor.callproc("insert_recipe_steps", (recipe_id, json.dumps(list(step_descriptions))))
+        connection.commit()
+    bump_writes("insert_recipe_steps")
+
+
+# Function to declare the winner of every episode whose ratings changed, the ties are broken with the seed of the run
+# it returns the (episode_id, cook_id, rating, rank_numeric) rows of all the winners
+def determine_winners():
+    connection = get_conn()
+    with query_cursor(connection) as cursor:
+        cursor.callproc("declare_winners", (SEED,))
+        winners = [row for result in cursor.stored_results() for row in result.fetchall()]
+        connection.commit()
+    bump_writes("declare_winners")
+    return winners
+
+
+# Function to list the population stages with the tables every stage writes and reads,
+# scheduler.run_stages adds the foreign keys of ddl.sql to find which stages can run at the same time
+def populate_stages(sizes):
+    return [
+        Stage("cook", lambda: generate_dummy_cooks(sizes["cooks"]), writes=["cook"]),
+        Stage("gear", lambda: insert_gear_data(gear_data), writes=["gear"]),
+        # the triggers on food_group map every food group to its category
+        Stage("food_group", lambda: generate_dummy_food_groups(food_group_data), writes=["food_group", "food_group_category"]),
+        Stage("national_cuisine", lambda: generate_dummy_cuisines(sizes["cuisines"]), writes=["national_cuisine"]),
+        Stage("ingredient", lambda: generate_dummy_ingredients(sizes["ingredient_replicas"]), writes=["ingredient"]),
+        Stage("recipe", lambda: generate_dummy_recipes_from_json('recipes.json', sizes["recipe_replicas"]), writes=["recipe"],
+              reads=["food_group_category"]),
+        Stage("recipe_meal_type", lambda: generate_recipe_meal_type_data(get_recipe_ids(), meal_types), writes=["recipe_meal_type"]),
+        Stage("recipe_gear", lambda: generate_recipe_gear_data(get_recipe_ids()), writes=["recipe_gear"]),
+        Stage("recipe_tag", lambda: generate_recipe_tag_data(get_recipe_ids(), tags), writes=["recipe_tag", "tag_pair_count"]),
+        Stage("recipe_theme", generate_recipe_theme_data, writes=["recipe_theme"]),
+        Stage("recipe_recipe_theme", generate_recipe_recipe_theme_data, writes=["recipe_recipe_theme"]),
+        Stage("recipe_ingredient", lambda: generate_recipe_ingredient_data(get_recipe_servings()),
+              writes=["recipe_ingredient", "recipe_calories"]),
+        Stage("cook_national_cuisine", generate_cook_national_cuisine_data, writes=["cook_national_cuisine"]),
+        Stage("cook_recipe", generate_cook_recipe_data, writes=["cook_recipe"], reads=["cook_national_cuisine"]),
+        Stage("episode", lambda: generate_episode_data(sizes["seasons"]), writes=["episode"]),
+        Stage("nutritional_info", lambda: generate_nutritional_info_data(get_recipe_ids()), writes=["nutritional_info"]),
+        # the procedure also resets and updates the episode counters of cook, national_cuisine and recipe,
+        # and the triggers on cook_cuisine_assignment add the ratings already written to their national cuisine
+        Stage("assignments", lambda: assignments(sizes["seasons"]),
+              writes=["cook_cuisine_assignment", "recipe_assignment", "judge_assignment", "cook_recipe",
+                      "cook", "national_cuisine", "recipe", "national_cuisine_rating_aggregate"],
+              reads=["cook_national_cuisine"]),
+        # the triggers on rating also write the rating aggregate tables and mark the episodes for declare_winners
+        Stage("rating", generate_rating_data,
+              writes=["rating", "cook_rating_aggregate", "episode_cook_rating_aggregate",
+                      "national_cuisine_rating_aggregate", "judge_cook_rating_aggregate", "episode_winner_dirty"]),
+        Stage("image", lambda: insert_random_urls(get_image_offsets()["total"]), writes=["image"], reads=image_owner_tables),
+        Stage("recipe_image", lambda: generate_recipe_image_data(get_image_offsets()), writes=["recipe_image"]),
+        Stage("gear_image", lambda: generate_gear_image_data(get_image_offsets()), writes=["gear_image"]),
+        Stage("food_group_image", lambda: generate_food_group_image_data(get_image_offsets()), writes=["food_group_image"]),
+        Stage("ingredient_image", lambda: generate_ingredient_image_data(get_image_offsets()), writes=["ingredient_image"]),
+        Stage("recipe_theme_image", lambda: generate_recipe_theme_image_data(get_image_offsets()), writes=["recipe_theme_image"]),
+        Stage("cook_image", lambda: generate_cook_image_data(get_image_offsets()), writes=["cook_image"]),
+        Stage("episode_image", lambda: generate_episode_image_data(get_image_offsets()), writes=["episode_image"]),
+        Stage("step", lambda: generate_step_data(get_recipe_ids()), writes=["step"]),
+        Stage("declare_winners", determine_winners, writes=["episode_winner", "episode_winner_dirty"], reads=["rating"]),
+    ]
 
 
-'''
-def determine_winners():
-    query = "CALL declare_winners()"
-    execute_query(conn, query)
-'''
-
-# Delete existing data and reset auto-increment for all tables
-tables = ["step", "episode_image", "cook_image", "recipe_theme_image", "ingredient_image", "food_group_image", "gear_image", "recipe_image",  "rating", "nutritional_info", "cook_recipe", "cook_national_cuisine", "recipe_ingredient", "recipe_recipe_theme", "recipe_gear", "recipe_tag", "recipe_meal_type", "cook", "recipe", "gear", "ingredient", "food_group", "national_cuisine", "recipe_theme", "episode", "image"]
-
-
-for table in tables:
-    delete_existing_data(table)
-    reset_auto_increment(table)
-
-
-
-
-# Generate and insert data
-generate_dummy_cooks(50)  # Generate 100 dummy cooks
-insert_gear_data(gear_data)
-generate_dummy_food_groups(food_group_data)
-generate_dummy_cuisines(20)  # Generate 29 dummy cuisines
-#generate_dummy_users(50)  # Generate 50 dummy users
-generate_dummy_ingredients(100)  # Generate data for about 100 ingredients
-generate_dummy_recipes_from_json('recipes.json')
-# Retrieve existing recipe IDs
-recipe_ids = get_recipe_ids()
-gear_ids = get_gear_ids()
-
-# Populate the recipe_meal_type table with new data
-generate_recipe_meal_type_data(recipe_ids, meal_types)
-generate_recipe_gear_data(recipe_ids)
-generate_recipe_tag_data(recipe_ids, tags)
-generate_recipe_theme_data()
-generate_recipe_recipe_theme_data()
-generate_recipe_ingredient_data(recipe_ids)
-generate_cook_national_cuisine_data()
-generate_cook_recipe_data()
-generate_episode_data()
-generate_nutritional_info_data(recipe_ids)
-assignments()
-generate_rating_data()
-insert_random_urls()
-generate_recipe_image_data()
-generate_gear_image_data()
-generate_food_group_image_data()
-generate_ingredient_image_data()
-generate_recipe_theme_image_data()
-generate_cook_image_data()
-generate_episode_image_data()
-generate_step_data(recipe_ids)
-#determine_winners()
-
-print("Dummy data inserted successfully into all tables.")
-
-# Close the connection when done
-conn.close()
+# Function to empty all the tables and populate them again with a dataset of the given scale factor,
+# running up to `workers` independent stages at the same time
+def populate(scale_factor=1, workers=1):
+    sizes = scaled_sizes(scale_factor)
+
+    with instrumentation.stage("reset"):
+        reset_seconds = reset_tables()
+    print(f"Reset ({RESET_MODE}) took {reset_seconds:.3f}s")
+
+    # Generate and insert data
+    stages = populate_stages(sizes)
+    if instrumentation.ENABLED:
+        for stage in stages:
+            stage.func = partial(instrumentation.run_stage, stage.name, stage.func)
+    stages = run_stages(stages, foreign_key_graph(), workers, before_stage=lambda stage: seed_stage(stage.name))
+    print_stage_report(stages)
+
+
+def main():
+    global BATCH_SIZE, COMMIT_MODE, SEED, LOAD_MODE, STAGING_DIR, RESET_MODE, ASSIGNMENT_MODE, CATEGORY_MODE, GENERATOR_MODE
+
+    parser = argparse.ArgumentParser(description="Populate the cooking_show database with dummy data")
+    parser.add_argument("--scale-factor", type=int, default=1,
+                        help="multiplies every entity count of the original dataset (50 cooks, 20 cuisines, 5 seasons, ...)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per multi-row INSERT")
+    parser.add_argument("--commit-mode", choices=["table", "batch"], default=COMMIT_MODE,
+                        help="commit once per table or once per batch")
+    parser.add_argument("--load-mode", choices=["insert", "load-data"], default=LOAD_MODE,
+                        help="write rows with multi-row INSERTs or stage them in files loaded with LOAD DATA LOCAL INFILE")
+    parser.add_argument("--staging-dir",
+                        help="keep the staging files of --load-mode load-data in this directory, prefixed by their foreign key order")
+    parser.add_argument("--reset-mode", choices=["delete", "truncate", "rebuild"], default=RESET_MODE,
+                        help="empty the tables with DELETE, TRUNCATE them, or drop and recreate the schema from ddl.sql")
+    parser.add_argument("--assignments", choices=list(assignment_procedures), default=ASSIGNMENT_MODE,
+                        help="assign every episode with its own procedure call, all the seasons with one season_assignments call, "
+                             "or all the seasons in memory with the seeded Python engine")
+    parser.add_argument("--category-mode", choices=["python", "trigger"], default=CATEGORY_MODE,
+                        help="resolve the recipe categories from a map of the ingredients read once, "
+                             "or leave them to the update_recipe_category trigger")
+    parser.add_argument("--generator", choices=["python", "numpy"], default=GENERATOR_MODE,
+                        help="draw every value with the random module, or whole columns of the numeric attributes "
+                             "and the samples of recipe_gear, recipe_ingredient and cook_national_cuisine with NumPy")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of independent stages populated at the same time, each on its own pooled connection")
+    parser.add_argument("--seed", help="seed of the random generators, the same seed generates the same rows")
+    db.add_connection_arguments(parser)
+    instrumentation.add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+    if args.scale_factor < 1:
+        parser.error("--scale-factor must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.generator == 'numpy' and numpy is None:
+        parser.error("--generator numpy needs NumPy, install it with pip install numpy")
+
+    BATCH_SIZE = args.batch_size
+    COMMIT_MODE = args.commit_mode
+    SEED = args.seed
+    LOAD_MODE = args.load_mode
+    STAGING_DIR = args.staging_dir
+    RESET_MODE = args.reset_mode
+    ASSIGNMENT_MODE = args.assignments
+    CATEGORY_MODE = args.category_mode
+    GENERATOR_MODE = args.generator
+    if LOAD_MODE == 'load-data':
+        prepare_load_data()
+
+    db.configure_from_args(args)
+    instrumentation.configure_from_args(args)
+    # every worker holds a connection of the pool while its stages run, next to the one of the main thread
+    if db.POOL_SIZE < args.workers + 1:
+        if args.pool_size is not None:
+            parser.error("--pool-size must be larger than --workers")
+        db.POOL_SIZE = args.workers + 1
+    db.CONNECT_OPTIONS["allow_local_infile"] = LOAD_MODE == 'load-data'
+    if db.BACKEND == 'sqlite' and LOAD_MODE == 'load-data':
+        parser.error("--load-mode load-data needs the mysql backend")
+
+    if get_conn().is_connected():
+        print("Connected to MySQL database" if db.BACKEND == 'mysql' else f"Using the SQLite database {db.SQLITE_PATH}")
+
+    if LOAD_MODE == 'load-data':
+        with query_cursor() as cursor:
+            cursor.execute("SELECT @@GLOBAL.local_infile")
+            (local_infile,) = cursor.fetchone()
+        if not local_infile:
+            parser.error("--load-mode load-data needs the server to run with local_infile=ON")
+
+    populate(args.scale_factor, args.workers)
+
+    print("Dummy data inserted successfully into all tables.")
+    print_insert_stats()
+    if instrumentation.ENABLED:
+        print()
+        instrumentation.print_report()
+
+    # Close the connections when done
+    close_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,7 @@ CREATE TABLE recipe (
 );
 
 CREATE INDEX idx_recipe_title ON recipe(title);
+CREATE INDEX idx_recipe_episode_count ON recipe(episode_count);
 
 DELIMITER //
 CREATE TRIGGER update_total_time 
@@ -58,6 +59,69 @@ CREATE TABLE recipe_tag(
 
 CREATE INDEX idx_recipe_tag_tag ON recipe_tag(tag);
 
+-- number of recipes that have both tags of a pair (tag_1 < tag_2), kept up to date by the triggers on recipe_tag,
+-- the index on the count makes the most used combinations a scan of its last entries
+CREATE TABLE tag_pair_count (
+    tag_1 VARCHAR(20) NOT NULL,
+    tag_2 VARCHAR(20) NOT NULL,
+    appearance_count INT NOT NULL,
+    PRIMARY KEY (tag_1, tag_2)
+);
+
+CREATE INDEX idx_tag_pair_count_appearance_count ON tag_pair_count(appearance_count);
+
+-- This is a procedure that will be used to add (t_count = 1) or remove (t_count = -1) the pairs of a tag
+-- with the other tags of its recipe, the tag skip_tag is left out of the pairs
+-- bulk loads set @bulk_tag_pairs = 1 to skip it and rebuild tag_pair_count once at the end (aggregates.py)
+DELIMITER //
+CREATE PROCEDURE apply_tag_to_pairs (t_recipe_id INT UNSIGNED, t_tag VARCHAR(20), skip_tag VARCHAR(20), t_count INT)
+BEGIN
+    IF NOT (@bulk_tag_pairs <=> 1) THEN
+        INSERT INTO tag_pair_count(tag_1, tag_2, appearance_count)
+        SELECT LEAST(rt.tag, t_tag), GREATEST(rt.tag, t_tag), t_count
+        FROM recipe_tag rt
+        WHERE rt.recipe_id = t_recipe_id AND rt.tag <> t_tag AND NOT (rt.tag <=> skip_tag)
+        ON DUPLICATE KEY UPDATE appearance_count = appearance_count + t_count;
+        DELETE FROM tag_pair_count WHERE appearance_count = 0;
+    END IF;
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER tag_pair_count_insert
+AFTER INSERT ON recipe_tag
+FOR EACH ROW
+BEGIN
+    CALL apply_tag_to_pairs(NEW.recipe_id, NEW.tag, NULL, 1);
+END;
+//
+DELIMITER ;
+
+-- the new row is already in recipe_tag, so it is left out of the pairs removed for the old one
+DELIMITER //
+CREATE TRIGGER tag_pair_count_update
+AFTER UPDATE ON recipe_tag
+FOR EACH ROW
+BEGIN
+    IF OLD.recipe_id <> NEW.recipe_id OR NOT (OLD.tag <=> NEW.tag) THEN
+        CALL apply_tag_to_pairs(OLD.recipe_id, OLD.tag, IF(OLD.recipe_id = NEW.recipe_id, NEW.tag, NULL), -1);
+        CALL apply_tag_to_pairs(NEW.recipe_id, NEW.tag, NULL, 1);
+    END IF;
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER tag_pair_count_delete
+AFTER DELETE ON recipe_tag
+FOR EACH ROW
+BEGIN
+    CALL apply_tag_to_pairs(OLD.recipe_id, OLD.tag, NULL, -1);
+END;
+//
+DELIMITER ;
+
 -- cooking gear
 CREATE TABLE gear(
     gear_id INT UNSIGNED NOT NULL AUTO_INCREMENT,
@@ -84,8 +148,12 @@ CREATE TABLE step (
     CONSTRAINT FOREIGN KEY (recipe_id) REFERENCES recipe(recipe_id) ON DELETE RESTRICT ON UPDATE CASCADE
 );
 
+-- every recipe reads its steps in order, and the ordering trigger looks up the last step of a recipe with it
+CREATE INDEX idx_step_recipe_ordering ON step(recipe_id, ordering);
+
 -- trigger to automatically assign ordering for the recipe steps
 -- ensuring the ordering of the steps is consecutive
+-- bulk loads that already number the steps of every recipe set @bulk_step_ordering = 1 to keep their ordering
 DELIMITER //
 CREATE TRIGGER step_ordering
 BEFORE INSERT ON step
@@ -93,16 +161,46 @@ FOR EACH ROW
 BEGIN
     DECLARE max_order INT;
 
-    SET max_order = 0;
-
-    IF NEW.ordering IS NOT NULL AND NEW.recipe_id IN (SELECT recipe_id FROM step WHERE recipe_id = NEW.recipe_id) 
+    IF NOT (@bulk_step_ordering <=> 1 AND NEW.ordering > 0)
     THEN
-    SELECT MAX(ordering) INTO max_order
+    -- a single probe of idx_step_recipe_ordering
+    SELECT COALESCE(MAX(ordering), 0) INTO max_order
     FROM step
     WHERE recipe_id = NEW.recipe_id;
-    END IF;
 
     SET NEW.ordering = max_order + 1;
+    END IF;
+END;
+//
+DELIMITER ;
+
+-- procedure to add many steps to a recipe in one statement, step_descriptions is a JSON array of the descriptions
+-- in the order they are cooked, they get the orderings after the last step of the recipe
+DELIMITER //
+CREATE PROCEDURE insert_recipe_steps (IN r_recipe_id INT UNSIGNED, IN step_descriptions JSON)
+BEGIN
+    DECLARE max_order INT;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @bulk_step_ordering = NULL;
+        RESIGNAL;
+    END;
+
+    -- locks the last step of the recipe, so concurrent calls for the same recipe do not get the same orderings
+    SELECT COALESCE(MAX(ordering), 0) INTO max_order
+    FROM step
+    WHERE recipe_id = r_recipe_id
+    FOR UPDATE;
+
+    SET @bulk_step_ordering = 1;
+    INSERT INTO step (small_description, ordering, recipe_id)
+    SELECT jt.small_description, max_order + jt.position, r_recipe_id
+    FROM JSON_TABLE(step_descriptions, '$[*]' COLUMNS (
+        position FOR ORDINALITY,
+        small_description VARCHAR(300) PATH '$'
+    )) AS jt;
+    SET @bulk_step_ordering = NULL;
 END;
 //
 DELIMITER ;
@@ -114,7 +212,63 @@ CREATE TABLE food_group(
     small_description VARCHAR(300) NOT NULL,
     PRIMARY KEY (food_group_id)
 );
- 
+
+-- category of the recipes whose basic ingredient is in a food group, kept up to date by the triggers on food_group
+CREATE TABLE food_group_category(
+    food_group_id INT UNSIGNED NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    PRIMARY KEY (food_group_id),
+    CONSTRAINT FOREIGN KEY (food_group_id) REFERENCES food_group(food_group_id) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- procedure to map the title of a food group to the category of its recipes
+DELIMITER //
+CREATE PROCEDURE map_food_group_category (fg_id INT UNSIGNED, fg_title VARCHAR(50))
+BEGIN
+    INSERT INTO food_group_category(food_group_id, category)
+    VALUES (fg_id,
+        CASE fg_title
+            WHEN 'Seasonings and Essential Oils' THEN 'Aromatic'
+            WHEN 'Coffee, Tea, and Their Products' THEN 'Caffeinated'
+            WHEN 'Preserved Foods' THEN 'Canned'
+            WHEN 'Sweetening Substances' THEN 'Sweet'
+            WHEN 'Fats and Oils' THEN 'Fatty'
+            WHEN 'Milk, Eggs, and Their Products' THEN 'Dairy'
+            WHEN 'Meat and Its Products' THEN 'Meat-Based'
+            WHEN 'Fish and Their Products' THEN 'Seafood'
+            WHEN 'Grains and Their Products' THEN 'Grain Based'
+            WHEN 'Various Plant-Based Foods' THEN 'Vegetarian'
+            WHEN 'Products with Sweetening Substances' THEN 'Sweets'
+            WHEN 'Various Beverages' THEN 'Drinks'
+            ELSE '' -- Default category if no match
+        END)
+    ON DUPLICATE KEY UPDATE category = VALUES(category);
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER food_group_category_insert
+AFTER INSERT ON food_group
+FOR EACH ROW
+BEGIN
+    CALL map_food_group_category(NEW.food_group_id, NEW.title);
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER food_group_category_update
+AFTER UPDATE ON food_group
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.title <=> OLD.title) THEN
+        CALL map_food_group_category(NEW.food_group_id, NEW.title);
+    END IF;
+END;
+//
+DELIMITER ;
+
 CREATE TABLE ingredient (
     ingredient_id INT UNSIGNED NOT NULL AUTO_INCREMENT,
     title VARCHAR(100) NOT NULL UNIQUE,
@@ -132,30 +286,18 @@ CREATE TRIGGER update_recipe_category
 BEFORE INSERT ON recipe
 FOR EACH ROW
 BEGIN
-    DECLARE food_group_name VARCHAR(50);
+    DECLARE basic_category VARCHAR(50);
 
-    -- Fetch the food group name for the basic ingredient
-    SELECT fg.title INTO food_group_name
-    FROM food_group fg
-    INNER JOIN ingredient i ON fg.food_group_id = i.food_group_id
-    WHERE i.ingredient_id = NEW.basic_ingredient_id;
+    -- bulk loads resolve the category themselves, the lookup is only made for recipes inserted without one
+    IF NEW.category IS NULL THEN
+        -- Fetch the category of the food group of the basic ingredient
+        SELECT fgc.category INTO basic_category
+        FROM ingredient i
+        INNER JOIN food_group_category fgc ON fgc.food_group_id = i.food_group_id
+        WHERE i.ingredient_id = NEW.basic_ingredient_id;
 
-    -- Update the category column based on the food group name
-    CASE food_group_name
-        WHEN 'Seasonings and Essential Oils' THEN SET NEW.category = 'Aromatic';
-        WHEN 'Coffee, Tea, and Their Products' THEN SET NEW.category = 'Caffeinated';
-        WHEN 'Preserved Foods' THEN SET NEW.category = 'Canned';
-        WHEN 'Sweetening Substances' THEN SET NEW.category = 'Sweet';
-        WHEN 'Fats and Oils' THEN SET NEW.category = 'Fatty';
-        WHEN 'Milk, Eggs, and Their Products' THEN SET NEW.category = 'Dairy';
-        WHEN 'Meat and Its Products' THEN SET NEW.category = 'Meat-Based';
-        WHEN 'Fish and Their Products' THEN SET NEW.category = 'Seafood';
-        WHEN 'Grains and Their Products' THEN SET NEW.category = 'Grain Based';
-        WHEN 'Various Plant-Based Foods' THEN SET NEW.category = 'Vegetarian';
-        WHEN 'Products with Sweetening Substances' THEN SET NEW.category = 'Sweets';
-        WHEN 'Various Beverages' THEN SET NEW.category = 'Drinks';
-        ELSE SET NEW.category = ''; -- Default category if no match
-    END CASE;   
+        SET NEW.category = COALESCE(basic_category, ''); -- Default category if no match
+    END IF;
 END;
 //
 DELIMITER ;
@@ -181,6 +323,102 @@ CREATE TABLE nutritional_info (
     CONSTRAINT FOREIGN KEY (recipe_id) REFERENCES recipe(recipe_id) ON DELETE RESTRICT ON UPDATE CASCADE
 );
 
+-- calories of every recipe with ingredients, kept up to date by the triggers on recipe_ingredient, ingredient and recipe
+-- grams_kcal_sum is SUM(estimated_grams * kcal_per_100) of the ingredients, so calories is the value of total_nutritional_info
+CREATE TABLE recipe_calories (
+    recipe_id INT UNSIGNED NOT NULL,
+    grams_kcal_sum BIGINT NOT NULL,
+    ingredient_count INT NOT NULL,
+    servings INT UNSIGNED NOT NULL,
+    calories DECIMAL(16,4) AS (grams_kcal_sum / 100 / NULLIF(servings, 0)) STORED,
+    PRIMARY KEY (recipe_id),
+    CONSTRAINT FOREIGN KEY (recipe_id) REFERENCES recipe(recipe_id) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- This is a procedure that will be used to add (c_count = 1) or remove (c_count = -1) an ingredient from the calories of a recipe
+-- bulk loads set @bulk_recipe_calories = 1 to skip it and write recipe_calories themselves (db_data.py)
+DELIMITER //
+CREATE PROCEDURE apply_ingredient_to_calories (c_recipe_id INT UNSIGNED, c_ingredient_id INT UNSIGNED, c_grams INT, c_count INT)
+BEGIN
+    DECLARE kcal INT;
+    DECLARE recipe_servings INT UNSIGNED;
+
+    IF NOT (@bulk_recipe_calories <=> 1) THEN
+        SELECT kcal_per_100 INTO kcal FROM ingredient WHERE ingredient_id = c_ingredient_id;
+        SELECT servings INTO recipe_servings FROM recipe WHERE recipe_id = c_recipe_id;
+
+        INSERT INTO recipe_calories(recipe_id, grams_kcal_sum, ingredient_count, servings)
+        VALUES (c_recipe_id, c_count * c_grams * kcal, c_count, recipe_servings)
+        ON DUPLICATE KEY UPDATE grams_kcal_sum = grams_kcal_sum + c_count * c_grams * kcal, ingredient_count = ingredient_count + c_count;
+        DELETE FROM recipe_calories WHERE recipe_id = c_recipe_id AND ingredient_count = 0;
+    END IF;
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER recipe_calories_insert
+AFTER INSERT ON recipe_ingredient
+FOR EACH ROW
+BEGIN
+    CALL apply_ingredient_to_calories(NEW.recipe_id, NEW.ingredient_id, NEW.estimated_grams, 1);
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER recipe_calories_update
+AFTER UPDATE ON recipe_ingredient
+FOR EACH ROW
+BEGIN
+    CALL apply_ingredient_to_calories(OLD.recipe_id, OLD.ingredient_id, OLD.estimated_grams, -1);
+    CALL apply_ingredient_to_calories(NEW.recipe_id, NEW.ingredient_id, NEW.estimated_grams, 1);
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER recipe_calories_delete
+AFTER DELETE ON recipe_ingredient
+FOR EACH ROW
+BEGIN
+    CALL apply_ingredient_to_calories(OLD.recipe_id, OLD.ingredient_id, OLD.estimated_grams, -1);
+END;
+//
+DELIMITER ;
+
+-- a new kcal_per_100 changes the calories of every recipe with the ingredient
+DELIMITER //
+CREATE TRIGGER recipe_calories_ingredient_kcal
+AFTER UPDATE ON ingredient
+FOR EACH ROW
+BEGIN
+    IF NEW.kcal_per_100 <> OLD.kcal_per_100 THEN
+        UPDATE recipe_calories rc
+        INNER JOIN (
+            SELECT recipe_id, SUM(estimated_grams) AS grams
+            FROM recipe_ingredient
+            WHERE ingredient_id = NEW.ingredient_id
+            GROUP BY recipe_id
+        ) AS ri ON rc.recipe_id = ri.recipe_id
+        SET rc.grams_kcal_sum = rc.grams_kcal_sum + ri.grams * (NEW.kcal_per_100 - OLD.kcal_per_100);
+    END IF;
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER recipe_calories_servings
+AFTER UPDATE ON recipe
+FOR EACH ROW
+BEGIN
+    IF NEW.servings <> OLD.servings THEN
+        UPDATE recipe_calories SET servings = NEW.servings WHERE recipe_id = NEW.recipe_id;
+    END IF;
+END;
+//
+DELIMITER ;
+
 CREATE TABLE national_cuisine(
     national_cuisine_id INT UNSIGNED NOT NULL AUTO_INCREMENT,
     cuisine_name VARCHAR(30) NOT NULL UNIQUE,
@@ -250,7 +488,7 @@ CREATE TABLE episode (
 );
 
 CREATE INDEX idx_episode_episode_number ON episode(episode_number);
-CREATE INDEX idx_episode_season_number ON episode(season_number);
+CREATE INDEX idx_episode_season_episode ON episode(season_number, episode_number);
 
 CREATE TABLE cook_cuisine_assignment (
     cook_id INT UNSIGNED NOT NULL,
@@ -262,6 +500,8 @@ CREATE TABLE cook_cuisine_assignment (
     CONSTRAINT FOREIGN KEY (episode_id) REFERENCES episode(episode_id) ON DELETE RESTRICT ON UPDATE CASCADE
 );
 
+CREATE INDEX idx_cook_cuisine_assignment_episode_cuisine ON cook_cuisine_assignment(episode_id, national_cuisine_id);
+
 CREATE TABLE recipe_assignment (
     recipe_id INT UNSIGNED NOT NULL,
     episode_id INT UNSIGNED NOT NULL,
@@ -290,6 +530,9 @@ CREATE TABLE rating (
     CONSTRAINT FOREIGN KEY (episode_id) REFERENCES episode(episode_id) ON DELETE RESTRICT ON UPDATE CASCADE
 );
 
+CREATE INDEX idx_rating_episode_cook ON rating(episode_id, cook_id);
+CREATE INDEX idx_rating_judge_cook ON rating(judge_id, cook_id);
+
 DELIMITER //
 CREATE TRIGGER different_cook_judge
 BEFORE INSERT ON rating
@@ -303,6 +546,190 @@ END;
 //
 DELIMITER ;
 
+-- Rating sums and counts per cook, per episode and cook, per national cuisine and per judge and cook.
+-- They are kept up to date by the triggers on rating below, so the rating views read them instead of aggregating rating
+CREATE TABLE cook_rating_aggregate (
+    cook_id INT UNSIGNED NOT NULL,
+    rating_sum INT NOT NULL,
+    rating_count INT NOT NULL,
+    PRIMARY KEY (cook_id),
+    CONSTRAINT FOREIGN KEY (cook_id) REFERENCES cook(cook_id) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE TABLE episode_cook_rating_aggregate (
+    episode_id INT UNSIGNED NOT NULL,
+    cook_id INT UNSIGNED NOT NULL,
+    rating_sum INT NOT NULL,
+    rating_count INT NOT NULL,
+    PRIMARY KEY (episode_id, cook_id),
+    CONSTRAINT FOREIGN KEY (episode_id) REFERENCES episode(episode_id) ON DELETE CASCADE ON UPDATE CASCADE,
+    CONSTRAINT FOREIGN KEY (cook_id) REFERENCES cook(cook_id) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- a rating counts for the cuisine its cook cooked in the episode, like the join of national_cuisine_mean_rating
+CREATE TABLE national_cuisine_rating_aggregate (
+    national_cuisine_id INT UNSIGNED NOT NULL,
+    rating_sum INT NOT NULL,
+    rating_count INT NOT NULL,
+    PRIMARY KEY (national_cuisine_id),
+    CONSTRAINT FOREIGN KEY (national_cuisine_id) REFERENCES national_cuisine(national_cuisine_id) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE TABLE judge_cook_rating_aggregate (
+    judge_id INT UNSIGNED NOT NULL,
+    cook_id INT UNSIGNED NOT NULL,
+    rating_sum INT NOT NULL,
+    rating_count INT NOT NULL,
+    PRIMARY KEY (judge_id, cook_id),
+    CONSTRAINT FOREIGN KEY (judge_id) REFERENCES cook(cook_id) ON DELETE CASCADE ON UPDATE CASCADE,
+    CONSTRAINT FOREIGN KEY (cook_id) REFERENCES cook(cook_id) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- for the top 5 of top_rating_judges
+CREATE INDEX idx_judge_cook_rating_aggregate_rating_sum ON judge_cook_rating_aggregate(rating_sum);
+
+-- The winner of every episode as declared by declare_winners, with the seed that broke its ties
+CREATE TABLE episode_winner (
+    episode_id INT UNSIGNED NOT NULL,
+    cook_id INT UNSIGNED NOT NULL,
+    total_rating INT NOT NULL,
+    rank_numeric INT,
+    winner_seed VARCHAR(64),
+    PRIMARY KEY (episode_id),
+    CONSTRAINT FOREIGN KEY (episode_id) REFERENCES episode(episode_id) ON DELETE CASCADE ON UPDATE CASCADE,
+    CONSTRAINT FOREIGN KEY (cook_id) REFERENCES cook(cook_id) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- The episodes whose ratings changed since declare_winners last ran, filled by the rating triggers
+CREATE TABLE episode_winner_dirty (
+    episode_id INT UNSIGNED NOT NULL,
+    PRIMARY KEY (episode_id)
+);
+
+-- This is a procedure that will be used to add (rating_count = 1) or remove (rating_count = -1) a rating from the aggregates
+-- the rows whose count drops to 0 are removed, so the views only show what has been rated, like the joins with rating did
+DELIMITER //
+CREATE PROCEDURE apply_rating_to_aggregates (r_cook_id INT UNSIGNED, r_judge_id INT UNSIGNED, r_episode_id INT UNSIGNED, r_value INT, r_count INT)
+BEGIN
+    INSERT INTO cook_rating_aggregate(cook_id, rating_sum, rating_count)
+    VALUES (r_cook_id, r_value * r_count, r_count)
+    ON DUPLICATE KEY UPDATE rating_sum = rating_sum + r_value * r_count, rating_count = rating_count + r_count;
+    DELETE FROM cook_rating_aggregate WHERE cook_id = r_cook_id AND rating_count = 0;
+
+    INSERT INTO episode_cook_rating_aggregate(episode_id, cook_id, rating_sum, rating_count)
+    VALUES (r_episode_id, r_cook_id, r_value * r_count, r_count)
+    ON DUPLICATE KEY UPDATE rating_sum = rating_sum + r_value * r_count, rating_count = rating_count + r_count;
+    DELETE FROM episode_cook_rating_aggregate WHERE episode_id = r_episode_id AND cook_id = r_cook_id AND rating_count = 0;
+
+    INSERT INTO national_cuisine_rating_aggregate(national_cuisine_id, rating_sum, rating_count)
+    SELECT cca.national_cuisine_id, r_value * r_count, r_count
+    FROM cook_cuisine_assignment cca
+    WHERE cca.cook_id = r_cook_id AND cca.episode_id = r_episode_id
+    ON DUPLICATE KEY UPDATE rating_sum = rating_sum + r_value * r_count, rating_count = rating_count + r_count;
+    DELETE FROM national_cuisine_rating_aggregate
+    WHERE rating_count = 0 AND national_cuisine_id IN (
+        SELECT cca.national_cuisine_id
+        FROM cook_cuisine_assignment cca
+        WHERE cca.cook_id = r_cook_id AND cca.episode_id = r_episode_id
+    );
+
+    INSERT INTO judge_cook_rating_aggregate(judge_id, cook_id, rating_sum, rating_count)
+    VALUES (r_judge_id, r_cook_id, r_value * r_count, r_count)
+    ON DUPLICATE KEY UPDATE rating_sum = rating_sum + r_value * r_count, rating_count = rating_count + r_count;
+    DELETE FROM judge_cook_rating_aggregate WHERE judge_id = r_judge_id AND cook_id = r_cook_id AND rating_count = 0;
+
+    -- the winner of the episode has to be declared again
+    INSERT INTO episode_winner_dirty(episode_id) VALUES (r_episode_id)
+    ON DUPLICATE KEY UPDATE episode_id = episode_id;
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER rating_aggregates_insert
+AFTER INSERT ON rating
+FOR EACH ROW
+BEGIN
+    CALL apply_rating_to_aggregates(NEW.cook_id, NEW.judge_id, NEW.episode_id, NEW.rating_value, 1);
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER rating_aggregates_update
+AFTER UPDATE ON rating
+FOR EACH ROW
+BEGIN
+    CALL apply_rating_to_aggregates(OLD.cook_id, OLD.judge_id, OLD.episode_id, OLD.rating_value, -1);
+    CALL apply_rating_to_aggregates(NEW.cook_id, NEW.judge_id, NEW.episode_id, NEW.rating_value, 1);
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER rating_aggregates_delete
+AFTER DELETE ON rating
+FOR EACH ROW
+BEGIN
+    CALL apply_rating_to_aggregates(OLD.cook_id, OLD.judge_id, OLD.episode_id, OLD.rating_value, -1);
+END;
+//
+DELIMITER ;
+
+-- This is a procedure that will be used to add (a_count = 1) or remove (a_count = -1) the ratings of a cook in an episode
+-- from the national cuisine the cook is assigned in that episode, when the assignment is written after the ratings
+-- (the rating triggers count the ratings written after their assignment)
+DELIMITER //
+CREATE PROCEDURE apply_assignment_to_cuisine_aggregate (a_cook_id INT UNSIGNED, a_national_cuisine_id INT UNSIGNED, a_episode_id INT UNSIGNED, a_count INT)
+BEGIN
+    DECLARE ratings_sum INT;
+    DECLARE ratings_count INT;
+
+    SELECT COALESCE(SUM(rating_value), 0), COUNT(*) INTO ratings_sum, ratings_count
+    FROM rating
+    WHERE episode_id = a_episode_id AND cook_id = a_cook_id;
+
+    IF ratings_count > 0 THEN
+        INSERT INTO national_cuisine_rating_aggregate(national_cuisine_id, rating_sum, rating_count)
+        VALUES (a_national_cuisine_id, ratings_sum * a_count, ratings_count * a_count)
+        ON DUPLICATE KEY UPDATE rating_sum = rating_sum + ratings_sum * a_count, rating_count = rating_count + ratings_count * a_count;
+        DELETE FROM national_cuisine_rating_aggregate WHERE national_cuisine_id = a_national_cuisine_id AND rating_count = 0;
+    END IF;
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER cuisine_aggregate_assignment_insert
+AFTER INSERT ON cook_cuisine_assignment
+FOR EACH ROW
+BEGIN
+    CALL apply_assignment_to_cuisine_aggregate(NEW.cook_id, NEW.national_cuisine_id, NEW.episode_id, 1);
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER cuisine_aggregate_assignment_update
+AFTER UPDATE ON cook_cuisine_assignment
+FOR EACH ROW
+BEGIN
+    CALL apply_assignment_to_cuisine_aggregate(OLD.cook_id, OLD.national_cuisine_id, OLD.episode_id, -1);
+    CALL apply_assignment_to_cuisine_aggregate(NEW.cook_id, NEW.national_cuisine_id, NEW.episode_id, 1);
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER cuisine_aggregate_assignment_delete
+AFTER DELETE ON cook_cuisine_assignment
+FOR EACH ROW
+BEGIN
+    CALL apply_assignment_to_cuisine_aggregate(OLD.cook_id, OLD.national_cuisine_id, OLD.episode_id, -1);
+END;
+//
+DELIMITER ;
+
 CREATE TABLE image (
     image_id INT UNSIGNED NOT NULL AUTO_INCREMENT,
     image_url VARCHAR(20) NOT NULL,
@@ -408,12 +835,63 @@ INNER JOIN recipe r ON rg.recipe_id = r.recipe_id
 INNER JOIN cook_recipe cr ON r.recipe_id = cr.recipe_id
 WHERE cr.cook_id = 1;
 
+-- The recipe book of any cook in one call, instead of the five cook_user_* views above that are fixed to cook 1
+-- and join cook_recipe and recipe again for every part of it. It returns five result sets:
+-- the cook with his image, his recipes with their nutritional info, calories and image,
+-- the steps of the recipes in order, their ingredients and their gear, every one ordered by recipe.
+-- Every result set reads the recipes of the cook through the primary key of cook_recipe.
+-- The procedure runs with the privileges of its definer, so the cook user only needs EXECUTE on it
+DELIMITER //
+CREATE PROCEDURE cook_recipe_bundle (IN c_cook_id INT UNSIGNED)
+BEGIN
+    SELECT c.cook_id, c.first_name, c.last_name, c.phone_number, c.birthdate, c.age, c.yrs_of_exp, c.episode_count, c.cook_rank,
+        img.image_url, ci.image_description
+    FROM cook c
+    LEFT JOIN cook_image ci ON ci.cook_id = c.cook_id
+    LEFT JOIN image img ON img.image_id = ci.image_id
+    WHERE c.cook_id = c_cook_id;
+
+    SELECT r.recipe_id, r.title, r.is_dessert, r.difficulty, r.small_description, r.tips, r.preparation_mins, r.cooking_mins,
+        r.total_time, r.category, r.serving_size_in_grams, r.servings, r.episode_count, r.national_cuisine_id, r.basic_ingredient_id,
+        ni.fats, ni.carbohydrates, ni.protein, rc.calories, img.image_url, rim.image_description
+    FROM cook_recipe cr
+    INNER JOIN recipe r ON r.recipe_id = cr.recipe_id
+    LEFT JOIN nutritional_info ni ON ni.recipe_id = r.recipe_id
+    LEFT JOIN recipe_calories rc ON rc.recipe_id = r.recipe_id
+    LEFT JOIN recipe_image rim ON rim.recipe_id = r.recipe_id
+    LEFT JOIN image img ON img.image_id = rim.image_id
+    WHERE cr.cook_id = c_cook_id
+    ORDER BY r.recipe_id;
+
+    -- one probe of idx_step_recipe_ordering per recipe
+    SELECT s.recipe_id, s.step_id, s.ordering, s.small_description
+    FROM cook_recipe cr
+    INNER JOIN step s ON s.recipe_id = cr.recipe_id
+    WHERE cr.cook_id = c_cook_id
+    ORDER BY s.recipe_id, s.ordering;
+
+    SELECT ri.recipe_id, i.ingredient_id, i.title, i.kcal_per_100, i.food_group_id, ri.quantity, ri.estimated_grams
+    FROM cook_recipe cr
+    INNER JOIN recipe_ingredient ri ON ri.recipe_id = cr.recipe_id
+    INNER JOIN ingredient i ON i.ingredient_id = ri.ingredient_id
+    WHERE cr.cook_id = c_cook_id
+    ORDER BY ri.recipe_id, i.ingredient_id;
+
+    SELECT rg.recipe_id, g.gear_id, g.title, g.instructions, rg.quantity
+    FROM cook_recipe cr
+    INNER JOIN recipe_gear rg ON rg.recipe_id = cr.recipe_id
+    INNER JOIN gear g ON g.gear_id = rg.gear_id
+    WHERE cr.cook_id = c_cook_id
+    ORDER BY rg.recipe_id, g.gear_id;
+END;
+//
+DELIMITER ;
+
 -- total rating for each cook for all episodes
 CREATE VIEW total_cook_rating AS
-SELECT c.cook_id, c.first_name, c.last_name, SUM(r.rating_value) as total_rating
+SELECT c.cook_id, c.first_name, c.last_name, cra.rating_sum as total_rating
 FROM cook c
-INNER JOIN rating r ON c.cook_id = r.cook_id
-GROUP BY c.cook_id, c.first_name, c.last_name;
+INNER JOIN cook_rating_aggregate cra ON c.cook_id = cra.cook_id;
 
 -- dynamically calculating the calories for each recipe 
 CREATE VIEW total_nutritional_info AS
@@ -424,6 +902,12 @@ INNER JOIN recipe_ingredient ri ON r.recipe_id = ri.recipe_id
 INNER JOIN ingredient i ON ri.ingredient_id = i.ingredient_id
 GROUP BY r.recipe_id, ni.fats, ni.carbohydrates, ni.protein;
 
+-- the same values read from the stored calories, total_nutritional_info stays to verify them
+CREATE VIEW total_nutritional_info_precomputed AS
+SELECT rc.recipe_id, rc.calories, ni.fats, ni.carbohydrates, ni.protein
+FROM recipe_calories rc
+INNER JOIN nutritional_info ni ON rc.recipe_id = ni.recipe_id;
+
 -- total episode participations for each cook
 CREATE VIEW cook_episode_count AS
 SELECT c.cook_id, c.first_name, c.last_name, COUNT(*) as episode_count
@@ -446,27 +930,22 @@ FROM cook;
     
 -- total rating for each cook in each episode
 CREATE VIEW episode_cook_rating AS
-SELECT r.episode_id, r.cook_id, cr.rank_numeric, SUM(r.rating_value) as total_rating
-FROM rating r 
-INNER JOIN cook_rank_numeric cr ON r.cook_id = cr.cook_id
-GROUP BY r.episode_id, r.cook_id, cr.rank_numeric
-ORDER BY r.episode_id, total_rating DESC;
+SELECT ecra.episode_id, ecra.cook_id, cr.rank_numeric, ecra.rating_sum as total_rating
+FROM episode_cook_rating_aggregate ecra
+INNER JOIN cook_rank_numeric cr ON ecra.cook_id = cr.cook_id
+ORDER BY ecra.episode_id, total_rating DESC;
 
 -- 3.1: mesos oros aksiologhsewn ana mageira
 CREATE VIEW cook_mean_rating AS
-SELECT c.cook_id, c.first_name, c.last_name, AVG(r.rating_value) as mean_rating
+SELECT c.cook_id, c.first_name, c.last_name, cra.rating_sum / cra.rating_count as mean_rating
 FROM cook c
-INNER JOIN rating r ON c.cook_id = r.cook_id
-GROUP BY c.cook_id, c.first_name, c.last_name;
+INNER JOIN cook_rating_aggregate cra ON c.cook_id = cra.cook_id;
 
 -- 3.1: mesos oros aksiologhsewn ana ethnikh kouzina
 CREATE VIEW national_cuisine_mean_rating AS
-SELECT nc.national_cuisine_id, nc.cuisine_name, AVG(r.rating_value) as mean_rating
+SELECT nc.national_cuisine_id, nc.cuisine_name, ncra.rating_sum / ncra.rating_count as mean_rating
 FROM national_cuisine nc
-INNER JOIN cook_cuisine_assignment cca ON nc.national_cuisine_id = cca.national_cuisine_id
-INNER JOIN episode e ON cca.episode_id = e.episode_id
-INNER JOIN rating r ON cca.cook_id = r.cook_id AND r.episode_id = e.episode_id
-GROUP BY nc.national_cuisine_id, nc.cuisine_name;
+INNER JOIN national_cuisine_rating_aggregate ncra ON nc.national_cuisine_id = ncra.national_cuisine_id;
 
 -- 3.2 
 DELIMITER //
@@ -568,6 +1047,13 @@ GROUP BY rt1.tag, rt2.tag
 ORDER BY appearance_count DESC
 LIMIT 3;
 
+-- 3.6 alternative that reads the precomputed pair counts
+CREATE VIEW most_used_tag_combinations_precomputed AS
+SELECT tag_1, tag_2, appearance_count
+FROM tag_pair_count
+ORDER BY appearance_count DESC
+LIMIT 3;
+
 -- 3.7 
 CREATE VIEW five_less_than_the_most AS
 SELECT c.cook_id, c.first_name, c.last_name, c.episode_count
@@ -636,12 +1122,11 @@ ORDER BY cyp1.episode_count DESC;
 CREATE VIEW top_rating_judges AS
 SELECT tr.judge_first_name, tr.judge_last_name, tr.cook_first_name, tr.cook_last_name , tr.total_rating
 FROM (
-    SELECT r.judge_id, j.first_name AS judge_first_name, j.last_name AS judge_last_name , r.cook_id, c.first_name AS cook_first_name, c.last_name AS cook_last_name, SUM(r.rating_value) AS total_rating
-    FROM rating r
-    INNER JOIN cook j ON j.cook_id = r.judge_id
-    INNER JOIN cook c ON c.cook_id = r.cook_id
-    GROUP BY r.judge_id, r.cook_id
-    ORDER BY total_rating DESC
+    SELECT jcra.judge_id, j.first_name AS judge_first_name, j.last_name AS judge_last_name , jcra.cook_id, c.first_name AS cook_first_name, c.last_name AS cook_last_name, jcra.rating_sum AS total_rating
+    FROM judge_cook_rating_aggregate jcra
+    INNER JOIN cook j ON j.cook_id = jcra.judge_id
+    INNER JOIN cook c ON c.cook_id = jcra.cook_id
+    ORDER BY jcra.rating_sum DESC
     LIMIT 5
 ) AS tr;
 
@@ -759,8 +1244,9 @@ END;
 DELIMITER ;
 
 -- This is a procedure that will be used to assign cooks, national cuisines, recipes, and judges to an episode
+-- (the original row by row version, kept to compare it with the set-based episode_assignments below)
 DELIMITER //
-CREATE PROCEDURE episode_assignments (episode_no INT, season_no INT) 
+CREATE PROCEDURE episode_assignments_cursor (episode_no INT, season_no INT) 
 BEGIN
     DECLARE done INT DEFAULT FALSE;
     DECLARE exact_episode_id INT UNSIGNED;
@@ -907,49 +1393,463 @@ END;
 //
 DELIMITER ;
 
+-- This is the set-based version of episode_assignments_cursor
+-- every candidate cook/cuisine pair gets a random priority and the pairs are matched in rounds:
+-- a round assigns the pairs that have the lowest priority of both their cook and their cuisine
+-- and removes the remaining pairs of the assigned cooks and cuisines.
+-- These are exactly the pairs the cursor assigns when it visits the candidates in priority order,
+-- and usually a couple of rounds are enough instead of one loop iteration per candidate
 DELIMITER //
+CREATE PROCEDURE episode_assignments (episode_no INT, season_no INT) 
+BEGIN
+    DECLARE exact_episode_id INT UNSIGNED;
+    DECLARE matched INT DEFAULT 1;
+
+    CREATE TEMPORARY TABLE temp_cook_national_cuisine (
+            cook_id INT UNSIGNED NOT NULL,
+            national_cuisine_id INT UNSIGNED NOT NULL,
+            priority DOUBLE NOT NULL,
+            PRIMARY KEY (cook_id, national_cuisine_id)
+    );
+
+    SET exact_episode_id = (
+        SELECT episode_id
+        FROM episode
+        WHERE episode_number = episode_no AND season_number = season_no
+    );
+
+    -- if it is the first episode of the season, reset the episode count for national cuisines, cooks, and recipes
+    -- only the rows with a non zero count are touched, found through the episode_count indexes
+    IF episode_no = 1
+    THEN 
+    UPDATE national_cuisine SET episode_count = 0 WHERE episode_count > 0;
+    UPDATE cook SET episode_count = 0 WHERE episode_count > 0;
+    UPDATE recipe SET episode_count = 0 WHERE episode_count > 0;
+    END IF;
 
-CREATE PROCEDURE declare_winners()
+    INSERT INTO temp_cook_national_cuisine(cook_id, national_cuisine_id, priority)
+    SELECT cnc.cook_id, nc.national_cuisine_id, RAND()
+    FROM (
+        -- we randomly select 10 national cuisines that have not been used in more than 3 episodes
+        SELECT nc_temp.national_cuisine_id
+        FROM national_cuisine nc_temp
+        WHERE nc_temp.episode_count < 3
+        ORDER BY RAND()
+        LIMIT 10
+    ) as nc
+    INNER JOIN cook_national_cuisine cnc ON cnc.national_cuisine_id = nc.national_cuisine_id
+    -- we filter out the cooks that have participated in more than 3 episodes
+    INNER JOIN cook c ON c.cook_id = cnc.cook_id
+    WHERE c.episode_count < 3;
+
+    -- insert into cook_cuisine_assignment table, one round at a time until no pair is left
+    WHILE matched > 0 DO
+        INSERT INTO cook_cuisine_assignment(cook_id, national_cuisine_id, episode_id)
+        SELECT ranked.cook_id, ranked.national_cuisine_id, exact_episode_id
+        FROM (
+            SELECT cook_id, national_cuisine_id,
+                ROW_NUMBER() OVER (PARTITION BY cook_id ORDER BY priority) AS cook_rank,
+                ROW_NUMBER() OVER (PARTITION BY national_cuisine_id ORDER BY priority) AS cuisine_rank
+            FROM temp_cook_national_cuisine
+        ) AS ranked
+        WHERE ranked.cook_rank = 1 AND ranked.cuisine_rank = 1;
+        SET matched = ROW_COUNT();
+
+        DELETE FROM temp_cook_national_cuisine
+        WHERE cook_id IN (
+            SELECT cca.cook_id
+            FROM cook_cuisine_assignment cca
+            WHERE cca.episode_id = exact_episode_id
+        )
+        OR national_cuisine_id IN (
+            SELECT cca.national_cuisine_id
+            FROM cook_cuisine_assignment cca
+            WHERE cca.episode_id = exact_episode_id
+        );
+    END WHILE;
+
+    -- populate recipe_assignment table
+    INSERT INTO recipe_assignment (recipe_id, episode_id) 
+    SELECT cra.recipe_id, exact_episode_id
+    FROM (
+        SELECT cca.national_cuisine_id, r.recipe_id, ROW_NUMBER() OVER (PARTITION BY cca.national_cuisine_id ORDER BY RAND()) AS row_num
+        FROM (
+            -- filter out the recipes that have been used in more than 3 episodes
+            SELECT r.recipe_id, r.national_cuisine_id
+            FROM recipe r
+            WHERE r.episode_count < 3 
+        ) AS r
+        INNER JOIN (
+            SELECT cook_id, national_cuisine_id
+            FROM cook_cuisine_assignment
+            WHERE episode_id = exact_episode_id
+        ) AS cca ON r.national_cuisine_id = cca.national_cuisine_id
+    ) as cra
+    WHERE cra.row_num = 1;
+
+    -- the cook must now know the recipe he is assigned in the episode 
+    -- so we insert the recipe into the cook_recipe table
+    INSERT INTO cook_recipe (cook_id, recipe_id)
+    SELECT cca.cook_id, ra.recipe_id
+    FROM (
+        SELECT cca.cook_id, cca.national_cuisine_id
+        FROM cook_cuisine_assignment cca
+        WHERE cca.episode_id = exact_episode_id
+    ) AS cca 
+    INNER JOIN (
+        SELECT r.recipe_id, r.national_cuisine_id
+        FROM recipe r
+        INNER JOIN recipe_assignment ra ON r.recipe_id = ra.recipe_id
+        WHERE ra.episode_id = exact_episode_id
+    ) AS ra ON cca.national_cuisine_id = ra.national_cuisine_id
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM cook_recipe cr
+        WHERE cr.cook_id = cca.cook_id AND cr.recipe_id = ra.recipe_id
+    ); 
+
+    INSERT INTO judge_assignment(cook_id, episode_id)
+    SELECT c.cook_id, exact_episode_id
+    FROM (
+        SELECT cook_id
+        FROM cook
+        WHERE episode_count < 3
+    ) as c
+    WHERE c.cook_id NOT IN (
+        SELECT cook_id
+        FROM cook_cuisine_assignment
+        WHERE episode_id = exact_episode_id
+    )
+    ORDER BY RAND()
+    LIMIT 3;
+
+    -- the episode counts are updated incrementally instead of rewriting every row:
+    -- the counts of the previous participants that are not in this episode are reset,
+    -- then the counts of the participants of this episode are incremented
+    UPDATE national_cuisine nc
+    LEFT JOIN cook_cuisine_assignment cca ON cca.national_cuisine_id = nc.national_cuisine_id AND cca.episode_id = exact_episode_id
+    SET nc.episode_count = 0
+    WHERE nc.episode_count > 0 AND cca.national_cuisine_id IS NULL;
+
+    UPDATE national_cuisine nc
+    INNER JOIN cook_cuisine_assignment cca ON cca.national_cuisine_id = nc.national_cuisine_id
+    SET nc.episode_count = nc.episode_count + 1
+    WHERE cca.episode_id = exact_episode_id;
+
+    UPDATE cook c
+    LEFT JOIN cook_cuisine_assignment cca ON cca.cook_id = c.cook_id AND cca.episode_id = exact_episode_id
+    SET c.episode_count = 0
+    WHERE c.episode_count > 0 AND cca.cook_id IS NULL;
+
+    UPDATE cook c
+    INNER JOIN cook_cuisine_assignment cca ON cca.cook_id = c.cook_id
+    SET c.episode_count = c.episode_count + 1
+    WHERE cca.episode_id = exact_episode_id;
+
+    UPDATE recipe r
+    LEFT JOIN recipe_assignment ra ON ra.recipe_id = r.recipe_id AND ra.episode_id = exact_episode_id
+    SET r.episode_count = 0
+    WHERE r.episode_count > 0 AND ra.recipe_id IS NULL;
+
+    UPDATE recipe r
+    INNER JOIN recipe_assignment ra ON ra.recipe_id = r.recipe_id
+    SET r.episode_count = r.episode_count + 1
+    WHERE ra.episode_id = exact_episode_id;
+
+    DROP TEMPORARY TABLE temp_cook_national_cuisine;
+END;
+//
+DELIMITER ;
+
+-- This is a procedure that will be used to make the assignments of all the episodes of the seasons first_season to last_season
+-- it follows the rules of episode_assignments, but the episode counts are kept in small temporary tables
+-- that only hold the participants of the previous episode, and the assignments of all the episodes
+-- are written to the tables with a few bulk inserts at the end
+DELIMITER //
+CREATE PROCEDURE season_assignments (first_season INT, last_season INT)
 BEGIN
-    DECLARE done INT DEFAULT FALSE;
-    DECLARE currect_episode_id INT;
-    DECLARE cook_cursor CURSOR FOR 
-        SELECT DISTINCT episode_id 
-        FROM episode_cook_rating;
-    
-    DECLARE CONTINUE HANDLER FOR NOT FOUND SET done = TRUE;
-    
-    OPEN cook_cursor;
-    
-    read_loop: LOOP
-        FETCH cook_cursor INTO currect_episode_id;
-        IF done THEN
-            LEAVE read_loop;
-        END IF;
-        
-        -- Create a temporary table to hold the cooks for the current episode
-        CREATE TEMPORARY TABLE temp_episode_cooks AS
-        SELECT cook_id, total_rating, rank_numeric
-        FROM episode_cook_rating
-        WHERE episode_id = currect_episode_id;
-
-        -- Find the cook with the highest rating
-        -- ORDER BY first sorts by total rating and if there is a tie, it sorts by expertise, and if there is still a tie, it sorts randomly
-        SELECT cook_id, total_rating, rank_numeric 
-        INTO @cook_id, @max_rating, @max_expertise
-        FROM temp_episode_cooks
-        ORDER BY total_rating DESC, rank_numeric DESC, RAND()
-        LIMIT 1;
-
-        SELECT currect_episode_id AS episode_id, @cook_id AS cook_id, @max_rating AS rating, @max_expertise AS rank_numeric;
-
-        -- Drop the temporary table
-        DROP TEMPORARY TABLE temp_episode_cooks;
-    END LOOP;
-    
-    CLOSE cook_cursor;
-END //
+    DECLARE season_no INT;
+    DECLARE episode_no INT;
+    DECLARE last_episode INT;
+    DECLARE exact_episode_id INT UNSIGNED;
+    DECLARE matched INT;
 
+    -- episode counts of the cooks, cuisines and recipes that took part in the previous episode, all others are 0
+    CREATE TEMPORARY TABLE temp_cook_count (
+            cook_id INT UNSIGNED NOT NULL PRIMARY KEY,
+            episode_count INT UNSIGNED NOT NULL
+    );
+    CREATE TEMPORARY TABLE temp_national_cuisine_count (
+            national_cuisine_id INT UNSIGNED NOT NULL PRIMARY KEY,
+            episode_count INT UNSIGNED NOT NULL
+    );
+    CREATE TEMPORARY TABLE temp_recipe_count (
+            recipe_id INT UNSIGNED NOT NULL PRIMARY KEY,
+            episode_count INT UNSIGNED NOT NULL
+    );
+
+    -- the assignments of the current episode
+    CREATE TEMPORARY TABLE temp_episode_national_cuisine (
+            national_cuisine_id INT UNSIGNED NOT NULL PRIMARY KEY
+    );
+    CREATE TEMPORARY TABLE temp_cook_national_cuisine (
+            cook_id INT UNSIGNED NOT NULL,
+            national_cuisine_id INT UNSIGNED NOT NULL,
+            priority DOUBLE NOT NULL,
+            PRIMARY KEY (cook_id, national_cuisine_id)
+    );
+    CREATE TEMPORARY TABLE temp_episode_cook_cuisine (
+            cook_id INT UNSIGNED NOT NULL PRIMARY KEY,
+            national_cuisine_id INT UNSIGNED NOT NULL UNIQUE
+    );
+    CREATE TEMPORARY TABLE temp_episode_recipe (
+            recipe_id INT UNSIGNED NOT NULL PRIMARY KEY,
+            national_cuisine_id INT UNSIGNED NOT NULL
+    );
+    CREATE TEMPORARY TABLE temp_episode_judge (
+            cook_id INT UNSIGNED NOT NULL PRIMARY KEY
+    );
+
+    -- the assignments of all the episodes, written to the tables at the end
+    CREATE TEMPORARY TABLE temp_cook_cuisine_assignment (
+            cook_id INT UNSIGNED NOT NULL,
+            national_cuisine_id INT UNSIGNED NOT NULL,
+            episode_id INT UNSIGNED NOT NULL,
+            PRIMARY KEY (episode_id, national_cuisine_id)
+    );
+    CREATE TEMPORARY TABLE temp_recipe_assignment (
+            recipe_id INT UNSIGNED NOT NULL,
+            national_cuisine_id INT UNSIGNED NOT NULL,
+            episode_id INT UNSIGNED NOT NULL,
+            PRIMARY KEY (episode_id, national_cuisine_id)
+    );
+    CREATE TEMPORARY TABLE temp_judge_assignment (
+            cook_id INT UNSIGNED NOT NULL,
+            episode_id INT UNSIGNED NOT NULL,
+            PRIMARY KEY (episode_id, cook_id)
+    );
+
+    SET season_no = first_season;
+    WHILE season_no <= last_season DO
+        -- every season starts with all the episode counts at 0
+        DELETE FROM temp_cook_count;
+        DELETE FROM temp_national_cuisine_count;
+        DELETE FROM temp_recipe_count;
+
+        SET last_episode = (SELECT MAX(episode_number) FROM episode WHERE season_number = season_no);
+        SET episode_no = 1;
+        WHILE episode_no <= last_episode DO
+            SET exact_episode_id = (
+                SELECT episode_id
+                FROM episode
+                WHERE episode_number = episode_no AND season_number = season_no
+            );
+
+            -- we randomly select 10 national cuisines that have not been used in more than 3 episodes
+            INSERT INTO temp_episode_national_cuisine(national_cuisine_id)
+            SELECT nc.national_cuisine_id
+            FROM national_cuisine nc
+            LEFT JOIN temp_national_cuisine_count ncc ON ncc.national_cuisine_id = nc.national_cuisine_id
+            WHERE COALESCE(ncc.episode_count, 0) < 3
+            ORDER BY RAND()
+            LIMIT 10;
+
+            -- and the cooks of these cuisines that have not participated in more than 3 episodes
+            INSERT INTO temp_cook_national_cuisine(cook_id, national_cuisine_id, priority)
+            SELECT cnc.cook_id, cnc.national_cuisine_id, RAND()
+            FROM temp_episode_national_cuisine nc
+            INNER JOIN cook_national_cuisine cnc ON cnc.national_cuisine_id = nc.national_cuisine_id
+            LEFT JOIN temp_cook_count cc ON cc.cook_id = cnc.cook_id
+            WHERE COALESCE(cc.episode_count, 0) < 3;
+
+            -- one cook per cuisine, matched in rounds like in episode_assignments
+            SET matched = 1;
+            WHILE matched > 0 DO
+                INSERT INTO temp_episode_cook_cuisine(cook_id, national_cuisine_id)
+                SELECT ranked.cook_id, ranked.national_cuisine_id
+                FROM (
+                    SELECT cook_id, national_cuisine_id,
+                        ROW_NUMBER() OVER (PARTITION BY cook_id ORDER BY priority) AS cook_rank,
+                        ROW_NUMBER() OVER (PARTITION BY national_cuisine_id ORDER BY priority) AS cuisine_rank
+                    FROM temp_cook_national_cuisine
+                ) AS ranked
+                WHERE ranked.cook_rank = 1 AND ranked.cuisine_rank = 1;
+                SET matched = ROW_COUNT();
+
+                -- a temporary table can only be opened once per statement, so the two conditions are two deletes
+                DELETE FROM temp_cook_national_cuisine
+                WHERE cook_id IN (SELECT cook_id FROM temp_episode_cook_cuisine);
+                DELETE FROM temp_cook_national_cuisine
+                WHERE national_cuisine_id IN (SELECT national_cuisine_id FROM temp_episode_cook_cuisine);
+            END WHILE;
+
+            -- a random recipe of every assigned cuisine that has not been used in more than 3 episodes
+            INSERT INTO temp_episode_recipe(recipe_id, national_cuisine_id)
+            SELECT cra.recipe_id, cra.national_cuisine_id
+            FROM (
+                SELECT r.recipe_id, r.national_cuisine_id,
+                    ROW_NUMBER() OVER (PARTITION BY r.national_cuisine_id ORDER BY RAND()) AS row_num
+                FROM temp_episode_cook_cuisine cca
+                INNER JOIN recipe r ON r.national_cuisine_id = cca.national_cuisine_id
+                LEFT JOIN temp_recipe_count rc ON rc.recipe_id = r.recipe_id
+                WHERE COALESCE(rc.episode_count, 0) < 3
+            ) AS cra
+            WHERE cra.row_num = 1;
+
+            -- 3 random judges among the cooks that do not cook in the episode
+            INSERT INTO temp_episode_judge(cook_id)
+            SELECT c.cook_id
+            FROM cook c
+            LEFT JOIN temp_cook_count cc ON cc.cook_id = c.cook_id
+            WHERE COALESCE(cc.episode_count, 0) < 3
+            AND c.cook_id NOT IN (SELECT cook_id FROM temp_episode_cook_cuisine)
+            ORDER BY RAND()
+            LIMIT 3;
+
+            -- the participants of the episode get their count incremented, everyone else goes back to 0
+            DELETE FROM temp_cook_count WHERE cook_id NOT IN (SELECT cook_id FROM temp_episode_cook_cuisine);
+            INSERT INTO temp_cook_count(cook_id, episode_count)
+            SELECT cook_id, 1 FROM temp_episode_cook_cuisine
+            ON DUPLICATE KEY UPDATE episode_count = episode_count + 1;
+
+            DELETE FROM temp_national_cuisine_count WHERE national_cuisine_id NOT IN (SELECT national_cuisine_id FROM temp_episode_cook_cuisine);
+            INSERT INTO temp_national_cuisine_count(national_cuisine_id, episode_count)
+            SELECT national_cuisine_id, 1 FROM temp_episode_cook_cuisine
+            ON DUPLICATE KEY UPDATE episode_count = episode_count + 1;
+
+            DELETE FROM temp_recipe_count WHERE recipe_id NOT IN (SELECT recipe_id FROM temp_episode_recipe);
+            INSERT INTO temp_recipe_count(recipe_id, episode_count)
+            SELECT recipe_id, 1 FROM temp_episode_recipe
+            ON DUPLICATE KEY UPDATE episode_count = episode_count + 1;
+
+            INSERT INTO temp_cook_cuisine_assignment(cook_id, national_cuisine_id, episode_id)
+            SELECT cook_id, national_cuisine_id, exact_episode_id FROM temp_episode_cook_cuisine;
+            INSERT INTO temp_recipe_assignment(recipe_id, national_cuisine_id, episode_id)
+            SELECT recipe_id, national_cuisine_id, exact_episode_id FROM temp_episode_recipe;
+            INSERT INTO temp_judge_assignment(cook_id, episode_id)
+            SELECT cook_id, exact_episode_id FROM temp_episode_judge;
+
+            DELETE FROM temp_episode_national_cuisine;
+            DELETE FROM temp_cook_national_cuisine;
+            DELETE FROM temp_episode_cook_cuisine;
+            DELETE FROM temp_episode_recipe;
+            DELETE FROM temp_episode_judge;
+
+            SET episode_no = episode_no + 1;
+        END WHILE;
+        SET season_no = season_no + 1;
+    END WHILE;
+
+    INSERT INTO cook_cuisine_assignment(cook_id, national_cuisine_id, episode_id)
+    SELECT cook_id, national_cuisine_id, episode_id FROM temp_cook_cuisine_assignment;
+
+    INSERT INTO recipe_assignment(recipe_id, episode_id)
+    SELECT recipe_id, episode_id FROM temp_recipe_assignment;
+
+    INSERT INTO judge_assignment(cook_id, episode_id)
+    SELECT cook_id, episode_id FROM temp_judge_assignment;
+
+    -- the cook must now know the recipe he is assigned in every episode
+    INSERT INTO cook_recipe (cook_id, recipe_id)
+    SELECT DISTINCT cca.cook_id, ra.recipe_id
+    FROM temp_cook_cuisine_assignment cca
+    INNER JOIN temp_recipe_assignment ra ON ra.episode_id = cca.episode_id AND ra.national_cuisine_id = cca.national_cuisine_id
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM cook_recipe cr
+        WHERE cr.cook_id = cca.cook_id AND cr.recipe_id = ra.recipe_id
+    );
+
+    -- the episode counts of the tables are left as episode_assignments would leave them after the last episode
+    UPDATE national_cuisine SET episode_count = 0 WHERE episode_count > 0;
+    UPDATE cook SET episode_count = 0 WHERE episode_count > 0;
+    UPDATE recipe SET episode_count = 0 WHERE episode_count > 0;
+
+    UPDATE national_cuisine nc
+    INNER JOIN temp_national_cuisine_count ncc ON ncc.national_cuisine_id = nc.national_cuisine_id
+    SET nc.episode_count = ncc.episode_count;
+
+    UPDATE cook c
+    INNER JOIN temp_cook_count cc ON cc.cook_id = c.cook_id
+    SET c.episode_count = cc.episode_count;
+
+    UPDATE recipe r
+    INNER JOIN temp_recipe_count rc ON rc.recipe_id = r.recipe_id
+    SET r.episode_count = rc.episode_count;
+
+    DROP TEMPORARY TABLE temp_cook_count, temp_national_cuisine_count, temp_recipe_count,
+        temp_episode_national_cuisine, temp_cook_national_cuisine, temp_episode_cook_cuisine,
+        temp_episode_recipe, temp_episode_judge,
+        temp_cook_cuisine_assignment, temp_recipe_assignment, temp_judge_assignment;
+END;
+//
+DELIMITER ;
+
+-- a new rank changes the tie breaks of the episodes the cook was rated in
+DELIMITER //
+CREATE TRIGGER cook_rank_winner_dirty
+AFTER UPDATE ON cook
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.cook_rank <=> OLD.cook_rank) THEN
+        INSERT INTO episode_winner_dirty(episode_id)
+        SELECT ecra.episode_id
+        FROM episode_cook_rating_aggregate ecra
+        WHERE ecra.cook_id = NEW.cook_id
+        ON DUPLICATE KEY UPDATE episode_id = episode_winner_dirty.episode_id;
+    END IF;
+END;
+//
+DELIMITER ;
+
+-- This is a procedure that will be used to declare the winner of every episode
+-- the cook with the highest total rating wins, ties are broken by the rank of the cook and then by
+-- a hash of the seed, the episode and the cook, so the same seed always declares the same winners
+-- (with a NULL seed the remaining ties are broken randomly).
+-- Only the episodes whose ratings changed since the last call, the episodes without a winner yet and
+-- the episodes declared with another seed are computed again, in a single statement, and the winners
+-- of all the episodes are returned as one result set
+DELIMITER //
+CREATE PROCEDURE declare_winners(seed VARCHAR(64))
+BEGIN
+    INSERT INTO episode_winner_dirty(episode_id)
+    SELECT e.episode_id
+    FROM episode e
+    LEFT JOIN episode_winner ew ON ew.episode_id = e.episode_id
+    WHERE (ew.episode_id IS NULL OR NOT (ew.winner_seed <=> seed))
+    AND EXISTS (
+        SELECT 1
+        FROM episode_cook_rating_aggregate ecra
+        WHERE ecra.episode_id = e.episode_id
+    )
+    ON DUPLICATE KEY UPDATE episode_id = episode_winner_dirty.episode_id;
+
+    DELETE ew
+    FROM episode_winner ew
+    INNER JOIN episode_winner_dirty d ON d.episode_id = ew.episode_id;
+
+    INSERT INTO episode_winner(episode_id, cook_id, total_rating, rank_numeric, winner_seed)
+    SELECT ranked.episode_id, ranked.cook_id, ranked.total_rating, ranked.rank_numeric, seed
+    FROM (
+        SELECT ecra.episode_id, ecra.cook_id, ecra.rating_sum AS total_rating, crn.rank_numeric,
+            ROW_NUMBER() OVER (
+                PARTITION BY ecra.episode_id
+                ORDER BY ecra.rating_sum DESC, crn.rank_numeric DESC,
+                    IF(seed IS NULL, RAND(), CRC32(CONCAT(seed, ':', ecra.episode_id, ':', ecra.cook_id)))
+            ) AS position
+        FROM episode_winner_dirty d
+        INNER JOIN episode_cook_rating_aggregate ecra ON ecra.episode_id = d.episode_id
+        INNER JOIN cook_rank_numeric crn ON crn.cook_id = ecra.cook_id
+    ) AS ranked
+    WHERE ranked.position = 1;
+
+    DELETE FROM episode_winner_dirty;
+
+    SELECT episode_id, cook_id, total_rating AS rating, rank_numeric
+    FROM episode_winner
+    ORDER BY episode_id;
+END;
+//
 DELIMITER ;
 
 GRANT INSERT, UPDATE, SELECT ON cooking_show.cook_user_recipes TO 'cook'@'localhost';
@@ -957,5 +1857,6 @@ GRANT INSERT, UPDATE, SELECT ON cooking_show.cook_user_steps TO 'cook'@'localhos
 GRANT INSERT, UPDATE, SELECT ON cooking_show.cook_user_ingredients TO 'cook'@'localhost';
 GRANT INSERT, UPDATE, SELECT ON cooking_show.cook_user_gear TO 'cook'@'localhost';
 GRANT UPDATE, SELECT ON cooking_show.cook_user_info TO 'cook'@'localhost';
+GRANT EXECUTE ON PROCEDURE cooking_show.cook_recipe_bundle TO 'cook'@'localhost';
 GRANT INSERT, SELECT ON cooking_show.recipe TO 'cook'@'localhost';
 GRANT ALL PRIVILEGES ON cooking_show.* TO 'admin'@'localhost';
@@ -0,0 +1,225 @@
+import re
+import time
+import argparse
+
+import connection as db
+from connection import get_conn, query_cursor, close_connections
+from schema import iter_statements, create_view_pattern, create_procedure_pattern
+
+# Index advisor for the views and procedures of ddl.sql.
+# It collects the columns every query joins, filters and groups on, proposes a composite index per query and table,
+# keeps the proposals that no existing index already covers, and tries them one at a time against a populated
+# database: an index is kept when the views that read its table get faster, and dropped otherwise.
+# The kept indexes are written to a migration file with the before/after timings and plans of the affected views.
+
+table_reference_pattern = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+comparison_pattern = re.compile(r'(\w+)\.(\w+)\s*(=|<=|>=|<>|<|>|\bIN\b|\bBETWEEN\b)', re.IGNORECASE)
+reverse_comparison_pattern = re.compile(r'(?:=|<=|>=|<|>)\s*(\w+)\.(\w+)', re.IGNORECASE)
+group_by_pattern = re.compile(r'\bGROUP\s+BY\s+(.+?)(?=\bORDER\b|\bLIMIT\b|\bHAVING\b|\)|;|$)', re.IGNORECASE | re.DOTALL)
+column_reference_pattern = re.compile(r'(\w+)\.(\w+)')
+
+# Words that can follow a table name in FROM/JOIN and are not an alias
+sql_keywords = {"inner", "left", "right", "join", "on", "where", "group", "order", "limit", "union", "as", "force",
+                "use", "ignore", "natural", "cross", "straight_join", "having", "set", "values", "select"}
+
+# Columns per proposed index
+MAX_INDEX_COLUMNS = 3
+
+# Runs per view when it is timed, the median is compared
+TIMING_RUNS = 5
+
+# Relative improvement of the affected views an index needs to be kept
+MIN_GAIN = 0.05
+
+# Function to list the views and procedures of ddl.sql as (kind, name, statement)
+def iter_queries(ddl_file='ddl.sql'):
+    for statement in iter_statements(ddl_file):
+        match = create_view_pattern.match(statement)
+        if match is not None:
+            yield "view", match.group(1), statement
+            continue
+        match = create_procedure_pattern.match(statement)
+        if match is not None:
+            yield "procedure", match.group(1), statement
+
+# Function to map the aliases of a statement to their tables, a table without an alias is its own alias
+def table_aliases(statement, tables):
+    aliases = {}
+    for table, alias in table_reference_pattern.findall(statement):
+        if table not in tables:
+            continue
+        aliases[table] = table
+        if alias and alias.lower() not in sql_keywords:
+            aliases[alias] = table
+    return aliases
+
+# Function to find the columns of every table a statement compares (joins and filters) and groups on
+# only the columns that exist in the table according to columns ({table: set(columns)}) are kept
+def column_usage(statement, columns):
+    aliases = table_aliases(statement, columns)
+    compared = {}
+    grouped = {}
+
+    def add(usage, alias, column):
+        table = aliases.get(alias)
+        if table is not None and column in columns[table] and column not in usage.setdefault(table, []):
+            usage[table].append(column)
+
+    for alias, column, _ in comparison_pattern.findall(statement):
+        add(compared, alias, column)
+    for alias, column in reverse_comparison_pattern.findall(statement):
+        add(compared, alias, column)
+    for group_by in group_by_pattern.findall(statement):
+        for alias, column in column_reference_pattern.findall(group_by):
+            add(grouped, alias, column)
+    return compared, grouped
+
+# Function to propose one index per table of a statement: the compared columns first, then the grouped ones
+def propose_indexes(statement, columns):
+    compared, grouped = column_usage(statement, columns)
+    proposals = []
+    for table in compared.keys() | grouped.keys():
+        index_columns = list(compared.get(table, []))
+        index_columns += [column for column in grouped.get(table, []) if column not in index_columns]
+        if index_columns:
+            proposals.append((table, tuple(index_columns[:MAX_INDEX_COLUMNS])))
+    return proposals
+
+# Function to read the columns of every table of the current database
+def read_columns():
+    columns = {}
+    with query_cursor() as cursor:
+        cursor.execute("SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE()")
+        for table, column in cursor.fetchall():
+            columns.setdefault(table, set()).add(column)
+    return columns
+
+# Function to read the column lists of the indexes of every table of the current database
+def read_indexes():
+    indexes = {}
+    with query_cursor() as cursor:
+        cursor.execute("SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS "
+                       "WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX")
+        for table, index, column in cursor.fetchall():
+            indexes.setdefault(table, {}).setdefault(index, []).append(column)
+    return {table: [tuple(index_columns) for index_columns in table_indexes.values()]
+            for table, table_indexes in indexes.items()}
+
+# Function to check if an index on the given columns is a prefix of an existing index, which makes it useless
+def is_covered(index_columns, existing):
+    return any(columns[:len(index_columns)] == index_columns for columns in existing)
+
+# Function to collect the proposals of all the views and procedures that no existing index covers,
+# as {(table, columns): [names of the queries that proposed it]}
+def collect_proposals(columns, indexes):
+    proposals = {}
+    for kind, name, statement in iter_queries():
+        for table, index_columns in propose_indexes(statement, columns):
+            if not is_covered(index_columns, indexes.get(table, [])):
+                proposals.setdefault((table, index_columns), []).append(name)
+    return proposals
+
+# Function to get the median latency of a view in milliseconds
+def time_view(view):
+    latencies = []
+    for _ in range(TIMING_RUNS):
+        with query_cursor() as cursor:
+            start = time.perf_counter()
+            cursor.execute(f"SELECT * FROM {view}")
+            cursor.fetchall()
+            latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)[len(latencies) // 2]
+
+# Function to get the plan of a view
+def explain_view(view):
+    with query_cursor() as cursor:
+        cursor.execute(f"EXPLAIN FORMAT=TREE SELECT * FROM {view}")
+        return '\n'.join(row[0] for row in cursor.fetchall())
+
+# Function to name a proposed index
+def index_name(table, index_columns):
+    return f"idx_{table}_{'_'.join(index_columns)}"[:64]
+
+# Function to try a proposed index: it is created, the views that read its table are timed before and after,
+# and it is dropped again unless they got at least MIN_GAIN faster
+def evaluate_index(table, index_columns, views):
+    before = {view: (time_view(view), explain_view(view)) for view in views}
+    name = index_name(table, index_columns)
+    connection = get_conn()
+    with query_cursor(connection) as cursor:
+        cursor.execute(f"CREATE INDEX {name} ON {table}({', '.join(index_columns)})")
+    after = {view: (time_view(view), explain_view(view)) for view in views}
+
+    total_before = sum(latency for latency, _ in before.values())
+    total_after = sum(latency for latency, _ in after.values())
+    kept = total_before > 0 and (total_before - total_after) / total_before >= MIN_GAIN
+    if not kept:
+        with query_cursor(connection) as cursor:
+            cursor.execute(f"DROP INDEX {name} ON {table}")
+    return {"table": table, "columns": index_columns, "name": name, "kept": kept,
+            "before": before, "after": after, "total_before": total_before, "total_after": total_after}
+
+# Function to propose, evaluate and apply the indexes, it returns the evaluation of every proposal
+def advise(evaluate=True):
+    columns = read_columns()
+    indexes = read_indexes()
+    proposals = collect_proposals(columns, indexes)
+    view_tables = {name: set(table_aliases(statement, columns).values())
+                   for kind, name, statement in iter_queries() if kind == "view"}
+
+    results = []
+    for (table, index_columns), queries in sorted(proposals.items()):
+        views = [view for view, tables in view_tables.items() if table in tables]
+        if not evaluate or not views:
+            # proposals that only come from procedures cannot be timed without changing the data
+            results.append({"table": table, "columns": index_columns, "name": index_name(table, index_columns),
+                            "kept": None, "queries": queries})
+            continue
+        result = evaluate_index(table, index_columns, views)
+        result["queries"] = queries
+        results.append(result)
+    return results
+
+# Function to write the kept indexes as a migration that can be run on other databases with the same schema
+def write_migration(results, migration_file):
+    with open(migration_file, 'w') as file:
+        file.write("-- Indexes kept by index_advisor.py, every one made the views that read its table faster\n")
+        for result in results:
+            if result["kept"]:
+                file.write(f"-- {', '.join(result['queries'])}: {result['total_before']:.2f} ms -> {result['total_after']:.2f} ms\n")
+                file.write(f"CREATE INDEX {result['name']} ON {result['table']}({', '.join(result['columns'])});\n")
+
+# Function to print the proposals with the before/after latency and plan of every view affected by a kept index
+def print_advice(results, show_plans=True):
+    for result in results:
+        status = {True: "kept", False: "dropped", None: "not evaluated"}[result["kept"]]
+        print(f"{result['table']}({', '.join(result['columns'])}) [{status}] from {', '.join(result['queries'])}")
+        if result["kept"] is None:
+            continue
+        for view, (latency_before, plan_before) in result["before"].items():
+            latency_after, plan_after = result["after"][view]
+            print(f"    {view:<40}{latency_before:>10.2f} ms -> {latency_after:>10.2f} ms")
+            if show_plans and result["kept"] and plan_before != plan_after:
+                print("      before:\n" + '\n'.join("        " + line for line in plan_before.splitlines()))
+                print("      after:\n" + '\n'.join("        " + line for line in plan_after.splitlines()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Propose, evaluate and apply indexes for the views and procedures of ddl.sql")
+    parser.add_argument("--dry-run", action="store_true", help="only list the proposals, without creating any index")
+    parser.add_argument("--migration-file", default="index_migration.sql", help="SQL file of the kept indexes")
+    parser.add_argument("--no-plans", action="store_true", help="do not print the plans of the affected views")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args()
+    db.configure_from_args(args)
+
+    results = advise(evaluate=not args.dry_run)
+    print_advice(results, show_plans=not args.no_plans)
+    if not args.dry_run:
+        write_migration(results, args.migration_file)
+
+    close_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+import os
+import re
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from datetime import datetime
+from contextlib import contextmanager
+
+import connection as db
+
+# Instrumentation of the statements the scripts send through connection.py.
+# Once it is enabled every connection taken from the pool is wrapped, so every statement run on it is timed and
+# counted with its rows and server round trips, and every commit is counted, under the stage the connection runs.
+# Statements slower than SLOW_MS are appended to a JSONL slow statement log with their parameters redacted,
+# and the stages in PROFILE_STAGES run under cProfile and/or tracemalloc.
+
+# Whether the connections are wrapped, enable() turns it on
+ENABLED = False
+
+# Milliseconds a statement (with the fetch of its rows) has to take to be written to the slow log
+SLOW_MS = 100.0
+
+# JSONL file of the slow statements, nothing is written when None
+SLOW_LOG = None
+
+# Stages run under the profiler, 'all' profiles every stage
+PROFILE_STAGES = set()
+
+# 'cpu' runs the profiled stages under cProfile, 'memory' under tracemalloc, 'both' under both
+PROFILE_MODE = 'cpu'
+
+# Directory of the <stage>.prof and <stage>.memory.txt files of the profiled stages
+PROFILE_DIR = 'profiles'
+
+# Stages and statements listed by print_report
+REPORT_TOP = 10
+
+# Lines of a profiled stage written to its text report, by cumulative time and by allocated size
+PROFILE_LINES = 30
+
+literal_pattern = re.compile(r"'(?:[^'\\]|\\.|'')*'|\b\d+(?:\.\d+)?\b")
+whitespace_pattern = re.compile(r'\s+')
+insert_values_pattern = re.compile(r'^\s*INSERT\b.*?\bVALUES\s*\(', re.IGNORECASE | re.DOTALL)
+
+# Function to turn a statement into the key its calls are added up under:
+# the whitespace is collapsed and the literals written into the text are replaced by ?, like the parameters
+def normalize_statement(statement):
+    return literal_pattern.sub('?', whitespace_pattern.sub(' ', statement).strip())
+
+# Function to replace a parameter by its type (and length), so the slow log holds no data of the database
+def redact(value):
+    if value is None:
+        return None
+    if isinstance(value, (str, bytes, bytearray)):
+        return f"<{type(value).__name__}:{len(value)}>"
+    return f"<{type(value).__name__}>"
+
+# Function to count the round trips of a statement: mysql.connector sends an executemany of INSERT ... VALUES
+# as a single multi-row INSERT and any other executemany one row at a time
+def count_round_trips(statement, many, batch_rows):
+    if not many or insert_values_pattern.match(statement):
+        return 1
+    return batch_rows
+
+
+# Totals of the calls of a statement, or of all the statements of a stage
+class Totals:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.round_trips = 0
+        self.commits = 0
+
+    def add(self, seconds, rows, round_trips, commits):
+        self.calls += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.rows += rows
+        self.round_trips += round_trips
+        self.commits += commits
+
+
+# Totals of every (stage, statement), of the statements of every stage, and the runs of every stage
+statement_totals = {}
+stage_totals = {}
+stage_runs = {}
+stats_lock = threading.Lock()
+slow_log_lock = threading.Lock()
+
+# Function to add a finished statement to the totals and to the slow log
+def record_statement(stage, statement, kind, seconds, rows, round_trips, commits=0, params=None, batch_rows=None,
+                     error=None):
+    with stats_lock:
+        statement_totals.setdefault((stage, statement), Totals()).add(seconds, rows, round_trips, commits)
+        stage_totals.setdefault(stage, Totals()).add(seconds, rows, round_trips, commits)
+    if SLOW_LOG is None or seconds * 1000 < SLOW_MS:
+        return
+    entry = {
+        "time": datetime.now().isoformat(timespec='milliseconds'),
+        "stage": stage,
+        "kind": kind,
+        "statement": statement,
+        "ms": round(seconds * 1000, 3),
+        "rows": rows,
+        "round_trips": round_trips,
+        "params": [redact(value) for value in params] if params else None,
+    }
+    if batch_rows is not None:
+        entry["batch_rows"] = batch_rows
+    if error is not None:
+        entry["error"] = error
+    with slow_log_lock:
+        with open(SLOW_LOG, 'a') as file:
+            file.write(json.dumps(entry) + '\n')
+
+
+# Result set of a procedure call that adds the rows fetched from it to the call
+class InstrumentedResult:
+    def __init__(self, result, cursor):
+        self.result = result
+        self.cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self.result, name)
+
+    def fetchone(self):
+        return self.cursor.fetched(self.result.fetchone)
+
+    def fetchall(self):
+        return self.cursor.fetched(self.result.fetchall)
+
+
+# Cursor that times every statement until the next one starts or the cursor is closed,
+# the time and rows of the fetches are added to the statement they read
+class InstrumentedCursor:
+    def __init__(self, cursor, connection):
+        self.cursor = cursor
+        self.connection = connection
+        self.current = None
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        for row in self.cursor:
+            if self.current is not None:
+                self.current["rows"] += 1
+            yield row
+
+    # runs a call of the cursor as a new statement
+    def run(self, kind, query, params, many, call):
+        self.finish()
+        statement = normalize_statement(query)
+        batch_rows = len(params) if many else None
+        self.current = {
+            "stage": self.connection.stage, "statement": statement, "kind": kind, "seconds": 0.0, "rows": 0,
+            "round_trips": count_round_trips(statement, many, batch_rows or 0),
+            "params": params[0] if many and params else params, "batch_rows": batch_rows, "error": None,
+        }
+        start = time.perf_counter()
+        try:
+            return call()
+        except Exception as error:
+            self.current["error"] = type(error).__name__
+            raise
+        finally:
+            self.current["seconds"] += time.perf_counter() - start
+            # writes count the rows they changed, reads the rows fetched from them
+            if self.cursor.description is None and kind != "callproc":
+                self.current["rows"] = max(self.cursor.rowcount or 0, 0)
+
+    # runs a fetch and adds its time and rows to the current statement
+    def fetched(self, fetch):
+        start = time.perf_counter()
+        rows = fetch()
+        if self.current is not None:
+            self.current["seconds"] += time.perf_counter() - start
+            if isinstance(rows, list):
+                self.current["rows"] += len(rows)
+            elif rows is not None:
+                self.current["rows"] += 1
+        return rows
+
+    def finish(self):
+        if self.current is not None:
+            current, self.current = self.current, None
+            record_statement(**current)
+
+    def execute(self, query, data=None):
+        return self.run("execute", query, data, False, lambda: self.cursor.execute(query, data))
+
+    def executemany(self, query, rows):
+        rows = list(rows)
+        return self.run("executemany", query, rows, True, lambda: self.cursor.executemany(query, rows))
+
+    def callproc(self, name, args=()):
+        return self.run("callproc", f"CALL {name}", list(args), False, lambda: self.cursor.callproc(name, args))
+
+    def stored_results(self):
+        return [InstrumentedResult(result, self) for result in self.cursor.stored_results()]
+
+    def fetchone(self):
+        return self.fetched(self.cursor.fetchone)
+
+    def fetchall(self):
+        return self.fetched(self.cursor.fetchall)
+
+    def close(self):
+        self.finish()
+        self.cursor.close()
+
+
+# Pooled connection whose cursors are instrumented, it counts its commits under the stage it runs
+class InstrumentedConnection:
+    def __init__(self, connection):
+        self.connection = connection
+        self.stage = None
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self.connection.cursor(*args, **kwargs), self)
+
+    def commit(self):
+        start = time.perf_counter()
+        self.connection.commit()
+        record_statement(self.stage, "COMMIT", "commit", time.perf_counter() - start, 0, 1, commits=1)
+
+
+# Function to wrap every connection taken from the pool from now on, connections already taken stay as they are
+def enable():
+    global ENABLED
+    ENABLED = True
+    db.connection_wrapper = InstrumentedConnection
+
+def disable():
+    global ENABLED
+    ENABLED = False
+    db.connection_wrapper = None
+
+# Function to forget the totals of the statements and stages recorded so far
+def reset():
+    with stats_lock:
+        statement_totals.clear()
+        stage_totals.clear()
+        stage_runs.clear()
+
+# Whether a stage runs under the profiler
+def is_profiled(name):
+    return 'all' in PROFILE_STAGES or name in PROFILE_STAGES
+
+memory_tracers = 0
+memory_lock = threading.Lock()
+
+# Context manager that runs a stage under cProfile and/or tracemalloc and writes their reports to PROFILE_DIR,
+# it returns the file names and the peak memory of the stage in the given run dict.
+# cProfile only sees the thread of the stage and tracemalloc every thread, so stages that run at the same time
+# (--workers above 1) share their peaks: profile with one worker for exact numbers.
+@contextmanager
+def profiled(name, run):
+    global memory_tracers
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profiler = cProfile.Profile() if PROFILE_MODE in ('cpu', 'both') else None
+    trace_memory = PROFILE_MODE in ('memory', 'both')
+    if trace_memory:
+        with memory_lock:
+            if memory_tracers == 0:
+                tracemalloc.start()
+            memory_tracers += 1
+            tracemalloc.reset_peak()
+            start_bytes = tracemalloc.get_traced_memory()[0]
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            run["profile"] = os.path.join(PROFILE_DIR, f"{name}.prof")
+            profiler.dump_stats(run["profile"])
+            with open(os.path.join(PROFILE_DIR, f"{name}.txt"), 'w') as file:
+                pstats.Stats(profiler, stream=file).sort_stats("cumulative").print_stats(PROFILE_LINES)
+        if trace_memory:
+            with memory_lock:
+                run["peak_bytes"] = tracemalloc.get_traced_memory()[1] - start_bytes
+                snapshot = tracemalloc.take_snapshot()
+                memory_tracers -= 1
+                if memory_tracers == 0:
+                    tracemalloc.stop()
+            run["memory_report"] = os.path.join(PROFILE_DIR, f"{name}.memory.txt")
+            with open(run["memory_report"], 'w') as file:
+                for stat in snapshot.statistics("lineno")[:PROFILE_LINES]:
+                    file.write(f"{stat}\n")
+
+# Context manager that runs a block as a stage: its statements are recorded under the stage name,
+# its wall time is recorded and it runs under the profiler if it is in PROFILE_STAGES
+@contextmanager
+def stage(name):
+    if not ENABLED:
+        yield
+        return
+    connection = db.get_conn()
+    previous = getattr(connection, "stage", None)
+    if isinstance(connection, InstrumentedConnection):
+        connection.stage = name
+    run = {"seconds": 0.0, "peak_bytes": None, "profile": None, "memory_report": None}
+    start = time.perf_counter()
+    try:
+        if is_profiled(name):
+            with profiled(name, run):
+                yield
+        else:
+            yield
+    finally:
+        run["seconds"] = time.perf_counter() - start
+        if isinstance(connection, InstrumentedConnection):
+            connection.stage = previous
+        with stats_lock:
+            stage_runs.setdefault(name, []).append(run)
+
+# Function to run a function as a stage, e.g. the func of a scheduler.Stage
+def run_stage(name, func):
+    with stage(name):
+        return func()
+
+# Function to rank the stages by their wall time and the statements by their total time
+# it returns (stages, statements), two lists of dicts
+def summary():
+    with stats_lock:
+        names = list(stage_runs) + [name for name in stage_totals if name not in stage_runs]
+        stages = []
+        for name in names:
+            runs = stage_runs.get(name, [])
+            totals = stage_totals.get(name, Totals())
+            peaks = [run["peak_bytes"] for run in runs if run["peak_bytes"] is not None]
+            stages.append({
+                "stage": name,
+                "runs": len(runs),
+                "seconds": sum(run["seconds"] for run in runs) if runs else None,
+                "statements": totals.calls - totals.commits,
+                "db_seconds": totals.seconds,
+                "rows": totals.rows,
+                "commits": totals.commits,
+                "round_trips": totals.round_trips,
+                "peak_bytes": max(peaks) if peaks else None,
+                "profiles": [path for run in runs for path in (run["profile"], run["memory_report"]) if path],
+            })
+        statements = [
+            {"stage": name, "statement": statement, "calls": totals.calls, "seconds": totals.seconds,
+             "mean_ms": totals.seconds / totals.calls * 1000, "max_ms": totals.max_seconds * 1000,
+             "rows": totals.rows, "round_trips": totals.round_trips}
+            for (name, statement), totals in statement_totals.items()
+        ]
+    stages.sort(key=lambda row: row["seconds"] if row["seconds"] is not None else row["db_seconds"], reverse=True)
+    statements.sort(key=lambda row: row["seconds"], reverse=True)
+    return stages, statements
+
+# Function to print the REPORT_TOP most expensive stages and statements
+def print_report(top=None):
+    top = top or REPORT_TOP
+    stages, statements = summary()
+    print(f"{'stage':<28}{'seconds':>10}{'db secs':>10}{'stmts':>9}{'rows':>11}{'commits':>9}{'trips':>9}{'peak MB':>9}")
+    for row in stages[:top]:
+        seconds = f"{row['seconds']:.3f}" if row["seconds"] is not None else "-"
+        peak = f"{row['peak_bytes'] / 2 ** 20:.1f}" if row["peak_bytes"] is not None else "-"
+        print(f"{row['stage'] or '-':<28}{seconds:>10}{row['db_seconds']:>10.3f}{row['statements']:>9}{row['rows']:>11}"
+              f"{row['commits']:>9}{row['round_trips']:>9}{peak:>9}")
+        for path in row["profiles"]:
+            print(f"    profile: {path}")
+    print(f"\n{'seconds':>9}{'calls':>8}{'mean ms':>10}{'max ms':>10}{'rows':>11}{'trips':>9}  {'stage':<22}statement")
+    for row in statements[:top]:
+        statement = row["statement"] if len(row["statement"]) <= 80 else row["statement"][:77] + "..."
+        print(f"{row['seconds']:>9.3f}{row['calls']:>8}{row['mean_ms']:>10.2f}{row['max_ms']:>10.2f}{row['rows']:>11}"
+              f"{row['round_trips']:>9}  {row['stage'] or '-':<22}{statement}")
+
+# Function to add the instrumentation flags to the parser of a script
+def add_instrumentation_arguments(parser):
+    group = parser.add_argument_group("instrumentation", "time and count the statements of every stage")
+    group.add_argument("--instrument", action="store_true",
+                       help="print the most expensive stages and statements at the end")
+    group.add_argument("--slow-log", help="JSONL file the statements slower than --slow-ms are appended to, "
+                                          "with their parameters redacted (implies --instrument)")
+    group.add_argument("--slow-ms", type=float, default=SLOW_MS, help=f"threshold of the slow log, {SLOW_MS} by default")
+    group.add_argument("--profile-stages", nargs="+", metavar="STAGE",
+                       help="stages to run under the profiler, 'all' for every stage (implies --instrument)")
+    group.add_argument("--profile-mode", choices=["cpu", "memory", "both"], default=PROFILE_MODE,
+                       help="profile the stages with cProfile, tracemalloc or both")
+    group.add_argument("--profile-dir", default=PROFILE_DIR, help="directory of the profile reports")
+
+# Function to set up the instrumentation from the parsed flags of add_instrumentation_arguments,
+# before the first connection is taken
+def configure_from_args(args):
+    global SLOW_MS, SLOW_LOG, PROFILE_STAGES, PROFILE_MODE, PROFILE_DIR
+    SLOW_MS = args.slow_ms
+    SLOW_LOG = args.slow_log
+    PROFILE_STAGES = set(args.profile_stages or [])
+    PROFILE_MODE = args.profile_mode
+    PROFILE_DIR = args.profile_dir
+    if args.instrument or SLOW_LOG or PROFILE_STAGES:
+        enable()
@@ -0,0 +1,379 @@
+import time
+import argparse
+import threading
+from collections import OrderedDict, namedtuple
+
+import connection as db
+import instrumentation
+from connection import query_cursor, close_connections
+from schema import SchemaDependencies
+
+# Python access to the 3.x queries of ddl.sql.
+# Every view and procedure has a function that returns its rows as named tuples. The results are kept in an
+# LRU cache with a TTL, keyed by the query and its arguments. Every entry remembers the change counters of the
+# tables the query reads, and the write paths of db_data.py, aggregates.py and assignment_engine.py bump the
+# counters of the tables they write (with the tables their triggers write), so an entry is only served
+# while none of its tables changed in this process. The TTL bounds how stale a result can get from writes made
+# by other processes.
+
+# Entries kept by the cache, the least recently used one is evicted first
+CACHE_SIZE = 256
+
+# Seconds an entry is served without checking the database
+CACHE_TTL = 300.0
+
+schema_dependencies = None
+schema_dependencies_guard = threading.Lock()
+
+# Function to get what the views, procedures and triggers of ddl.sql read and write, parsed on first use
+def get_schema_dependencies():
+    global schema_dependencies
+    with schema_dependencies_guard:
+        if schema_dependencies is None:
+            schema_dependencies = SchemaDependencies()
+        return schema_dependencies
+
+# Change counter of every table written by this process
+table_versions = {}
+table_versions_lock = threading.Lock()
+
+# Tables read by every query, written by the writes of every table (with its triggers),
+# and written by every procedure and statement, computed once
+read_tables = {}
+table_effects = {}
+written_tables = {}
+
+# Function to add one to the counters of the given tables
+def increment_versions(tables):
+    with table_versions_lock:
+        for table in tables:
+            table_versions[table] = table_versions.get(table, 0) + 1
+
+# Function to bump the counters of the given tables and of the tables their triggers write
+def bump_tables(tables):
+    dependencies = get_schema_dependencies()
+    changed = set()
+    for table in tables:
+        if table not in table_effects:
+            table_effects[table] = dependencies.table_writes(table)
+        changed |= table_effects[table]
+    increment_versions(changed)
+
+# Function to bump the counters of the tables a procedure (by name) or a SQL statement writes
+def bump_writes(name_or_statement):
+    if name_or_statement not in written_tables:
+        written_tables[name_or_statement] = get_schema_dependencies().writes(name_or_statement)
+    increment_versions(written_tables[name_or_statement])
+
+# Function to bump the counter of every table, after the schema is emptied or rebuilt
+def bump_all_tables():
+    bump_tables(get_schema_dependencies().tables)
+
+# Function to read the counters of the given tables
+def read_table_versions(tables):
+    with table_versions_lock:
+        return tuple((table, table_versions.get(table, 0)) for table in sorted(tables))
+
+
+# LRU cache of query results with a TTL, an entry is dropped when the counter of a table it read has changed
+class ResultCache:
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or CACHE_SIZE
+        self.ttl = ttl if ttl is not None else CACHE_TTL
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    # returns the cached rows of key, or None when there is no valid entry
+    def get(self, key, versions):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                rows, entry_versions, stored_at, seconds = entry
+                if time.monotonic() - stored_at > self.ttl:
+                    self.expirations += 1
+                    entry = None
+                elif entry_versions != versions:
+                    self.invalidations += 1
+                    entry = None
+                if entry is None:
+                    del self.entries[key]
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += seconds
+            return rows
+
+    # stores the rows of key with the table counters read before the query ran and the seconds it took
+    def put(self, key, versions, rows, seconds):
+        with self.lock:
+            self.entries[key] = (rows, versions, time.monotonic(), seconds)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "saved_ms": self.saved_seconds * 1000,
+            }
+
+result_cache = ResultCache()
+
+# Function to get the statistics of the result cache: hits, misses, hit rate, dropped entries and the
+# milliseconds the hits saved, i.e. the latency the cached queries had when they ran
+def cache_stats():
+    return result_cache.stats()
+
+# Function to empty the result cache
+def clear_cache():
+    result_cache.clear()
+
+row_types = {}
+
+# Function to get the named tuple of the rows of a query with the given column names
+def row_type(name, columns):
+    key = (name, tuple(columns))
+    if key not in row_types:
+        row_types[key] = namedtuple(f"{name}_row", columns, rename=True)
+    return row_types[key]
+
+# Function to run a view or procedure on the database, it returns every result set as a tuple of named tuples
+def fetch_result_sets(kind, name, args=()):
+    with query_cursor() as cursor:
+        if kind == "view":
+            cursor.execute(f"SELECT * FROM {name}")
+            results = [(cursor.description, cursor.fetchall())]
+        else:
+            cursor.callproc(name, args)
+            results = [(result.description, result.fetchall()) for result in cursor.stored_results()]
+    result_sets = []
+    for description, result_rows in results:
+        make_row = row_type(name, [column[0] for column in description])
+        result_sets.append(tuple(make_row(*row) for row in result_rows))
+    return tuple(result_sets)
+
+# Function to run a view or procedure on the database, it returns the rows of all its result sets as named tuples
+def fetch_rows(kind, name, args=()):
+    return tuple(row for result_set in fetch_result_sets(kind, name, args) for row in result_set)
+
+# Function to get the result of a view or procedure from the cache, running fetch on a miss
+def cached_query(kind, name, args=(), fetch=fetch_rows):
+    key = (name, tuple(args))
+    if name not in read_tables:
+        read_tables[name] = get_schema_dependencies().reads(name)
+    versions = read_table_versions(read_tables[name])
+    rows = result_cache.get(key, versions)
+    if rows is None:
+        start = time.perf_counter()
+        rows = fetch(kind, name, args)
+        result_cache.put(key, versions, rows, time.perf_counter() - start)
+    return rows
+
+# Function to get the rows of any view of ddl.sql
+def view(name):
+    return cached_query("view", name)
+
+
+# 3.1: mean rating of every cook
+def cook_mean_rating():
+    return view("cook_mean_rating")
+
+# 3.1: mean rating of every national cuisine
+def national_cuisine_mean_rating():
+    return view("national_cuisine_mean_rating")
+
+# 3.2: the cooks of a national cuisine and whether they took part in an episode of the season
+def cuisine_year_cook_participations(season, cuisine):
+    return cached_query("procedure", "cuisine_year_cook_participations", (season, cuisine))
+
+# 3.3: the ten cooks under 30 with the most recipes
+def young_cooks_with_most_recipes():
+    return view("young_cooks_with_most_recipes")
+
+# 3.4: the cooks that were never judges
+def never_selected_as_judge():
+    return view("never_selected_as_judge")
+
+# 3.5: the pairs of judges with the same number of episodes (more than 3) in a season
+def judges_with_equal_episode_count():
+    return view("judges_with_equal_episode_count")
+
+# 3.6: the three most used tag pairs, read from the precomputed pair counts
+def most_used_tag_combinations():
+    return view("most_used_tag_combinations_precomputed")
+
+# 3.7: the cooks with at most five episodes fewer than the cook with the most
+def five_less_than_the_most():
+    return view("five_less_than_the_most")
+
+# 3.8: the episode with the most gear
+def episode_with_most_gear():
+    return view("episode_with_most_gear")
+
+# 3.9: the mean carbohydrates of the recipes of every season
+def mean_carbs_per_year():
+    return view("mean_carbs_per_year")
+
+# 3.10: the pairs of cuisines with the same number of participations in two consecutive seasons
+def cuisine_equal_two_year_participations():
+    return view("cuisine_equal_two_year_participations")
+
+# 3.11: the five judge and cook pairs with the highest total rating
+def top_rating_judges():
+    return view("top_rating_judges")
+
+# 3.12: the episode with the hardest recipes
+def hardest_recipes_episode():
+    return view("hardest_recipes_episode")
+
+# 3.13: the episode whose cooks and judges have the lowest total rank
+def lowest_total_rank_episode():
+    return view("lowest_total_rank_episode")
+
+# 3.14: the number of episode recipes of every theme
+def theme_with_most_appearances():
+    return view("theme_with_most_appearances")
+
+# 3.15: the food groups no recipe of an episode uses
+def never_used_food_groups():
+    return view("never_used_food_groups")
+
+# The recipe book of a cook: the cook row and a CookRecipe for every recipe he knows
+CookBundle = namedtuple("CookBundle", ["cook", "recipes"])
+
+# A recipe with its nutritional info, calories and image, its steps in order, its ingredients and its gear
+CookRecipe = namedtuple("CookRecipe", ["recipe", "steps", "ingredients", "gear"])
+
+# Function to group the rows of a result set of cook_recipe_bundle by their recipe_id
+def rows_by_recipe(rows):
+    groups = {}
+    for row in rows:
+        groups.setdefault(row.recipe_id, []).append(row)
+    return groups
+
+# Function to get the recipe book of any cook with one call of cook_recipe_bundle, instead of the five
+# cook_user_* views that only show cook 1. It returns None for a cook that does not exist
+def cook_recipe_bundle(cook_id):
+    cooks, recipes, steps, ingredients, gear = cached_query("procedure", "cook_recipe_bundle", (cook_id,), fetch_result_sets)
+    if not cooks:
+        return None
+    steps = rows_by_recipe(steps)
+    ingredients = rows_by_recipe(ingredients)
+    gear = rows_by_recipe(gear)
+    return CookBundle(cooks[0], tuple(
+        CookRecipe(recipe, tuple(steps.get(recipe.recipe_id, ())), tuple(ingredients.get(recipe.recipe_id, ())),
+                   tuple(gear.get(recipe.recipe_id, ())))
+        for recipe in recipes
+    ))
+
+# Functions of the 3.x queries by name, for the command line
+report_queries = {
+    "cook_mean_rating": cook_mean_rating,
+    "national_cuisine_mean_rating": national_cuisine_mean_rating,
+    "cuisine_year_cook_participations": cuisine_year_cook_participations,
+    "young_cooks_with_most_recipes": young_cooks_with_most_recipes,
+    "never_selected_as_judge": never_selected_as_judge,
+    "judges_with_equal_episode_count": judges_with_equal_episode_count,
+    "most_used_tag_combinations": most_used_tag_combinations,
+    "five_less_than_the_most": five_less_than_the_most,
+    "episode_with_most_gear": episode_with_most_gear,
+    "mean_carbs_per_year": mean_carbs_per_year,
+    "cuisine_equal_two_year_participations": cuisine_equal_two_year_participations,
+    "top_rating_judges": top_rating_judges,
+    "hardest_recipes_episode": hardest_recipes_episode,
+    "lowest_total_rank_episode": lowest_total_rank_episode,
+    "theme_with_most_appearances": theme_with_most_appearances,
+    "never_used_food_groups": never_used_food_groups,
+}
+
+# Function to print rows as a table with the column names of their named tuple
+def print_rows(rows):
+    if not rows:
+        print("(no rows)")
+        return
+    columns = rows[0]._fields
+    widths = [max(len(column), *(len(str(row[index])) for row in rows)) for index, column in enumerate(columns)]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(value).ljust(width) for value, width in zip(row, widths)))
+
+# Function to print the recipe book of a cook returned by cook_recipe_bundle
+def print_cook_bundle(bundle):
+    if bundle is None:
+        print("(no such cook)")
+        return
+    cook = bundle.cook
+    print(f"{cook.first_name} {cook.last_name} ({cook.cook_rank}), {len(bundle.recipes)} recipes")
+    for recipe in bundle.recipes:
+        calories = f"{recipe.recipe.calories:.0f} kcal" if recipe.recipe.calories is not None else "no calories"
+        print(f"\n{recipe.recipe.title} ({recipe.recipe.category}, {calories} per serving)")
+        for ingredient in recipe.ingredients:
+            print(f"  - {ingredient.quantity} {ingredient.title}")
+        for gear in recipe.gear:
+            print(f"  * {gear.quantity} x {gear.title}")
+        for step in recipe.steps:
+            print(f"  {step.ordering}. {step.small_description}")
+
+# Function to print the statistics of the result cache
+def print_cache_stats():
+    stats = cache_stats()
+    print(f"cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), "
+          f"{stats['invalidations']} invalidated, {stats['expirations']} expired, {stats['evictions']} evicted, "
+          f"{stats['saved_ms']:.2f} ms saved")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the 3.x queries of the cooking_show database")
+    parser.add_argument("query", choices=list(report_queries) + ["cook_recipe_bundle"])
+    parser.add_argument("args", nargs="*", help="arguments of the query, e.g. the season and cuisine of cuisine_year_cook_participations "
+                                                "or the cook id of cook_recipe_bundle")
+    parser.add_argument("--repeat", type=int, default=1, help="run the query this many times and print the cache statistics")
+    db.add_connection_arguments(parser)
+    instrumentation.add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+    db.configure_from_args(args)
+    instrumentation.configure_from_args(args)
+
+    query_args = [int(arg) if arg.isdigit() else arg for arg in args.args]
+    if args.query == "cook_recipe_bundle":
+        for _ in range(args.repeat):
+            with instrumentation.stage(args.query):
+                bundle = cook_recipe_bundle(*query_args)
+        print_cook_bundle(bundle)
+    else:
+        for _ in range(args.repeat):
+            with instrumentation.stage(args.query):
+                rows = report_queries[args.query](*query_args)
+        print_rows(rows)
+    if args.repeat > 1:
+        print_cache_stats()
+    if instrumentation.ENABLED:
+        print()
+        instrumentation.print_report()
+
+    close_connections()
+
+
+if __name__ == "__main__":
+    main()
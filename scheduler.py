@@ -0,0 +1,107 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Dependency-aware runner for the population stages of db_data.py.
+# A stage touches the tables it reads, the tables it writes and the tables those writes reference by foreign key
+# (an insert into a child table locks the parent row it points to).
+# A stage depends on every earlier stage that writes a table the stage touches, or touches a table the stage writes.
+# Stages without a path between them in this DAG run concurrently, each on a worker thread with its own connection.
+
+class Stage:
+    def __init__(self, name, func, writes, reads=()):
+        self.name = name
+        self.func = func
+        self.writes = set(writes)
+        self.reads = set(reads)
+        self.depends_on = []
+        self.start = None
+        self.end = None
+
+    @property
+    def seconds(self):
+        return self.end - self.start
+
+
+# Function to find the stages every stage has to wait for, using the foreign key graph of schema.foreign_key_graph
+# dependencies already implied by another dependency are dropped, so depends_on only keeps the direct ones
+def resolve_dependencies(stages, fk_graph):
+    touches = {}
+    ancestors = {}
+    for index, stage in enumerate(stages):
+        touches[stage] = stage.reads | stage.writes
+        for table in stage.writes:
+            touches[stage] |= fk_graph.get(table, set())
+        depends_on = [
+            earlier for earlier in stages[:index]
+            if earlier.writes & touches[stage] or touches[earlier] & stage.writes
+        ]
+        implied = set()
+        for dependency in depends_on:
+            implied |= ancestors[dependency]
+        stage.depends_on = [dependency for dependency in depends_on if dependency not in implied]
+        ancestors[stage] = implied | set(depends_on)
+    return stages
+
+
+# Function to run the stages on a pool of worker threads, starting every stage as soon as its dependencies are done
+# before_stage(stage) is called in the worker thread right before the stage, to prepare its per thread state
+def run_stages(stages, fk_graph, workers=1, before_stage=None):
+    resolve_dependencies(stages, fk_graph)
+    run_start = time.perf_counter()
+    done = set()
+    running = {}
+    pending = list(stages)
+    lock = threading.Lock()
+
+    def run(stage):
+        if before_stage is not None:
+            before_stage(stage)
+        with lock:
+            stage.start = time.perf_counter() - run_start
+        stage.func()
+        with lock:
+            stage.end = time.perf_counter() - run_start
+        return stage
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stage") as executor:
+        while pending or running:
+            for stage in [stage for stage in pending if all(dependency in done for dependency in stage.depends_on)]:
+                pending.remove(stage)
+                running[executor.submit(run, stage)] = stage
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                # a failed stage stops the run, the stages already running are left to finish
+                future.result()
+                done.add(stage)
+    return stages
+
+
+# Function to find the chain of dependent stages with the largest total duration
+def critical_path(stages):
+    finish = {}
+    previous = {}
+    for stage in stages:
+        longest = max(stage.depends_on, key=lambda dependency: finish[dependency], default=None)
+        previous[stage] = longest
+        finish[stage] = stage.seconds + (finish[longest] if longest is not None else 0.0)
+    last = max(stages, key=lambda stage: finish[stage])
+    path = []
+    while last is not None:
+        path.append(last)
+        last = previous[last]
+    return list(reversed(path))
+
+
+# Function to print the timings of every stage and the critical path of the run
+def print_stage_report(stages):
+    print(f"{'stage':<28}{'start':>10}{'end':>10}{'seconds':>10}  depends on")
+    for stage in sorted(stages, key=lambda stage: stage.start):
+        depends_on = ', '.join(dependency.name for dependency in stage.depends_on)
+        print(f"{stage.name:<28}{stage.start:>10.3f}{stage.end:>10.3f}{stage.seconds:>10.3f}  {depends_on}")
+
+    path = critical_path(stages)
+    wall = max(stage.end for stage in stages) - min(stage.start for stage in stages)
+    print(f"Critical path ({sum(stage.seconds for stage in path):.3f}s of {wall:.3f}s wall time): "
+          + ' -> '.join(stage.name for stage in path))
@@ -0,0 +1,181 @@
+import re
+
+# Helpers that read ddl.sql, so the population scripts follow the schema instead of hardcoding it
+
+DDL_FILE = 'ddl.sql'
+
+# Function to split a MySQL script into statements, following the DELIMITER changes around triggers and procedures
+def iter_statements(ddl_file=DDL_FILE):
+    delimiter = ';'
+    statement = []
+    with open(ddl_file, 'r') as file:
+        for line in file:
+            stripped = line.strip()
+            if stripped.upper().startswith('DELIMITER'):
+                delimiter = stripped.split()[1]
+                continue
+            if not statement and (stripped == '' or stripped.startswith('--')):
+                continue
+            if stripped.endswith(delimiter):
+                statement.append(line.rstrip()[:-len(delimiter)])
+                text = '\n'.join(statement).strip()
+                statement = []
+                if text:
+                    yield text
+            else:
+                statement.append(line.rstrip())
+    text = '\n'.join(statement).strip()
+    if text:
+        yield text
+
+
+create_table_pattern = re.compile(r'^CREATE\s+TABLE\s+(\w+)', re.IGNORECASE)
+alter_table_pattern = re.compile(r'^ALTER\s+TABLE\s+(\w+)', re.IGNORECASE)
+references_pattern = re.compile(r'REFERENCES\s+(\w+)\s*\(', re.IGNORECASE)
+
+# Function to build the foreign key graph of ddl.sql: every table mapped to the set of tables it references
+def foreign_key_graph(ddl_file=DDL_FILE):
+    graph = {}
+    for statement in iter_statements(ddl_file):
+        match = create_table_pattern.match(statement) or alter_table_pattern.match(statement)
+        if match is None:
+            continue
+        table = match.group(1)
+        parents = graph.setdefault(table, set())
+        for parent in references_pattern.findall(statement):
+            if parent != table:
+                parents.add(parent)
+    return graph
+
+
+# Function to order the tables so that every table comes after the tables it references
+# ties are broken by the order of the tables in ddl.sql
+def dependency_order(graph):
+    order = []
+    placed = set()
+    remaining = list(graph)
+    while remaining:
+        ready = [table for table in remaining if graph[table] <= placed]
+        if not ready:
+            raise ValueError(f"Foreign key cycle between the tables {', '.join(remaining)}")
+        for table in ready:
+            order.append(table)
+            placed.add(table)
+        remaining = [table for table in remaining if table not in placed]
+    return order
+
+
+create_view_pattern = re.compile(r'^CREATE\s+VIEW\s+(\w+)', re.IGNORECASE)
+
+# Function to list the views of ddl.sql in the order they are created
+def view_names(ddl_file=DDL_FILE):
+    return [match.group(1) for match in map(create_view_pattern.match, iter_statements(ddl_file)) if match is not None]
+
+
+unique_column_pattern = re.compile(r'^\s*(\w+)\s+[^,]*\bUNIQUE\b', re.IGNORECASE | re.MULTILINE)
+unique_key_pattern = re.compile(r'\bUNIQUE\s+(?:KEY|INDEX)?\s*\w*\s*\(', re.IGNORECASE)
+create_unique_index_pattern = re.compile(r'^CREATE\s+UNIQUE\s+INDEX\s+\w+\s+ON\s+(\w+)', re.IGNORECASE)
+
+# Function to find the tables with a UNIQUE key besides their primary key,
+# turning off unique_checks is only safe for the other tables
+def unique_key_tables(ddl_file=DDL_FILE):
+    tables = set()
+    for statement in iter_statements(ddl_file):
+        match = create_unique_index_pattern.match(statement)
+        if match is not None:
+            tables.add(match.group(1))
+            continue
+        match = create_table_pattern.match(statement) or alter_table_pattern.match(statement)
+        if match is None:
+            continue
+        if unique_column_pattern.search(statement) or unique_key_pattern.search(statement):
+            tables.add(match.group(1))
+    return tables
+
+
+primary_key_pattern = re.compile(r'\bPRIMARY\s+KEY\s*\(([^)]*)\)', re.IGNORECASE)
+
+# Function to map every table of ddl.sql to the columns of its primary key
+def primary_keys(ddl_file=DDL_FILE):
+    keys = {}
+    for statement in iter_statements(ddl_file):
+        match = create_table_pattern.match(statement)
+        if match is None:
+            continue
+        key = primary_key_pattern.search(statement)
+        if key is not None:
+            keys[match.group(1)] = [column.strip() for column in key.group(1).split(',')]
+    return keys
+
+
+create_procedure_pattern = re.compile(r'^CREATE\s+PROCEDURE\s+(\w+)', re.IGNORECASE)
+create_trigger_pattern = re.compile(r'^CREATE\s+TRIGGER\s+\w+\s+(?:BEFORE|AFTER)\s+(?:INSERT|UPDATE|DELETE)\s+ON\s+(\w+)',
+                                    re.IGNORECASE)
+read_table_pattern = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)', re.IGNORECASE)
+write_table_pattern = re.compile(r'\b(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM|'
+                                 r'TRUNCATE(?:\s+TABLE)?|ALTER\s+TABLE|INTO\s+TABLE)\s+(\w+)', re.IGNORECASE)
+call_pattern = re.compile(r'\bCALL\s+(\w+)', re.IGNORECASE)
+
+
+# What the views, procedures and triggers of ddl.sql read and write, following views, CALLs and triggers
+class SchemaDependencies:
+    def __init__(self, ddl_file=DDL_FILE):
+        self.tables = set()
+        self.views = {}
+        self.procedures = {}
+        self.triggers = {}
+        for statement in iter_statements(ddl_file):
+            match = create_table_pattern.match(statement)
+            if match is not None:
+                self.tables.add(match.group(1))
+                continue
+            match = create_view_pattern.match(statement)
+            if match is not None:
+                self.views[match.group(1)] = statement
+                continue
+            match = create_procedure_pattern.match(statement)
+            if match is not None:
+                self.procedures[match.group(1)] = statement
+                continue
+            match = create_trigger_pattern.match(statement)
+            if match is not None:
+                self.triggers.setdefault(match.group(1), []).append(statement)
+
+    # the tables a view, a procedure or any other statement reads, through the views it selects from
+    def reads(self, name_or_statement, visited=None):
+        visited = visited if visited is not None else set()
+        if name_or_statement in visited:
+            return set()
+        visited.add(name_or_statement)
+        statement = self.views.get(name_or_statement) or self.procedures.get(name_or_statement) or name_or_statement
+        tables = set()
+        for name in read_table_pattern.findall(statement) + call_pattern.findall(statement):
+            if name in self.tables:
+                tables.add(name)
+            elif name in self.views or name in self.procedures:
+                tables |= self.reads(name, visited)
+        return tables
+
+    # the tables a procedure or any other statement writes, with the tables the triggers of those tables write
+    def writes(self, name_or_statement, visited=None):
+        visited = visited if visited is not None else set()
+        if name_or_statement in visited:
+            return set()
+        visited.add(name_or_statement)
+        statement = self.procedures.get(name_or_statement, name_or_statement)
+        tables = set()
+        for name in write_table_pattern.findall(statement):
+            if name in self.tables:
+                tables |= self.table_writes(name, visited)
+        for name in call_pattern.findall(statement):
+            if name in self.procedures:
+                tables |= self.writes(name, visited)
+        return tables
+
+    # a table and the tables its triggers write when it is written
+    def table_writes(self, table, visited=None):
+        visited = visited if visited is not None else set()
+        tables = {table}
+        for trigger in self.triggers.get(table, []):
+            tables |= self.writes(trigger, visited)
+        return tables
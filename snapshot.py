@@ -0,0 +1,279 @@
+import os
+import gzip
+import json
+import time
+import shutil
+import pickle
+import hashlib
+import argparse
+from datetime import datetime
+
+import db_data
+import connection as db
+from connection import query_cursor, close_connections
+from aggregates import rebuild_derived_aggregate
+from schema import DDL_FILE, foreign_key_graph, dependency_order, primary_keys
+
+# Snapshot cache of the datasets of db_data.py.
+# After a seeded run every table is dumped column by column into a gzip file of pickled chunks, in a directory
+# keyed by the seed, the scale factor, the assignment and generator modes and the hash of ddl.sql. A later run with the same key
+# empties the database and bulk loads the dump through the writers of db_data.py instead of generating it again.
+# The tables the triggers maintain, and episode_winner, are not dumped: the triggers fill them during the load,
+# and the ones the bulk flags skip are rebuilt afterwards like after a regular run.
+# The snapshots are evicted least recently used first once they take more than MAX_BYTES.
+
+# Directory of the snapshots, populate() always generates the data when None
+SNAPSHOT_DIR = None
+
+# Bytes all the snapshots may take, the least recently used ones are removed above it
+MAX_BYTES = 2 * 2 ** 30
+
+# Rows pickled together in a chunk of a table file
+CHUNK_ROWS = 10000
+
+MANIFEST = 'manifest.json'
+
+# Function to hash ddl.sql, a change of the schema invalidates every snapshot made with the old one
+def ddl_hash(ddl_file=DDL_FILE):
+    with open(ddl_file, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()[:16]
+
+# Function to build the key of a dataset, the assignment and generator modes are part of it
+# because every mode draws other values from the same seed
+def snapshot_key(seed, scale_factor, assignment_mode=None, generator_mode=None):
+    return {"seed": seed, "scale_factor": scale_factor, "assignment_mode": assignment_mode or db_data.ASSIGNMENT_MODE,
+            "generator_mode": generator_mode or db_data.GENERATOR_MODE, "ddl_hash": ddl_hash()}
+
+# Function to get the directory of the snapshot of a key
+def snapshot_path(key):
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:20]
+    return os.path.join(SNAPSHOT_DIR, digest)
+
+# Function to list the tables the triggers of ddl.sql write when another table is written,
+# plus episode_winner that declare_winners writes, none of them is dumped
+def derived_tables():
+    return db_data.trigger_tables() | {"episode_winner"}
+
+# Function to list the dumped tables, parents before their children
+def snapshot_tables():
+    derived = derived_tables()
+    return [table for table in dependency_order(foreign_key_graph()) if table not in derived]
+
+# Function to get the column names of a table
+def table_columns(table):
+    with query_cursor() as cursor:
+        cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+        cursor.fetchall()
+        return [column[0] for column in cursor.description]
+
+# Function to dump a table into a gzip file: the column names, then chunks of CHUNK_ROWS rows stored as a tuple
+# of columns, read in primary key order with db_data.iter_table. It returns the number of rows.
+def dump_table(table, key_columns, file_name):
+    columns = table_columns(table)
+    rows = 0
+    chunk = []
+    with gzip.open(file_name, 'wb') as file:
+        pickle.dump(columns, file, protocol=pickle.HIGHEST_PROTOCOL)
+        for row in db_data.iter_table(table, columns, key_columns):
+            chunk.append(row)
+            if len(chunk) >= CHUNK_ROWS:
+                pickle.dump(tuple(zip(*chunk)), file, protocol=pickle.HIGHEST_PROTOCOL)
+                rows += len(chunk)
+                chunk = []
+        if chunk:
+            pickle.dump(tuple(zip(*chunk)), file, protocol=pickle.HIGHEST_PROTOCOL)
+            rows += len(chunk)
+    return rows
+
+# Function to read the column names and the rows of a table file, the rows are streamed chunk by chunk
+def read_table(file_name):
+    file = gzip.open(file_name, 'rb')
+    columns = pickle.load(file)
+
+    def rows():
+        with file:
+            while True:
+                try:
+                    chunk = pickle.load(file)
+                except EOFError:
+                    return
+                yield from zip(*chunk)
+
+    return columns, rows()
+
+# Function to dump every table of the current database as the snapshot of a key,
+# it is written to a temporary directory first so that a failed dump never leaves a partial snapshot
+def save(key):
+    path = snapshot_path(key)
+    partial = path + '.partial'
+    shutil.rmtree(partial, ignore_errors=True)
+    os.makedirs(partial)
+    keys = primary_keys()
+    start = time.perf_counter()
+    table_rows = {}
+    for table in snapshot_tables():
+        table_rows[table] = dump_table(table, keys[table], os.path.join(partial, f"{table}.pkl.gz"))
+    size = sum(os.path.getsize(os.path.join(partial, name)) for name in os.listdir(partial))
+    now = time.time()
+    manifest = {"key": key, "tables": table_rows, "bytes": size, "created": now, "last_used": now}
+    with open(os.path.join(partial, MANIFEST), 'w') as file:
+        json.dump(manifest, file, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(partial, path)
+    print(f"Snapshot of {sum(table_rows.values())} rows saved in {time.perf_counter() - start:.3f}s "
+          f"({size / 2 ** 20:.1f} MiB): {path}")
+    evict(keep=path)
+    return manifest
+
+# Function to read the manifest of a snapshot directory, None if it is missing or unreadable
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+# Function to write the last use time of a snapshot, the LRU order of evict
+def touch(path, manifest):
+    manifest["last_used"] = time.time()
+    with open(os.path.join(path, MANIFEST), 'w') as file:
+        json.dump(manifest, file, indent=2)
+
+# Function to check that every dumped table holds the rows of the snapshot after a restore,
+# rows left over from the database the snapshot was restored into would make the counts differ
+def check_restored(manifest):
+    with query_cursor() as cursor:
+        for table, rows in manifest["tables"].items():
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            count = cursor.fetchone()[0]
+            if count != rows:
+                raise RuntimeError(f"{table} holds {count} rows after the restore, the snapshot has {rows}")
+
+# Function to empty the database and load the snapshot of a key, it returns False when there is none.
+# The tables are always emptied with TRUNCATE, which covers every table of ddl.sql whatever the database holds.
+# They are loaded in foreign key order with the bulk flags of the triggers set, then tag_pair_count and
+# recipe_calories are rebuilt and declare_winners ranks every episode again, with the seed of the key.
+def restore(key):
+    path = snapshot_path(key)
+    manifest = read_manifest(path)
+    if manifest is None or manifest["key"] != key:
+        return False
+    start = time.perf_counter()
+    reset_seconds = db_data.reset_tables('truncate')
+    print(f"Reset (truncate) took {reset_seconds:.3f}s")
+    with db_data.bulk_flag("bulk_tag_pairs"), db_data.bulk_flag("bulk_recipe_calories"), \
+            db_data.bulk_flag("bulk_step_ordering"):
+        for table in snapshot_tables():
+            columns, rows = read_table(os.path.join(path, f"{table}.pkl.gz"))
+            db_data.insert_rows(table, columns, rows)
+    check_restored(manifest)
+    for table in ["tag_pair_count", "recipe_calories"]:
+        rebuild_derived_aggregate(table)
+    seed = db_data.SEED
+    db_data.SEED = key["seed"]
+    try:
+        db_data.determine_winners()
+    finally:
+        db_data.SEED = seed
+    touch(path, manifest)
+    print(f"Snapshot of {sum(manifest['tables'].values())} rows restored in {time.perf_counter() - start:.3f}s: {path}")
+    return True
+
+# Function to list the manifests of all the snapshots with their directory, least recently used first
+def list_snapshots():
+    if SNAPSHOT_DIR is None or not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    snapshots = []
+    for name in os.listdir(SNAPSHOT_DIR):
+        path = os.path.join(SNAPSHOT_DIR, name)
+        manifest = read_manifest(path) if not name.endswith('.partial') else None
+        if manifest is not None:
+            snapshots.append((path, manifest))
+    return sorted(snapshots, key=lambda snapshot: snapshot[1]["last_used"])
+
+# Function to remove the least recently used snapshots until all of them fit in MAX_BYTES,
+# the snapshot in keep (the one just saved) is never removed
+def evict(keep=None):
+    snapshots = list_snapshots()
+    total = sum(manifest["bytes"] for _, manifest in snapshots)
+    for path, manifest in snapshots:
+        if total <= MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= manifest["bytes"]
+        print(f"Evicted the snapshot {path} ({manifest['bytes'] / 2 ** 20:.1f} MiB)")
+
+# Function to populate the database like db_data.populate, restoring the snapshot of the seed and scale factor
+# when there is one, and saving a snapshot after generating the data otherwise.
+# Runs without a seed or without SNAPSHOT_DIR always generate the data, they cannot be reproduced.
+def populate(scale_factor=1, workers=1):
+    if SNAPSHOT_DIR is None or db_data.SEED is None:
+        db_data.populate(scale_factor, workers)
+        return
+    key = snapshot_key(db_data.SEED, scale_factor)
+    if restore(key):
+        return
+    db_data.populate(scale_factor, workers)
+    save(key)
+
+# Function to print the snapshots, least recently used first
+def print_snapshots(snapshots):
+    print(f"{'seed':<16}{'scale':>6}  {'assignments':<16}{'generator':<11}{'ddl':<18}{'rows':>10}{'MiB':>8}  last used")
+    for path, manifest in snapshots:
+        key = manifest["key"]
+        last_used = datetime.fromtimestamp(manifest["last_used"]).isoformat(sep=' ', timespec='seconds')
+        print(f"{str(key['seed']):<16}{key['scale_factor']:>6}  {key['assignment_mode']:<16}{key.get('generator_mode', 'python'):<11}{key['ddl_hash']:<18}"
+              f"{sum(manifest['tables'].values()):>10}{manifest['bytes'] / 2 ** 20:>8.1f}  {last_used}")
+
+
+def main():
+    global SNAPSHOT_DIR, MAX_BYTES
+
+    parser = argparse.ArgumentParser(description="Populate the cooking_show database from a snapshot of a seeded dataset, "
+                                                 "or generate it with db_data.py and save its snapshot")
+    parser.add_argument("action", choices=["populate", "list", "clear"], nargs="?", default="populate")
+    parser.add_argument("--seed", help="seed of the dataset, required to populate")
+    parser.add_argument("--scale-factor", type=int, default=1)
+    parser.add_argument("--assignments", choices=list(db_data.assignment_procedures), default=db_data.ASSIGNMENT_MODE,
+                        help="assignment mode of db_data.py used when the dataset is generated")
+    parser.add_argument("--generator", choices=["python", "numpy"], default=db_data.GENERATOR_MODE,
+                        help="generator mode of db_data.py used when the dataset is generated")
+    parser.add_argument("--reset-mode", choices=["delete", "truncate", "rebuild"], default=db_data.RESET_MODE,
+                        help="how the tables are emptied before the dataset is generated, a restore always truncates them")
+    parser.add_argument("--workers", type=int, default=1, help="stages populated at the same time when the dataset is generated")
+    parser.add_argument("--snapshot-dir", default="snapshots", help="directory of the snapshots")
+    parser.add_argument("--max-mib", type=float, default=MAX_BYTES / 2 ** 20,
+                        help="MiB all the snapshots may take before the least recently used ones are removed")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args()
+    SNAPSHOT_DIR = args.snapshot_dir
+    MAX_BYTES = int(args.max_mib * 2 ** 20)
+
+    if args.action == "list":
+        print_snapshots(list_snapshots())
+        return
+    if args.action == "clear":
+        for path, _ in list_snapshots():
+            shutil.rmtree(path)
+        return
+    if args.seed is None:
+        parser.error("populate needs --seed, only seeded datasets can be restored")
+
+    db.configure_from_args(args)
+    if db.POOL_SIZE < args.workers + 1:
+        db.POOL_SIZE = args.workers + 1
+    db_data.SEED = args.seed
+    db_data.ASSIGNMENT_MODE = args.assignments
+    db_data.RESET_MODE = args.reset_mode
+    db_data.GENERATOR_MODE = args.generator
+    if db_data.GENERATOR_MODE == 'numpy' and db_data.numpy is None:
+        parser.error("--generator numpy needs NumPy, install it with pip install numpy")
+    populate(args.scale_factor, args.workers)
+
+    close_connections()
+
+
+if __name__ == "__main__":
+    main()
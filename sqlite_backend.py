@@ -0,0 +1,500 @@
+import re
+import json
+import zlib
+import random
+import sqlite3
+import threading
+from datetime import date, datetime
+
+from schema import iter_statements, write_table_pattern
+from aggregates import aggregate_tables
+from reporting import get_schema_dependencies
+
+# Embedded SQLite version of the cooking_show database, selected with --backend sqlite (connection.BACKEND).
+# The tables, indexes and views of ddl.sql are translated to SQLite when the database is created, and the parts of
+# ddl.sql SQLite cannot run are done in Python behind a connection that looks like a pooled mysql.connector one:
+# - the BEFORE INSERT triggers (update_total_time, update_recipe_category, step_ordering, different_cook_judge)
+#   rewrite the rows of the INSERT ... VALUES statements of their tables before they are sent to SQLite
+# - the tables the AFTER triggers keep up to date (the aggregates of aggregates.py and food_group_category)
+#   are recomputed from their source tables by the first statement that reads them after the sources changed
+# - the procedures used by the population scripts and the reports have a Python version, the assignment
+#   procedures draw the episodes with assignment_engine
+# - the @ user variables set with SET are kept per connection, the other SET statements are ignored
+# All the connections share one SQLite connection and run one statement at a time,
+# so a commit or rollback of any of them applies to everything written since the last one.
+
+# Statements that have no SQLite equivalent: users, grants, triggers, procedures, the schema itself and the session
+# settings, ALTER TABLE only adds foreign keys or resets AUTO_INCREMENT, which SQLite does not need
+skipped_statement_pattern = re.compile(r'^(?:USE|SET|GRANT|REVOKE|FLUSH|ALTER\s+TABLE|(?:CREATE|DROP)\s+(?:USER|TRIGGER|PROCEDURE|FUNCTION)|'
+                                       r'CREATE\s+(?:SCHEMA|DATABASE))\b', re.IGNORECASE)
+drop_schema_pattern = re.compile(r'^DROP\s+(?:SCHEMA|DATABASE)\b', re.IGNORECASE)
+truncate_pattern = re.compile(r'^TRUNCATE\s+(?:TABLE\s+)?(\w+)$', re.IGNORECASE)
+drop_temporary_pattern = re.compile(r'^DROP\s+TEMPORARY\s+TABLE\b', re.IGNORECASE)
+create_table_or_view_pattern = re.compile(r'^CREATE\s+(?:TABLE|VIEW)\b', re.IGNORECASE)
+auto_increment_type_pattern = re.compile(r'\bINT(?:\s+UNSIGNED)?(?=[^,\n]*\bAUTO_INCREMENT\b)', re.IGNORECASE)
+set_variable_pattern = re.compile(r'^SET\s+@(\w+)\s*=\s*(.+)$', re.IGNORECASE | re.DOTALL)
+call_statement_pattern = re.compile(r'^CALL\s+(\w+)\s*\((.*)\)$', re.IGNORECASE | re.DOTALL)
+insert_values_pattern = re.compile(r'^INSERT\s+INTO\s+(\w+)\s*\(([^)]*)\)\s*VALUES\s*\(([^)]*)\)$', re.IGNORECASE)
+comment_pattern = re.compile(r'--[^\n]*')
+
+# Function to translate a MySQL statement to SQLite, it returns None for the statements SQLite has no use for
+# - an AUTO_INCREMENT column becomes INTEGER, the alias of the rowid SQLite numbers the rows with
+# - UNSIGNED, the names of foreign keys and FORCE INDEX hints are dropped
+# - divisions in tables and views are made on reals, MySQL divides integers into decimals
+def translate_statement(statement):
+    statement = statement.strip()
+    if skipped_statement_pattern.match(statement):
+        return None
+    match = truncate_pattern.match(statement)
+    if match is not None:
+        # the rowids restart from 1 on an empty table, like AUTO_INCREMENT after TRUNCATE
+        return f"DELETE FROM {match.group(1)}"
+    # SQLite finds the temporary table of the name first, like MySQL
+    statement = drop_temporary_pattern.sub('DROP TABLE', statement)
+    if create_table_or_view_pattern.match(statement):
+        statement = comment_pattern.sub('', statement)
+        statement = auto_increment_type_pattern.sub('INTEGER', statement)
+        statement = re.sub(r'\s+AUTO_INCREMENT\b', '', statement, flags=re.IGNORECASE)
+        statement = re.sub(r'\s+UNSIGNED\b', '', statement, flags=re.IGNORECASE)
+        statement = re.sub(r'\bCONSTRAINT\s+FOREIGN\s+KEY\b', 'FOREIGN KEY', statement, flags=re.IGNORECASE)
+        statement = re.sub(r'\s+FORCE\s+INDEX\s*\(\w+\)', '', statement, flags=re.IGNORECASE)
+        statement = statement.replace('/', ' * 1.0 /')
+    return statement.replace('%s', '?')
+
+
+# Function to read a column of an inserted row, 0 when the INSERT does not set it
+def row_value(row, column):
+    return row.get(column) or 0
+
+# update_total_time: the total time of a recipe is its preparation time plus its cooking time
+def update_total_time(cursor, rows):
+    for row in rows:
+        row["total_time"] = row_value(row, "preparation_mins") + row_value(row, "cooking_mins")
+
+# update_recipe_category: a recipe inserted without a category gets the category of the food group
+# of its basic ingredient, or '' when the food group has none
+def update_recipe_category(cursor, rows):
+    ingredient_ids = sorted({row["basic_ingredient_id"] for row in rows if row.get("category") is None})
+    categories = {}
+    if ingredient_ids:
+        lookup = cursor.connection.cursor()
+        lookup.execute("SELECT i.ingredient_id, fgc.category "
+                       "FROM ingredient i "
+                       "INNER JOIN food_group_category fgc ON fgc.food_group_id = i.food_group_id "
+                       f"WHERE i.ingredient_id IN ({', '.join(['%s'] * len(ingredient_ids))})", ingredient_ids)
+        categories = dict(lookup.fetchall())
+    for row in rows:
+        if row.get("category") is None:
+            row["category"] = categories.get(row["basic_ingredient_id"]) or ''
+
+# step_ordering: a step gets the ordering after the last step of its recipe, unless @bulk_step_ordering = 1
+# and it already has an ordering. The rows before it in the same statement count as steps of its recipe.
+def step_ordering(cursor, rows):
+    keep_orderings = cursor.connection.variables.get("bulk_step_ordering") == 1
+    last_orderings = {}
+    kept_orderings = {}
+    lookup = cursor.connection.cursor()
+    for row in rows:
+        recipe_id = row["recipe_id"]
+        ordering = row_value(row, "ordering")
+        if keep_orderings and ordering > 0:
+            if recipe_id in last_orderings:
+                last_orderings[recipe_id] = max(last_orderings[recipe_id], ordering)
+            else:
+                kept_orderings[recipe_id] = max(kept_orderings.get(recipe_id, 0), ordering)
+            continue
+        if recipe_id not in last_orderings:
+            lookup.execute("SELECT COALESCE(MAX(ordering), 0) FROM step WHERE recipe_id = %s", (recipe_id,))
+            last_orderings[recipe_id] = max(lookup.fetchone()[0], kept_orderings.pop(recipe_id, 0))
+        last_orderings[recipe_id] += 1
+        row["ordering"] = last_orderings[recipe_id]
+
+# different_cook_judge: a cook cannot rate himself
+def different_cook_judge(cursor, rows):
+    for row in rows:
+        if row["cook_id"] == row["judge_id"]:
+            raise sqlite3.IntegrityError("Cook and judge cannot be the same person")
+
+# BEFORE INSERT triggers of every table, in the order ddl.sql creates them
+before_insert_triggers = {
+    "recipe": [update_total_time, update_recipe_category],
+    "step": [step_ordering],
+    "rating": [different_cook_judge],
+}
+
+
+# Function to list the tables the AFTER triggers of ddl.sql keep up to date, with the statement that fills
+# each one from its source tables: the recompute queries of aggregates.py, and the CASE of map_food_group_category
+def derived_table_fills():
+    fills = {}
+    for table, key_columns, value_columns, recompute in aggregate_tables():
+        fills[table] = f"INSERT INTO {table} ({', '.join(key_columns + value_columns)}) {recompute}"
+    procedure = comment_pattern.sub('', get_schema_dependencies().procedures["map_food_group_category"])
+    case = re.search(r'\bCASE\s+fg_title\b(.*?)\bEND\b', procedure, re.IGNORECASE | re.DOTALL).group(1)
+    fills["food_group_category"] = (f"INSERT INTO food_group_category (food_group_id, category) "
+                                    f"SELECT food_group_id, CASE title {case} END FROM food_group")
+    return fills
+
+
+# Function to get the episode counts a table keeps for the participants of the previous episode
+def read_episode_counts(cursor, table, key):
+    cursor.execute(f"SELECT {key}, episode_count FROM {table} WHERE episode_count > 0")
+    return dict(cursor.fetchall())
+
+# Tables assignment_engine loads when it is created
+engine_tables = ["national_cuisine", "cook", "cook_national_cuisine", "recipe", "cook_recipe"]
+
+# episode_assignments and episode_assignments_cursor: the assignments of one episode, drawn by assignment_engine
+# with the rules of the procedures, starting from the episode counts the previous episode left in the tables
+def episode_assignments(cursor, episode_no, season_no):
+    # imported here because assignment_engine builds on db_data, which builds on the connection of this backend
+    from assignment_engine import AssignmentEngine
+
+    cursor.execute("SELECT episode_id FROM episode WHERE episode_number = %s AND season_number = %s", (episode_no, season_no))
+    row = cursor.fetchone()
+    if row is None:
+        return
+    episode_id = row[0]
+
+    # the engine of the previous call is kept while no other statement changed the tables it loads,
+    # the procedures draw with RAND(), so it is not seeded either
+    database = cursor.database
+    if database.engine is None or database.engine_versions != database.read_versions(engine_tables):
+        database.engine = AssignmentEngine(random.Random())
+    engine = database.engine
+    engine.start_season()
+    if episode_no != 1:
+        engine.cuisine_counts = read_episode_counts(cursor, "national_cuisine", "national_cuisine_id")
+        engine.cook_counts = read_episode_counts(cursor, "cook", "cook_id")
+        engine.recipe_counts = read_episode_counts(cursor, "recipe", "recipe_id")
+    pairs, recipes, judges = engine.assign_episode()
+
+    cursor.executemany("INSERT INTO cook_cuisine_assignment (cook_id, national_cuisine_id, episode_id) VALUES (%s, %s, %s)",
+                       [(cook_id, cuisine_id, episode_id) for cook_id, cuisine_id in pairs])
+    assigned = [(cook_id, recipe_id) for (cook_id, _), recipe_id in zip(pairs, recipes) if recipe_id is not None]
+    cursor.executemany("INSERT INTO recipe_assignment (recipe_id, episode_id) VALUES (%s, %s)",
+                       [(recipe_id, episode_id) for _, recipe_id in assigned])
+    # the cook must now know the recipe he is assigned in the episode
+    new_recipes = [pair for pair in assigned if pair not in engine.known_recipes]
+    cursor.executemany("INSERT INTO cook_recipe (cook_id, recipe_id) VALUES (%s, %s)", new_recipes)
+    engine.known_recipes.update(new_recipes)
+    cursor.executemany("INSERT INTO judge_assignment (cook_id, episode_id) VALUES (%s, %s)",
+                       [(cook_id, episode_id) for cook_id in judges])
+    engine.write_episode_counts()
+    database.engine_versions = database.read_versions(engine_tables)
+
+# season_assignments: the assignments of every episode of the seasons first_season to last_season
+def season_assignments(cursor, first_season, last_season):
+    cursor.execute("SELECT episode_number, season_number FROM episode WHERE season_number BETWEEN %s AND %s "
+                   "ORDER BY season_number, episode_number", (first_season, last_season))
+    for episode_no, season_no in cursor.fetchall():
+        episode_assignments(cursor, episode_no, season_no)
+
+# declare_winners: the winner of every episode, ties broken by the rank of the cook and then by the CRC32 hash of
+# the procedure, so the same seed declares the same winners as on MySQL. Every episode is declared again.
+def declare_winners(cursor, seed):
+    cursor.execute("DELETE FROM episode_winner")
+    cursor.execute("INSERT INTO episode_winner (episode_id, cook_id, total_rating, rank_numeric, winner_seed) "
+                   "SELECT ranked.episode_id, ranked.cook_id, ranked.total_rating, ranked.rank_numeric, %s "
+                   "FROM ("
+                   "    SELECT ecra.episode_id, ecra.cook_id, ecra.rating_sum AS total_rating, crn.rank_numeric, "
+                   "        ROW_NUMBER() OVER ("
+                   "            PARTITION BY ecra.episode_id "
+                   "            ORDER BY ecra.rating_sum DESC, crn.rank_numeric DESC, "
+                   "                CASE WHEN %s IS NULL THEN RAND() ELSE CRC32(CONCAT(%s, ':', ecra.episode_id, ':', ecra.cook_id)) END"
+                   "        ) AS position "
+                   "    FROM episode_cook_rating_aggregate ecra "
+                   "    INNER JOIN cook_rank_numeric crn ON crn.cook_id = ecra.cook_id"
+                   ") AS ranked "
+                   "WHERE ranked.position = 1", (seed, seed, seed))
+    cursor.execute("DELETE FROM episode_winner_dirty")
+    cursor.add_result("SELECT episode_id, cook_id, total_rating AS rating, rank_numeric FROM episode_winner ORDER BY episode_id")
+
+# cuisine_year_cook_participations: the cooks of a national cuisine and whether they cooked it in the season
+def cuisine_year_cook_participations(cursor, season_no, cuisine_name):
+    cursor.add_result("SELECT %s AS cuisine_name, %s AS season_no, c.first_name, c.last_name, "
+                      "    EXISTS ("
+                      "        SELECT 1 "
+                      "        FROM cook_cuisine_assignment cca "
+                      "        INNER JOIN episode e ON cca.episode_id = e.episode_id "
+                      "        INNER JOIN national_cuisine cca_nc ON cca.national_cuisine_id = cca_nc.national_cuisine_id "
+                      "        WHERE cca.cook_id = cnc.cook_id AND e.season_number = %s AND cca_nc.cuisine_name = %s"
+                      "    ) AS participated "
+                      "FROM national_cuisine nc "
+                      "INNER JOIN cook_national_cuisine cnc ON nc.national_cuisine_id = cnc.national_cuisine_id "
+                      "INNER JOIN cook c ON cnc.cook_id = c.cook_id "
+                      "WHERE nc.cuisine_name = %s",
+                      (cuisine_name, season_no, season_no, cuisine_name, cuisine_name))
+
+# insert_recipe_steps: the steps of a JSON array added after the last step of a recipe
+def insert_recipe_steps(cursor, recipe_id, step_descriptions):
+    cursor.execute("SELECT COALESCE(MAX(ordering), 0) FROM step WHERE recipe_id = %s", (recipe_id,))
+    max_order = cursor.fetchone()[0]
+    variables = cursor.connection.variables
+    variables["bulk_step_ordering"] = 1
+    try:
+        cursor.executemany("INSERT INTO step (small_description, ordering, recipe_id) VALUES (%s, %s, %s)",
+                           [(description, max_order + position, recipe_id)
+                            for position, description in enumerate(json.loads(step_descriptions), 1)])
+    finally:
+        variables["bulk_step_ordering"] = None
+
+# Python version of every procedure of ddl.sql the scripts call
+procedures = {
+    "episode_assignments": episode_assignments,
+    "episode_assignments_cursor": episode_assignments,
+    "season_assignments": season_assignments,
+    "declare_winners": declare_winners,
+    "cuisine_year_cook_participations": cuisine_year_cook_participations,
+    "insert_recipe_steps": insert_recipe_steps,
+}
+
+
+procedure_pattern = re.compile(r'^CREATE\s+PROCEDURE\s+(\w+)\s*\((.*?)\)\s*BEGIN\b(.*)\bEND\s*;?$', re.IGNORECASE | re.DOTALL)
+
+# Function to find the procedures of ddl.sql whose body is only SELECT statements, which SQLite runs as they are
+# it returns {name: (parameter names, [(statement, names of the parameters in the order the statement uses them), ...])}
+def select_procedures():
+    selects = {}
+    for name, text in get_schema_dependencies().procedures.items():
+        match = procedure_pattern.match(text.strip())
+        if match is None or name in procedures:
+            continue
+        parameters = [re.sub(r'^(?:IN|OUT|INOUT)\s+', '', parameter.strip(), flags=re.IGNORECASE).split()[0]
+                      for parameter in match.group(2).split(',') if parameter.strip()]
+        statements = [statement.strip() for statement in comment_pattern.sub('', match.group(3)).split(';') if statement.strip()]
+        if not statements or not all(statement.upper().startswith('SELECT') for statement in statements):
+            continue
+        parameter_pattern = re.compile(r'\b(' + '|'.join(parameters) + r')\b') if parameters else None
+        selects[name] = (parameters, [
+            (parameter_pattern.sub('%s', statement), parameter_pattern.findall(statement)) if parameters else (statement, [])
+            for statement in statements
+        ])
+    return selects
+
+
+# MySQL functions the statements of the scripts and of the procedures above use
+def mysql_concat(*values):
+    return None if any(value is None for value in values) else ''.join(str(value) for value in values)
+
+def mysql_crc32(value):
+    return None if value is None else zlib.crc32(str(value).encode('utf-8'))
+
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+
+
+# A result set of a procedure, read with stored_results() like the ones of mysql.connector
+class StoredResult:
+    def __init__(self, description, rows):
+        self.description = description
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+
+# The SQLite database shared by all the connections, with the derived tables that have to be recomputed
+class SQLiteDatabase:
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.create_function("CONCAT", -1, mysql_concat, deterministic=True)
+        self.connection.create_function("CRC32", 1, mysql_crc32, deterministic=True)
+        self.connection.create_function("RAND", 0, random.random)
+        self.lock = threading.RLock()
+        self.fills = derived_table_fills()
+        self.selects = select_procedures()
+        self.stale = set()
+        # translated SQL, read tables, written tables and written derived tables of every statement, computed once
+        self.plans = {}
+        # number of statements that wrote every table
+        self.versions = {}
+        # assignment engine of the assignment procedures, with the versions of engine_tables it was loaded at
+        self.engine = None
+        self.engine_versions = None
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'")
+        if cursor.fetchone()[0] == 0:
+            self.create_schema()
+        else:
+            # the database was written by another process, which may have left the derived tables behind
+            self.stale = set(self.fills)
+
+    # creates the tables, indexes and views of ddl.sql
+    def create_schema(self):
+        with self.lock:
+            for statement in iter_statements():
+                sql = translate_statement(statement)
+                if sql is not None and not drop_schema_pattern.match(sql):
+                    self.connection.execute(sql)
+            self.connection.commit()
+
+    # drops every table and view, like DROP SCHEMA
+    def drop_schema(self):
+        with self.lock:
+            for kind in ["view", "table"]:
+                names = [row[0] for row in self.connection.execute(
+                    "SELECT name FROM sqlite_master WHERE type = ? AND name NOT LIKE 'sqlite_%'", (kind,))]
+                for name in names:
+                    self.connection.execute(f"DROP {kind.upper()} {name}")
+            self.stale.clear()
+            self.engine = None
+
+    # returns (sql, tables read, tables written, derived tables written) of a statement
+    def plan(self, query):
+        plan = self.plans.get(query)
+        if plan is None:
+            dependencies = get_schema_dependencies()
+            sql = translate_statement(query)
+            written = set(write_table_pattern.findall(query))
+            # the derived tables written by the triggers of the written tables, not the ones written directly
+            derived = (dependencies.writes(query) - written) & self.fills.keys()
+            plan = (sql, dependencies.reads(query), written, derived)
+            self.plans[query] = plan
+        return plan
+
+    def read_versions(self, tables):
+        return tuple(self.versions.get(table, 0) for table in tables)
+
+    # recomputes the stale derived tables among the given tables
+    def refresh(self, tables):
+        for table in sorted(tables & self.stale):
+            self.connection.execute(f"DELETE FROM {table}")
+            self.connection.execute(self.fills[table])
+            self.stale.discard(table)
+
+
+# A connection of the pool, with its own user variables
+class SQLiteConnection:
+    def __init__(self, database):
+        self.database = database
+        self.variables = {}
+
+    def cursor(self):
+        return SQLiteCursor(self)
+
+    def commit(self):
+        with self.database.lock:
+            self.database.connection.commit()
+
+    def rollback(self):
+        with self.database.lock:
+            self.database.connection.rollback()
+
+    def is_connected(self):
+        return True
+
+    # gives the connection back to the pool, a pooled MySQL connection starts a new session
+    def close(self):
+        self.variables.clear()
+
+
+class SQLiteCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.database = connection.database
+        self.cursor = self.database.connection.cursor()
+        self.results = []
+        self.rowcount = -1
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+    def execute(self, query, data=None):
+        self.run(query, [tuple(data or ())], many=False)
+
+    def executemany(self, query, rows):
+        self.run(query, [tuple(row) for row in rows], many=True)
+
+    def run(self, query, rows, many):
+        statement = query.strip()
+        with self.database.lock:
+            match = set_variable_pattern.match(statement)
+            if match is not None:
+                self.cursor.execute(f"SELECT {translate_statement(match.group(2))}", rows[0])
+                self.connection.variables[match.group(1)] = self.cursor.fetchone()[0]
+                return
+            match = call_statement_pattern.match(statement)
+            if match is not None:
+                self.cursor.execute(f"SELECT {translate_statement(match.group(2))}", rows[0])
+                self.callproc(match.group(1), self.cursor.fetchone() if match.group(2).strip() else ())
+                return
+            if drop_schema_pattern.match(statement):
+                self.database.drop_schema()
+                return
+
+            sql, reads, written, derived = self.database.plan(statement)
+            if sql is None:
+                return
+            match = insert_values_pattern.match(statement)
+            if match is not None and match.group(1) in before_insert_triggers and rows:
+                sql, rows = self.apply_triggers(match.group(1), match.group(2), match.group(3), rows)
+            self.database.refresh(reads)
+            if many:
+                self.cursor.executemany(sql, rows)
+            else:
+                self.cursor.execute(sql, rows[0])
+            self.rowcount = self.cursor.rowcount
+            for table in written:
+                self.database.versions[table] = self.database.versions.get(table, 0) + 1
+            self.database.stale |= derived
+
+    # runs the BEFORE INSERT triggers of a table on the rows of an INSERT ... VALUES, it returns the statement
+    # and the rows to insert with the columns the triggers set
+    def apply_triggers(self, table, column_list, value_list, rows):
+        columns = [column.strip() for column in column_list.split(',')]
+        if any(value.strip() != '%s' for value in value_list.split(',')):
+            raise NotImplementedError(f"INSERT INTO {table} needs a %s placeholder for every value on the sqlite backend")
+        row_dicts = [dict(zip(columns, row)) for row in rows]
+        for trigger in before_insert_triggers[table]:
+            trigger(self, row_dicts)
+        columns = list(row_dicts[0])
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+        return sql, [tuple(row[column] for column in columns) for row in row_dicts]
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def callproc(self, name, args=()):
+        if name not in procedures and name not in self.database.selects:
+            raise NotImplementedError(f"The procedure {name} has no version for the sqlite backend")
+        with self.database.lock:
+            self.results = []
+            if name in procedures:
+                procedures[name](self, *args)
+                return args
+            # a procedure of SELECT statements, every one of them is a result set
+            parameter_names, statements = self.database.selects[name]
+            values = dict(zip(parameter_names, args))
+            for statement, parameters in statements:
+                self.add_result(statement, [values[parameter] for parameter in parameters])
+        return args
+
+    # runs a query of a procedure and keeps its rows as one of the results of the call
+    def add_result(self, query, data=()):
+        cursor = SQLiteCursor(self.connection)
+        cursor.execute(query, data)
+        self.results.append(StoredResult(cursor.description, cursor.fetchall()))
+
+    def stored_results(self):
+        return iter(self.results)
+
+    def close(self):
+        self.cursor.close()
+
+
+# Pool of the sqlite backend, every connection it hands out shares the same database
+class SQLitePool:
+    def __init__(self, path):
+        self.database = SQLiteDatabase(path)
+
+    def get_connection(self):
+        return SQLiteConnection(self.database)
@@ -0,0 +1,133 @@
+import zlib
+import string
+
+try:
+    import numpy
+except ImportError:
+    # only permute_array needs NumPy
+    numpy = None
+
+# Generators of the values of UNIQUE columns for datasets of any scale factor.
+# The n-th value of a column is a keyed permutation of n: a Feistel network shuffles the bits of n, and values that
+# fall outside the range are shuffled again (cycle walking) until they land inside it. A permutation never maps two
+# indexes to the same value, so the values are unique without remembering the ones already given out or asking the
+# database, in O(1) memory, and the same key always gives the same values.
+
+MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+# Rounds of the Feistel network, four rounds of a good mixing function make a pseudo random permutation
+FEISTEL_ROUNDS = 4
+
+# Function to mix a value with a round key into a pseudo random value of the bits in mask (splitmix64 finalizer),
+# it works on Python ints and on NumPy uint64 arrays alike
+def mix(value, round_key, mask):
+    value = ((value ^ round_key) * 0x9E3779B97F4A7C15) & MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return (value ^ (value >> 31)) & mask
+
+
+# Keyed permutation of the integers 0 .. size - 1
+class FeistelPermutation:
+    def __init__(self, size, key):
+        if size < 1:
+            raise ValueError("A permutation needs at least one value")
+        self.size = size
+        self.half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self.half_mask = (1 << self.half_bits) - 1
+        self.round_keys = [mix(key + round_number, 0x5851F42D4C957F2D, MASK_64) for round_number in range(FEISTEL_ROUNDS)]
+
+    # one pass of the Feistel network over 2 * half_bits bits, a permutation of 0 .. 4 ** half_bits - 1
+    def encrypt(self, value):
+        left = value >> self.half_bits
+        right = value & self.half_mask
+        for round_key in self.round_keys:
+            left, right = right, left ^ mix(right, round_key, self.half_mask)
+        return (left << self.half_bits) | right
+
+    def __call__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(f"Index {index} outside of a permutation of {self.size} values")
+        value = self.encrypt(index)
+        while value >= self.size:
+            value = self.encrypt(value)
+        return value
+
+    # the permutation of a NumPy array of indexes, for sizes below 2 ** 64
+    def permute_array(self, indexes):
+        values = self.encrypt(numpy.asarray(indexes, dtype=numpy.uint64))
+        outside = values >= self.size
+        while outside.any():
+            values[outside] = self.encrypt(values[outside])
+            outside = values >= self.size
+        return values
+
+
+# Unique integers of low .. high, in the order of a keyed permutation
+class UniqueIntegers:
+    def __init__(self, low, high, key):
+        self.low = low
+        self.permutation = FeistelPermutation(high - low + 1, key)
+
+    def __len__(self):
+        return self.permutation.size
+
+    def __getitem__(self, index):
+        return self.low + self.permutation(index)
+
+    def values(self, start, count):
+        return [self.low + self.permutation(index) for index in range(start, start + count)]
+
+    def array(self, start, count):
+        return self.permutation.permute_array(numpy.arange(start, start + count, dtype=numpy.uint64)) + numpy.uint64(self.low)
+
+
+# Unique strings of a fixed length over an alphabet, the base len(alphabet) digits of a keyed permutation
+class UniqueStrings:
+    def __init__(self, length, key, alphabet=string.ascii_lowercase + string.digits):
+        self.length = length
+        self.alphabet = alphabet
+        self.permutation = FeistelPermutation(len(alphabet) ** length, key)
+
+    def __len__(self):
+        return self.permutation.size
+
+    def __getitem__(self, index):
+        value = self.permutation(index)
+        characters = []
+        for _ in range(self.length):
+            value, digit = divmod(value, len(self.alphabet))
+            characters.append(self.alphabet[digit])
+        return ''.join(characters)
+
+
+# Words of the qualifiers of the synthetic titles, a qualifier is an adjective and a style
+title_adjectives = ["Smoky", "Rustic", "Zesty", "Golden", "Herbed", "Spiced", "Crispy", "Creamy", "Charred", "Tangy",
+                    "Hearty", "Fresh", "Glazed", "Roasted", "Braised", "Peppery", "Honeyed", "Toasted", "Savory", "Mild"]
+title_styles = ["Street Style", "Home Style", "Coastal", "Alpine", "Farmhouse", "Bistro", "Market", "Harvest",
+                "Garden", "Festival", "Village", "Country", "Island", "Highland", "Riverside", "Midnight", "Sunday",
+                "Family", "Classic", "Modern"]
+
+# Separator between a title and its qualifier, the titles of the sample data never contain it
+TITLE_SEPARATOR = " - "
+
+# Synthetic titles for the copies of a list of titles: every copy of a title gets its own qualifier,
+# "Pad Thai - Smoky Street Style", with a number once the adjective and style pairs run out.
+# The qualifier of a copy is a keyed permutation of the copy number rotated by a hash of the title, so the copies of
+# one title never share a qualifier and the titles of one copy get different ones. A qualifier never contains the
+# separator, so different (title, qualifier) pairs always give different titles.
+class SyntheticTitles:
+    def __init__(self, copies, key):
+        self.pairs = len(title_adjectives) * len(title_styles)
+        self.permutation = FeistelPermutation(max(1, -(-copies // self.pairs)) * self.pairs, key)
+
+    # the title of a copy, copy 0 is the original title
+    def title(self, title, copy):
+        if copy == 0:
+            return title
+        index = (self.permutation(copy - 1) + zlib.crc32(title.encode())) % self.permutation.size
+        round_number, pair = divmod(index, self.pairs)
+        qualifier = f"{title_adjectives[pair % len(title_adjectives)]} {title_styles[pair // len(title_adjectives)]}"
+        if round_number > 0:
+            qualifier += f" {round_number + 1}"
+        return f"{title}{TITLE_SEPARATOR}{qualifier}"